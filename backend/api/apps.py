@@ -8,3 +8,7 @@ class ApiConfig(AppConfig):
 
     def ready(self):
         import api.schema
+        from api.utils import analytics_cache, reference_cache, rollup
+        reference_cache.connect_signals()
+        rollup.connect_signals()
+        analytics_cache.connect_signals()
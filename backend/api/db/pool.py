@@ -0,0 +1,262 @@
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from django.db import OperationalError
+
+
+class PoolTimeout(OperationalError):
+    """Свободное соединение не появилось за время ожидания"""
+
+
+@dataclass
+class PooledConnection:
+    """Соединение пула и моменты его открытия и последнего возврата"""
+
+    connection: object
+    created_at: float
+    released_at: float
+
+
+@dataclass
+class _Counters:
+    checkouts: int = 0
+    connects: int = 0
+    waits: int = 0
+    wait_time: float = 0.0
+    wait_time_max: float = 0.0
+    timeouts: int = 0
+    health_checks: int = 0
+    health_check_failures: int = 0
+    closed_lifetime: int = 0
+    closed_idle: int = 0
+    closed_broken: int = 0
+
+
+class ConnectionPool:
+    """
+    Пул соединений с БД в памяти процесса
+
+    Соединение выдается потоку на время запроса и возвращается в пул вместо закрытия.
+    Размер пула ограничен max_size: при исчерпании поток ждет освобождения соединения
+    не дольше timeout и получает PoolTimeout. Свободное соединение, простоявшее дольше
+    check_interval, перед выдачей проверяется запросом SELECT 1. Соединения старше
+    max_lifetime и свободные дольше max_idle закрываются (0 - без ограничения).
+    """
+
+    def __init__(
+        self, max_size=10, timeout=10.0, max_lifetime=3600.0, max_idle=600.0, check_interval=30.0, signature=None,
+    ):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.check_interval = check_interval
+        self._condition = threading.Condition()
+        # Свободные соединения: последнее возвращенное выдается первым, старые остаются
+        # в начале очереди и закрываются по max_idle
+        self._idle = deque()
+        self._size = 0
+        self._waiting = 0
+        self._counters = _Counters()
+        self.signature = signature
+        self._closed = False
+        self._pid = os.getpid()
+
+    def acquire(self, connect):
+        """Выдает свободное соединение или открывает новое вызовом connect()"""
+        started = time.monotonic()
+        while True:
+            item = self._take(started)
+            if item is None:
+                return self._open(connect)
+            if self._expired(item, time.monotonic()):
+                with self._condition:
+                    self._counters.closed_lifetime += 1
+            elif self._healthy(item):
+                return item
+            self._discard(item)
+
+    def release(self, item, broken=False):
+        """Возвращает соединение в пул; сломанное или устаревшее закрывается"""
+        now = time.monotonic()
+        if broken or self._closed or item.connection.closed or self._expired(item, now):
+            with self._condition:
+                if broken or item.connection.closed:
+                    self._counters.closed_broken += 1
+                elif not self._closed:
+                    self._counters.closed_lifetime += 1
+            self._discard(item)
+            return
+        item.released_at = now
+        with self._condition:
+            self._idle.append(item)
+            self._condition.notify()
+
+    def close(self):
+        """Закрывает свободные соединения; выданные закроются при возврате"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+        for item in idle:
+            self._discard(item)
+
+    def stats(self):
+        """Размер пула, занятые и ожидающие соединения, время ожидания"""
+        counters = self._counters
+        with self._condition:
+            size, idle, waiting = self._size, len(self._idle), self._waiting
+        return {
+            'max_size': self.max_size,
+            'size': size,
+            'idle': idle,
+            'in_use': size - idle,
+            'waiting': waiting,
+            'checkouts': counters.checkouts,
+            'connects': counters.connects,
+            'waits': counters.waits,
+            'wait_time_avg_ms': round(counters.wait_time / counters.waits * 1000, 1) if counters.waits else 0,
+            'wait_time_max_ms': round(counters.wait_time_max * 1000, 1),
+            'timeouts': counters.timeouts,
+            'health_checks': counters.health_checks,
+            'health_check_failures': counters.health_check_failures,
+            'closed_lifetime': counters.closed_lifetime,
+            'closed_idle': counters.closed_idle,
+            'closed_broken': counters.closed_broken,
+        }
+
+    def _take(self, started):
+        """
+        Свободное соединение, None - если можно открыть новое (место уже занято)
+
+        Ждет освобождения соединения, пока пул заполнен.
+        """
+        waited = False
+        with self._condition:
+            try:
+                while True:
+                    self._close_idle()
+                    if self._idle:
+                        item = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        item = None
+                        break
+                    remaining = self.timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._counters.timeouts += 1
+                        raise PoolTimeout(
+                            f'Нет свободного соединения с БД за {self.timeout} с (размер пула {self.max_size})'
+                        )
+                    waited = True
+                    self._waiting += 1
+                    try:
+                        self._condition.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+            finally:
+                if waited:
+                    elapsed = time.monotonic() - started
+                    self._counters.waits += 1
+                    self._counters.wait_time += elapsed
+                    self._counters.wait_time_max = max(self._counters.wait_time_max, elapsed)
+            self._counters.checkouts += 1
+        return item
+
+    def _open(self, connect):
+        try:
+            connection = connect()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+        now = time.monotonic()
+        with self._condition:
+            self._counters.connects += 1
+        return PooledConnection(connection=connection, created_at=now, released_at=now)
+
+    def _healthy(self, item):
+        """Проверяет соединение, простоявшее дольше check_interval"""
+        if item.connection.closed:
+            with self._condition:
+                self._counters.health_check_failures += 1
+            return False
+        if time.monotonic() - item.released_at < self.check_interval:
+            return True
+        try:
+            with item.connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            if not item.connection.autocommit:
+                item.connection.rollback()
+            healthy = True
+        except Exception:
+            healthy = False
+        with self._condition:
+            self._counters.health_checks += 1
+            self._counters.health_check_failures += not healthy
+        return healthy
+
+    def _expired(self, item, now):
+        return bool(self.max_lifetime) and now - item.created_at >= self.max_lifetime
+
+    def _close_idle(self):
+        """Убирает из очереди соединения, простоявшие дольше max_idle или старше max_lifetime (под блокировкой)"""
+        now = time.monotonic()
+        while self._idle:
+            item = self._idle[0]
+            if self.max_idle and now - item.released_at >= self.max_idle:
+                self._counters.closed_idle += 1
+            elif self._expired(item, now):
+                self._counters.closed_lifetime += 1
+            else:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            self._close_connection(item)
+
+    def _discard(self, item):
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+        self._close_connection(item)
+
+    def _close_connection(self, item):
+        # Соединение, унаследованное от родительского процесса, не закрывается:
+        # закрытие завершило бы сессию родителя
+        if self._pid != os.getpid():
+            return
+        try:
+            item.connection.close()
+        except Exception:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, options, signature=None):
+    """
+    Пул соединения alias
+
+    Пул создается заново в дочернем процессе и при смене параметров подключения
+    signature (например, при переключении на тестовую БД).
+    """
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is not None and pool._pid == os.getpid() and pool.signature == signature:
+            return pool
+        if pool is not None and pool._pid == os.getpid():
+            pool.close()
+        pool = _pools[alias] = ConnectionPool(**options, signature=signature)
+        return pool
+
+
+def pool_stats():
+    """Статистика пулов процесса по псевдонимам БД"""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {alias: pool.stats() for alias, pool in pools.items() if pool._pid == os.getpid()}
@@ -0,0 +1,59 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from api.db.pool import get_pool
+
+
+class DatabaseWrapper(PostgresDatabaseWrapper):
+    """
+    PostgreSQL (psycopg2) с пулом соединений процесса (api.db.pool)
+
+    Django закрывает соединение в конце каждого запроса (CONN_MAX_AGE=0), здесь оно
+    вместо этого возвращается в пул: незавершенная транзакция откатывается, соединение
+    с ошибкой или закрытое внутри atomic закрывается. Параметры пула - ключ POOL
+    настроек БД (MAX_SIZE, TIMEOUT, MAX_LIFETIME, MAX_IDLE, CHECK_INTERVAL).
+
+    Состояние сессии (SET, временные таблицы, курсоры WITH HOLD) переходит
+    к следующему запросу, поэтому изменять его можно только внутри транзакции.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pool = None
+        self._pooled = None
+
+    @property
+    def pool(self):
+        options = {key.lower(): value for key, value in self.settings_dict.get('POOL', {}).items()}
+        signature = tuple(self.settings_dict[key] for key in ('NAME', 'USER', 'HOST', 'PORT'))
+        return get_pool(self.alias, options, signature)
+
+    def check_settings(self):
+        super().check_settings()
+        if self.settings_dict['CONN_MAX_AGE'] != 0:
+            raise ImproperlyConfigured(
+                'Пул соединений несовместим с постоянными соединениями: уберите CONN_MAX_AGE '
+                f'для БД {self.alias!r}'
+            )
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        self._pool = self.pool
+        # Уровень изоляции из OPTIONS устанавливается при открытии и сохраняется у соединения
+        self._pooled = self._pool.acquire(lambda: connect(conn_params))
+        return self._pooled.connection
+
+    def _close(self):
+        pool, pooled = self._pool, self._pooled
+        self._pool = self._pooled = None
+        if pooled is None or pooled.connection is not self.connection:
+            return super()._close()
+        # Внутри atomic соединение остается у обертки до выхода из блока, отдавать его нельзя
+        broken = self.in_atomic_block
+        if not broken:
+            try:
+                if self.connection.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                    self.connection.rollback()
+            except self.Database.Error:
+                broken = True
+        pool.release(pooled, broken=broken)
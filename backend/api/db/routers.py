@@ -0,0 +1,117 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+# Cookie с моментом (unix time), до которого клиент читает с основной БД
+PRIMARY_PIN_COOKIE = 'primary_until'
+
+# Псевдоним БД для чтения в текущем запросе (None - основная БД)
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def replica_aliases():
+    """Псевдонимы реплик из настройки DATABASE_REPLICAS"""
+    return tuple(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+def choose_replica():
+    """Случайная реплика или None, если реплик нет"""
+    aliases = replica_aliases()
+    return random.choice(aliases) if aliases else None
+
+
+@contextmanager
+def read_from(alias):
+    """Чтение через роутер внутри блока идет с БД alias (None - с основной)"""
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+def read_from_primary():
+    """До выхода из текущего блока read_from чтение идет с основной БД"""
+    _read_alias.set(None)
+
+
+def current_read_alias():
+    return _read_alias.get()
+
+
+class _PrimaryPins:
+    """
+    Пользователи, которые недавно изменяли данные
+
+    Закрепления хранятся в таблице PrimaryPin основной БД и видны всем воркерам,
+    в том числе для клиентов без cookie. Закрепления, известные процессу,
+    проверяются без запроса к БД.
+    """
+
+    max_entries = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._until = {}
+
+    @staticmethod
+    def _model():
+        # Роутер загружается вместе с настройками БД, до реестра приложений
+        return apps.get_model('api', 'PrimaryPin')
+
+    def pin(self, key, until):
+        model = self._model()
+        model.objects.using(DEFAULT_DB_ALIAS).bulk_create(
+            [model(user_id=key, until=datetime.fromtimestamp(until, tz=timezone.get_default_timezone()))],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=['until'],
+        )
+        with self._lock:
+            self._until[key] = max(until, self._until.get(key, 0))
+            if len(self._until) > self.max_entries:
+                now = time.time()
+                self._until = {key: value for key, value in self._until.items() if value > now}
+
+    def is_pinned(self, key):
+        if self._until.get(key, 0) > time.time():
+            return True
+        return self._model().objects.using(DEFAULT_DB_ALIAS).filter(user_id=key, until__gt=timezone.now()).exists()
+
+
+primary_pins = _PrimaryPins()
+
+
+class ReplicaRouter:
+    """
+    Чтение с реплики внутри read_from(alias), остальное - с основной БД
+
+    Запись всегда идет в основную БД, миграции на реплики не применяются.
+    Реплики задаются настройкой DATABASE_REPLICAS, выбор реплики для запроса -
+    ReplicaReadMixin представлений.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная БД
+        aliases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
@@ -0,0 +1,50 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from api.utils.archive import ARCHIVE_BATCH_SIZE, archive_batch
+from api.utils.status_transitions import STATUS_COMPLETED, get_status
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит проведенные доставки старше срока хранения в архив (DeliveryArchive) пачками. '
+        'Каждая пачка - отдельная транзакция, между пачками делается пауза --sleep, '
+        'поэтому перенос не занимает БД надолго. Прерванный перенос продолжается повторным запуском.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.DELIVERY_ARCHIVE_AFTER_DAYS,
+            help='Архивировать доставки, доставленные раньше стольких дней назад'
+        )
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='Доставок в одной пачке')
+        parser.add_argument('--sleep', type=float, default=0.5, help='Пауза между пачками, секунды')
+        parser.add_argument('--max-batches', type=int, default=0, help='Наибольшее число пачек за запуск (0 - без ограничения)')
+
+    def handle(self, *args, **options):
+        status = get_status(STATUS_COMPLETED)
+        if status is None:
+            raise CommandError(f"Статус '{STATUS_COMPLETED}' не найден в базе данных")
+        before = timezone.now() - timedelta(days=options['days'])
+        self.stdout.write(f'Архивируются доставки со статусом "{status}", доставленные раньше {before:%Y-%m-%d %H:%M}')
+
+        started = time.perf_counter()
+        total = batches = 0
+        while not options['max_batches'] or batches < options['max_batches']:
+            batch_started = time.perf_counter()
+            moved = archive_batch(status, before, options['batch_size'])
+            if not moved:
+                break
+            total += moved
+            batches += 1
+            self.stdout.write(
+                f'Пачка {batches}: перенесено {moved} ({(time.perf_counter() - batch_started) * 1000:.0f} мс), всего {total}'
+            )
+            if moved < options['batch_size']:
+                break
+            time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено в архив: {total} за {time.perf_counter() - started:.1f} с'
+        ))
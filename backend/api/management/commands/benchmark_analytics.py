@@ -0,0 +1,133 @@
+import json
+import math
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Avg, Count, Max, Sum
+from django.db.models import DateField, DateTimeField
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from api.models import Delivery, DeliveryService, DeliveryStatus, TransportModel
+from api.serializers import DeliveryAnalyticsSerializer
+from api.utils.analytics import BUCKET_DAY, BUCKET_HOUR, BUCKETS, DeliveryAnalytics, RollupAnalytics, resolve_bucket
+from api.utils.filters import SERVICES_MATCH_ALL, SERVICES_MATCH_ANY, filter_by_services, filter_date_range
+from api.utils.query_budget import QueryCounter
+from api.utils.reference_cache import reference_cache
+
+
+def legacy_analytics(query, service_ids, bucket=BUCKET_DAY):
+    """Прежний расчет аналитики: шесть отдельных запросов по отфильтрованным доставкам"""
+    output_field = DateTimeField() if bucket == BUCKET_HOUR else DateField()
+    period = Trunc('arrival_datetime', bucket, output_field=output_field)
+    daily_stats = query.annotate(date=period).values('date').annotate(
+        count=Count('id'), total_distance=Sum('distance'), avg_distance=Avg('distance')
+    ).order_by('date')
+    status_stats = query.values('status__name', 'status__color').annotate(count=Count('id')).order_by('-count')
+    transport_stats = query.values('transport_model__name').annotate(count=Count('id')).order_by('-count')
+    service_query = query.filter(services__id__in=service_ids) if service_ids else query
+    service_stats = service_query.values('services__name').annotate(count=Count('id', distinct=True)).order_by('-count')
+    return {
+        'bucket': bucket,
+        'daily_stats': list(daily_stats),
+        'status_stats': list(status_stats),
+        'transport_stats': list(transport_stats),
+        'service_stats': list(service_stats),
+        'total_deliveries': query.count(),
+        'total_distance': query.aggregate(Sum('distance'))['distance__sum'] or 0,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает прежний расчет аналитики (шесть запросов) с расчетом за один проход '
+        '(DeliveryAnalytics) и чтением дневного свода (RollupAnalytics) на типовых фильтрах: '
+        'время, число запросов и совпадение ответа.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Число замеров, берется лучший')
+        parser.add_argument(
+            '--bucket', choices=BUCKETS, default=BUCKET_DAY,
+            help='Интервал временного ряда; в выводе - число точек и размер ответа',
+        )
+
+    def handle(self, *args, **options):
+        total = Delivery.objects.count()
+        if not total:
+            raise CommandError('Нет доставок: заполните базу командой generate_deliveries')
+        self.stdout.write(f'Доставок: {total}')
+
+        latest = Delivery.objects.aggregate(latest=Max('arrival_datetime'))['latest']
+        start = timezone.localtime(latest - timedelta(days=90)).date().isoformat()
+        end = timezone.localtime(latest).date().isoformat()
+        services = [str(pk) for pk in DeliveryService.objects.values_list('pk', flat=True)[:2]]
+        # Справочники читаются в кэш заранее, чтобы не учитывать их загрузку в замерах
+        for model in (DeliveryStatus, TransportModel, DeliveryService):
+            reference_cache.all(model)
+
+        cases = [('без фильтров', None, None, [], SERVICES_MATCH_ANY), ('последние 90 дней', start, end, [], SERVICES_MATCH_ANY)]
+        if services:
+            cases.append(('одна услуга', None, None, services[:1], SERVICES_MATCH_ANY))
+        if len(services) > 1:
+            cases.append(('90 дней, все из двух услуг', start, end, services, SERVICES_MATCH_ALL))
+
+        for title, start_date, end_date, service_ids, match in cases:
+            bucket = resolve_bucket(options['bucket'], start_date, end_date)
+            query = filter_by_services(filter_date_range(Delivery.objects.all(), start_date, end_date), service_ids, match)
+            legacy_ms, legacy_queries, legacy = self._measure(
+                lambda: legacy_analytics(query, service_ids, bucket), options['repeat']
+            )
+            single_ms, single_queries, single = self._measure(
+                lambda: DeliveryAnalytics(query, service_ids, bucket).compute(), options['repeat']
+            )
+            data = DeliveryAnalyticsSerializer(single).data
+            line = (
+                f'{title:<28} {bucket}: точек {len(data["daily_stats"])}, ответ {len(json.dumps(data)) / 1024:.1f} КБ   '
+                f'прежний: {legacy_ms:8.1f} мс, SQL-запросов: {legacy_queries}   '
+                f'один проход: {single_ms:8.1f} мс, SQL-запросов: {single_queries}, '
+                f'x{legacy_ms / single_ms:.1f}, ответ {self._verdict(legacy, single)}'
+            )
+            if RollupAnalytics.supports(service_ids, bucket=bucket):
+                rollup_ms, rollup_queries, rollup = self._measure(
+                    lambda: RollupAnalytics(start_date, end_date, service_ids, bucket).compute(), options['repeat']
+                )
+                line += (
+                    f'   свод: {rollup_ms:7.1f} мс, SQL-запросов: {rollup_queries}, '
+                    f'x{legacy_ms / rollup_ms:.0f}, ответ {self._verdict(legacy, rollup)}'
+                )
+            self.stdout.write(line)
+
+    @staticmethod
+    def _measure(func, repeat):
+        """Лучшее время (мс), число запросов и результат func"""
+        best = None
+        for _ in range(repeat):
+            with QueryCounter() as queries:
+                started = time.perf_counter()
+                result = func()
+                elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best, queries.count, result
+
+    @classmethod
+    def _verdict(cls, legacy, other):
+        return 'совпадает' if cls._same(legacy, other) else 'РАЗЛИЧАЕТСЯ'
+
+    @staticmethod
+    def _same(legacy, single):
+        """Ответы сериализатора совпадают без учета порядка групп с равным числом и погрешности сумм"""
+        legacy = DeliveryAnalyticsSerializer(legacy).data
+        single = DeliveryAnalyticsSerializer(single).data
+        for name in ('status_stats', 'transport_stats', 'service_stats'):
+            if sorted(map(repr, legacy[name])) != sorted(map(repr, single[name])):
+                return False
+        if legacy['bucket'] != single['bucket'] or legacy['total_deliveries'] != single['total_deliveries']:
+            return False
+        if len(legacy['daily_stats']) != len(single['daily_stats']):
+            return False
+        pairs = [(legacy['total_distance'], single['total_distance'])]
+        for left, right in zip(legacy['daily_stats'], single['daily_stats']):
+            if left['date'] != right['date'] or left['count'] != right['count']:
+                return False
+            pairs += [(left['total_distance'], right['total_distance']), (left['avg_distance'], right['avg_distance'])]
+        return all(math.isclose(left, right, rel_tol=1e-9) for left, right in pairs)
@@ -0,0 +1,97 @@
+import random
+import time
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from api.models import DeliveryService, DeliveryStatus, PackageType, TransportModel
+from api.utils.query_budget import QueryCounter
+from api.views import DeliveryViewSet
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает загрузку доставок по одной (POST /api/deliveries/) и пачкой '
+        '(POST /api/deliveries/bulk/): время и число SQL-запросов. '
+        'Все изменения откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, nargs='+', default=[100, 1000, 5000])
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(is_superuser=True).first() or User(username='benchmark', is_superuser=True)
+        references = {
+            'transport_model': [str(pk) for pk in TransportModel.objects.values_list('pk', flat=True)],
+            'package_type': [str(pk) for pk in PackageType.objects.values_list('pk', flat=True)],
+            'status': [str(pk) for pk in DeliveryStatus.objects.values_list('pk', flat=True)],
+            'services': [str(pk) for pk in DeliveryService.objects.values_list('pk', flat=True)],
+        }
+        if not all(references.values()):
+            raise CommandError('Справочники пусты: заполните их перед запуском')
+
+        factory = APIRequestFactory()
+        create_view = DeliveryViewSet.as_view({'post': 'create'})
+        bulk_view = DeliveryViewSet.as_view({'post': 'bulk'})
+
+        def single(payloads):
+            for payload in payloads:
+                request = factory.post('/api/deliveries/', payload, format='json')
+                force_authenticate(request, user=user)
+                response = create_view(request)
+                if response.status_code != 201:
+                    raise CommandError(f'Создание завершилось ошибкой: {response.data}')
+
+        def bulk(payloads):
+            request = factory.post('/api/deliveries/bulk/', {'create': payloads}, format='json')
+            force_authenticate(request, user=user)
+            response = bulk_view(request)
+            if response.status_code != 200 or response.data['errors']:
+                raise CommandError(f'Пакетная загрузка завершилась ошибкой: {response.data}')
+
+        for count in options['count']:
+            payloads = [self._payload(references) for _ in range(count)]
+            single_ms, single_queries = self._measure(single, payloads)
+            bulk_ms, bulk_queries = self._measure(bulk, payloads)
+            self.stdout.write(
+                f'{count:>6} доставок   по одной: {single_ms:9.1f} мс, {single_queries:>6} запросов   '
+                f'пачкой: {bulk_ms:8.1f} мс, {bulk_queries:>4} запросов   '
+                f'ускорение: x{single_ms / bulk_ms:.1f}'
+            )
+
+    @staticmethod
+    def _measure(func, payloads):
+        """Время (мс) и число запросов func; изменения откатываются"""
+        try:
+            with transaction.atomic():
+                with QueryCounter() as queries:
+                    started = time.perf_counter()
+                    func(payloads)
+                    elapsed = (time.perf_counter() - started) * 1000
+                raise _Rollback
+        except _Rollback:
+            pass
+        return elapsed, queries.count
+
+    @staticmethod
+    def _payload(references):
+        departure = timezone.now() - timedelta(hours=random.randint(0, 24 * 365))
+        return {
+            'transport_model': random.choice(references['transport_model']),
+            'transport_number': f'А{random.randint(100, 999)}ВС{random.randint(10, 199)}',
+            'departure_datetime': departure.isoformat(),
+            'arrival_datetime': (departure + timedelta(hours=random.randint(1, 72))).isoformat(),
+            'distance': round(random.uniform(1, 1500), 2),
+            'departure_address': 'Москва, ул. Ленина, д. 1',
+            'arrival_address': 'Тверь, ул. Советская, д. 2',
+            'package_type': random.choice(references['package_type']),
+            'status': random.choice(references['status']),
+            'technical_condition': random.choice(['good', 'bad']),
+            'services': random.sample(references['services'], k=random.randint(0, 2)),
+        }
@@ -0,0 +1,95 @@
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+from api.models import Delivery
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест запущенного сервера (uvicorn/gunicorn): горячие пути чтения '
+        'при разном числе одновременных запросов. Выводит пропускную способность, '
+        'задержки p50/p95 и ускорение - во сколько раз пропускная способность выше, чем '
+        'на первом уровне. Если воркер обрабатывает запросы по одному, ускорение около 1 '
+        'при любом числе запросов. Для оценки одного воркера запускайте сервер с --workers 1.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Адрес сервера')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16], help='Число одновременных запросов')
+        parser.add_argument('--requests', type=int, default=64, help='Запросов на каждый путь и уровень')
+        parser.add_argument('--username', help='Пользователь для JWT, по умолчанию - первый суперпользователь')
+        parser.add_argument('--path', nargs='+', help='Пути для замера, по умолчанию - горячие пути чтения')
+
+    def handle(self, *args, **options):
+        user = (
+            User.objects.filter(username=options['username']).first() if options['username']
+            else User.objects.filter(is_superuser=True).first()
+        )
+        if user is None:
+            raise CommandError('Пользователь не найден: укажите --username или создайте суперпользователя')
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+        paths = options['path'] or self._default_paths()
+        base = options['url'].rstrip('/')
+        for path in paths:
+            self.stdout.write(path)
+            baseline = None
+            for concurrency in options['concurrency']:
+                throughput, line = self._run(base + path, headers, concurrency, options['requests'])
+                baseline = baseline or throughput
+                self.stdout.write(f'  {line}, ускорение x{throughput / baseline:.1f}')
+
+    @staticmethod
+    def _default_paths():
+        paths = ['/api/deliveries/?page_size=20']
+        delivery = Delivery.objects.order_by('-created_at').values_list('pk', flat=True).first()
+        if delivery is not None:
+            paths.append(f'/api/deliveries/{delivery}/')
+        paths += ['/api/statuses/', '/api/transport-models/', '/api/analytics/']
+        return paths
+
+    @staticmethod
+    def _run(url, headers, concurrency, total):
+        """Выполняет total запросов в concurrency потоках: пропускная способность и строка итогов"""
+        latencies, errors = [], []
+        lock = threading.Lock()
+        remaining = iter(range(total))
+
+        def worker():
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                started = time.perf_counter()
+                try:
+                    with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=300) as response:
+                        response.read()
+                except (urllib.error.URLError, OSError) as error:
+                    with lock:
+                        errors.append(error)
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        if not latencies:
+            raise CommandError(f'Все запросы к {url} завершились ошибкой: {errors[0]}')
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        throughput = len(latencies) / wall
+        return throughput, (
+            f'параллельно {concurrency:>3}: {throughput:7.1f} запр/с, '
+            f'p50 {statistics.median(latencies) * 1000:7.1f} мс, p95 {p95 * 1000:7.1f} мс, ошибок {len(errors)}'
+        )
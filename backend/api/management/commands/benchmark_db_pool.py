@@ -0,0 +1,93 @@
+import statistics
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.postgresql.base import DatabaseWrapper as PostgresDatabaseWrapper
+from api.db.postgresql.base import DatabaseWrapper as PooledDatabaseWrapper
+from api.models import DeliveryStatus
+
+BENCHMARK_ALIAS = 'benchmark_db_pool'
+
+
+class Command(BaseCommand):
+    help = (
+        'Задержка обращения к БД в рамках одного HTTP-запроса без пула и с пулом соединений: '
+        'получение соединения, чтение справочника статусов и закрытие (возврат в пул) '
+        'при разном числе одновременных потоков. Для замера через HTTP запустите '
+        'benchmark_concurrency против сервера с DB_POOL_ENABLED=False и True.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16], help='Число одновременных потоков')
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на каждый уровень')
+        parser.add_argument('--pool-size', type=int, help='Размер пула, по умолчанию - из настроек')
+
+    def handle(self, *args, **options):
+        settings_dict = dict(connections['default'].settings_dict, CONN_MAX_AGE=0)
+        pool = dict(settings_dict.get('POOL', {}))
+        if options['pool_size']:
+            pool['MAX_SIZE'] = options['pool_size']
+        settings_dict['POOL'] = pool
+        # Обработчики connection_created (django.contrib.postgres) обращаются к connections[alias]
+        connections.settings[BENCHMARK_ALIAS] = settings_dict
+        query = f'SELECT * FROM {connections["default"].ops.quote_name(DeliveryStatus._meta.db_table)}'
+
+        results = {}
+        for title, wrapper_class in (('без пула', PostgresDatabaseWrapper), ('с пулом', PooledDatabaseWrapper)):
+            for concurrency in options['concurrency']:
+                p50, line = self._run(wrapper_class, settings_dict, query, concurrency, options['requests'])
+                results[title, concurrency] = p50
+                if title == 'с пулом':
+                    line += f', x{results["без пула", concurrency] / p50:.1f} к p50 без пула'
+                self.stdout.write(f'{title:<9} {line}')
+
+        pool = PooledDatabaseWrapper(settings_dict, BENCHMARK_ALIAS).pool
+        stats = pool.stats()
+        self.stdout.write(
+            f'Пул: выдач {stats["checkouts"]}, открыто соединений {stats["connects"]}, '
+            f'ожиданий {stats["waits"]} (в среднем {stats["wait_time_avg_ms"]} мс), отказов {stats["timeouts"]}'
+        )
+        pool.close()
+
+    @staticmethod
+    def _run(wrapper_class, settings_dict, query, concurrency, total):
+        """total обращений в concurrency потоках: p50 (мс) и строка итогов"""
+        latencies = []
+        lock = threading.Lock()
+        remaining = iter(range(total))
+
+        def worker():
+            # Обертка соединения, как и в Django, своя у каждого потока
+            connection = wrapper_class(settings_dict, BENCHMARK_ALIAS)
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        return
+                started = time.perf_counter()
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute(query)
+                        cursor.fetchall()
+                finally:
+                    connection.close()
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - started
+
+        if len(latencies) < total:
+            raise CommandError(f'Часть обращений к БД завершилась ошибкой: {total - len(latencies)} из {total}')
+        latencies.sort()
+        p50 = statistics.median(latencies) * 1000
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+        return p50, (
+            f'параллельно {concurrency:>3}: {len(latencies) / wall:7.1f} обращений/с, '
+            f'p50 {p50:6.2f} мс, p95 {p95:6.2f} мс'
+        )
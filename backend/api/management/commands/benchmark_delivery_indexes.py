@@ -0,0 +1,79 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from api.models import Delivery, DeliveryService, DeliveryStatus, TransportModel
+from api.utils.benchmark import explain, view_queryset
+from api.views import DeliveryViewSet
+
+
+class RollbackBaseline(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает планы запросов списка доставок с индексами Delivery и без них '
+        'для комбинаций фильтров, которые отправляют веб- и мобильный клиенты. '
+        'Индексы удаляются внутри транзакции, которая затем откатывается: команда '
+        'блокирует таблицу на время замера, запускайте ее на копии базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-baseline', action='store_true', help='Не снимать планы без индексов')
+
+    def handle(self, *args, **options):
+        scenarios = self.get_scenarios()
+
+        with_indexes = {label: explain(view_queryset(DeliveryViewSet, qs)) for label, qs in scenarios}
+        without_indexes = {}
+        if not options['no_baseline']:
+            without_indexes = self.explain_without_indexes(scenarios)
+
+        for label, query_string in scenarios:
+            current = with_indexes[label]
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{label}  ?{query_string}'))
+            if label in without_indexes:
+                baseline = without_indexes[label]
+                self.stdout.write(f"  без индексов: {baseline['execution_ms']:9.2f} мс  {baseline['node']}")
+            self.stdout.write(f"  с индексами:  {current['execution_ms']:9.2f} мс  {current['node']}")
+            if options['verbosity'] > 1:
+                self.stdout.write(current['plan'])
+
+    def explain_without_indexes(self, scenarios):
+        result = {}
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                for index in Delivery._meta.indexes:
+                    cursor.execute(f'DROP INDEX IF EXISTS {connection.ops.quote_name(index.name)}')
+                for label, query_string in scenarios:
+                    result[label] = explain(view_queryset(DeliveryViewSet, query_string))
+                raise RollbackBaseline
+        except RollbackBaseline:
+            pass
+        return result
+
+    @staticmethod
+    def get_scenarios():
+        status = DeliveryStatus.objects.order_by('name').values_list('id', flat=True).first()
+        transport = TransportModel.objects.order_by('name').values_list('id', flat=True).first()
+        service = DeliveryService.objects.order_by('name').values_list('id', flat=True).first()
+        today = timezone.localdate()
+        week_ago = today - timedelta(days=7)
+        return [
+            ('Список по умолчанию', ''),
+            ('Статус', f'status={status}'),
+            ('Модель транспорта', f'transport_model={transport}'),
+            ('Статус + модель транспорта', f'status={status}&transport_model={transport}'),
+            ('Даты доставки (неделя)', f'start_date={week_ago}&end_date={today}'),
+            ('Статус + даты', f'status={status}&start_date={week_ago}&end_date={today}'),
+            ('Дистанция', 'min_distance=100&max_distance=110'),
+            ('Длительность', 'min_duration=70'),
+            ('Неисправный транспорт', 'technical_condition=bad'),
+            ('Сортировка по дистанции', 'ordering=-distance'),
+            ('Сортировка по времени доставки', 'ordering=arrival_datetime'),
+            ('Услуги', f'services={service}'),
+            ('Поиск по номеру транспорта', 'search=А123'),
+            ('Поиск по адресу', 'search=Тверь Пушкина'),
+            ('Поиск по адресу + сортировка', 'search=Тверь Пушкина&ordering=-departure_datetime'),
+        ]
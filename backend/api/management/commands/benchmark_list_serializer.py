@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from api.utils.benchmark import build_view, timeit
+from api.utils.fast_serialization import get_values_serializer
+from api.views import DeliveryViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет, что быстрый путь списка доставок (values() + предкомпилированные '
+        'преобразования) отдает тот же JSON, что и DeliveryListSerializer, и сравнивает '
+        'время получения и сериализации страницы. При расхождении завершается с ошибкой.'
+    )
+
+    scenarios = [
+        ('Список по умолчанию', ''),
+        ('Выборочные поля', 'fields=id,transport_number,status_name,departure_datetime'),
+        ('Без услуг', 'omit=services'),
+        ('Поиск', 'search=Тверь'),
+        ('Сортировка по дистанции', 'ordering=-distance'),
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, nargs='+', default=[20, 100, 1000])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--no-timing', action='store_true', help='Только проверка совпадения ответов')
+
+    def handle(self, *args, **options):
+        renderer = JSONRenderer()
+        mismatches = []
+
+        for label, query_string in self.scenarios:
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{label}  ?{query_string}'))
+            view = build_view(DeliveryViewSet, query_string)
+            queryset = view.filter_queryset(view.get_queryset())
+            values_serializer = get_values_serializer(view.get_serializer())
+            if values_serializer is None:
+                raise CommandError(f'Быстрый путь недоступен для сценария «{label}»')
+
+            for page_size in options['page_size']:
+                def serializer_page():
+                    rows = list(queryset[:page_size])
+                    return renderer.render(view.get_serializer(rows, many=True).data)
+
+                def values_page():
+                    rows = values_serializer.prepare(queryset)[:page_size]
+                    return renderer.render(values_serializer.serialize(rows))
+
+                equal = serializer_page() == values_page()
+                if not equal:
+                    mismatches.append(f'{label}, {page_size} строк')
+
+                line = f'  {page_size:>5} строк: {"совпадает" if equal else "РАСХОЖДЕНИЕ"}'
+                if not options['no_timing']:
+                    serializer_ms = timeit(serializer_page, repeat=options['repeat'])
+                    values_ms = timeit(values_page, repeat=options['repeat'])
+                    line += (
+                        f'   сериализатор: {serializer_ms:8.2f} мс   values(): {values_ms:8.2f} мс'
+                        f'   ускорение: x{serializer_ms / values_ms:.1f}'
+                    )
+                self.stdout.write(line)
+
+        if mismatches:
+            raise CommandError('Ответы не совпадают: ' + '; '.join(mismatches))
+        self.stdout.write(self.style.SUCCESS('Ответы быстрого пути совпадают с DeliveryListSerializer'))
@@ -0,0 +1,82 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.test import APIRequestFactory, force_authenticate
+from api.models import Delivery
+from api.utils import rollup
+from api.utils.benchmark import capture_queries, explain_queries
+from api.utils.partitions import MonthlyPartitions
+from api.utils.reference_cache import REFERENCE_MODELS, reference_cache
+from api.utils.status_transitions import STATUS_COMPLETED, allowed_sources, get_status
+from api.views import DeliveryViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'Поиск доставок только по id в секционированной таблице: сколько партиций проверяют '
+        'карточка, завершение, смена статуса, bulk-изменение и чтение вклада в свод (id = ANY) '
+        'и время EXPLAIN ANALYZE их запросов. Для сравнения - поиск по id и времени доставки. '
+        'Все изменения откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100, help='Доставок в пачке')
+        parser.add_argument('--repeat', type=int, default=3, help='Число замеров, берется лучший')
+
+    def handle(self, *args, **options):
+        partitions = MonthlyPartitions(Delivery)
+        if not partitions.is_partitioned():
+            raise CommandError('Таблица доставок не секционирована: примените миграции')
+        target = get_status(STATUS_COMPLETED)
+        if target is None:
+            raise CommandError(f"Статус '{STATUS_COMPLETED}' не найден: заполните справочник перед запуском")
+        count = options['count']
+        # Доставки из разных партиций
+        rows = list(
+            Delivery.objects.filter(status__in=allowed_sources(target))
+            .order_by('?').values_list('pk', 'arrival_datetime')[:count]
+        )
+        if len(rows) < count:
+            raise CommandError(f'Недостаточно доставок в исходных статусах: {len(rows)} из {count}')
+        ids = [str(pk) for pk, _ in rows]
+        pk, arrival = rows[0]
+        user = User.objects.filter(is_superuser=True).first() or User(username='benchmark', is_superuser=True)
+        factory = APIRequestFactory()
+
+        def call(actions, method, path, data=None, **kwargs):
+            request = getattr(factory, method)(path, data, format='json')
+            force_authenticate(request, user=user)
+            response = DeliveryViewSet.as_view(actions)(request, **kwargs)
+            if response.status_code != 200:
+                raise CommandError(f'{path}: {response.status_code} {getattr(response, "data", "")}')
+
+        scenarios = [
+            ('карточка: GET /deliveries/{id}/',
+             lambda: call({'get': 'retrieve'}, 'get', f'/api/deliveries/{pk}/', pk=str(pk))),
+            ('карточка по id и времени доставки',
+             lambda: Delivery.objects.filter(pk=pk, arrival_datetime=arrival).first()),
+            ('завершение: POST /deliveries/{id}/complete/',
+             lambda: call({'post': 'complete'}, 'post', f'/api/deliveries/{pk}/complete/', pk=str(pk))),
+            (f'смена статуса: {count} доставок',
+             lambda: call({'post': 'transition'}, 'post', '/api/deliveries/transition/',
+                          {'ids': ids, 'status': str(target.pk)})),
+            (f'bulk: изменение {count} доставок',
+             lambda: call({'post': 'bulk'}, 'post', '/api/deliveries/bulk/',
+                          {'update': [{'id': delivery_id, 'distance': 1} for delivery_id in ids]})),
+            (f'свод: вклад {count} доставок (id = ANY)',
+             lambda: rollup._read_rows(ids, DEFAULT_DB_ALIAS, lock=True)),
+        ]
+
+        # Справочники загружаются в кэш процесса один раз, до замеров
+        for model in REFERENCE_MODELS:
+            reference_cache.all(model)
+        table = Delivery._meta.db_table
+        total = len(partitions.partitions())
+        self.stdout.write(f'Партиций: {total}')
+        for title, func in scenarios:
+            queries = capture_queries(func, table)
+            elapsed, scanned = explain_queries(queries, table, options['repeat'])
+            self.stdout.write(
+                f'{title:<44} запросов {len(queries):>3}, '
+                f'партиций {len(scanned):>3} из {total}, {elapsed:8.2f} мс'
+            )
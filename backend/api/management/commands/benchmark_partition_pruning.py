@@ -0,0 +1,54 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.utils import timezone
+from api.models import Delivery
+from api.utils.analytics import BUCKET_DAY, SECTIONS, DeliveryAnalytics, DeliveryDistributions
+from api.utils.benchmark import capture_queries, explain_queries, view_queryset
+from api.utils.filters import filter_date_range
+from api.utils.partitions import MonthlyPartitions
+from api.views import DeliveryViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'Проверяет отсечение партиций доставок для списка и аналитики с фильтром по датам: '
+        'сколько партиций читает каждый запрос и время EXPLAIN ANALYZE с отсечением '
+        'и без него (enable_partition_pruning = off).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Число замеров, берется лучший')
+
+    def handle(self, *args, **options):
+        partitions = MonthlyPartitions(Delivery)
+        if not partitions.is_partitioned():
+            raise CommandError('Таблица доставок не секционирована: примените миграции')
+        latest = Delivery.objects.aggregate(latest=Max('arrival_datetime'))['latest']
+        if latest is None:
+            raise CommandError('Нет доставок: заполните базу командой generate_deliveries')
+        table = Delivery._meta.db_table
+        total = len(partitions.partitions())
+        self.stdout.write(f'Партиций: {total}')
+
+        end = timezone.localtime(latest).date()
+        month, quarter = (end - timedelta(days=30)).isoformat(), (end - timedelta(days=90)).isoformat()
+        end = end.isoformat()
+
+        def deliveries(start):
+            return filter_date_range(Delivery.objects.all(), start, end)
+
+        scenarios = [
+            ('список, 30 дней', lambda: list(view_queryset(DeliveryViewSet, f'start_date={month}&end_date={end}'))),
+            ('число строк списка, 30 дней', lambda: deliveries(month).count()),
+            ('аналитика, 90 дней', lambda: DeliveryAnalytics(deliveries(quarter), [], BUCKET_DAY).compute()),
+            ('перцентили и гистограммы, 90 дней', lambda: DeliveryDistributions(deliveries(quarter), SECTIONS).compute()),
+        ]
+        for title, func in scenarios:
+            queries = capture_queries(func, table)
+            pruned_ms, pruned = explain_queries(queries, table, options['repeat'])
+            full_ms, full = explain_queries(queries, table, options['repeat'], pruning=False)
+            self.stdout.write(
+                f'{title:<36} с отсечением: партиций {len(pruned):>3} из {total}, {pruned_ms:8.1f} мс   '
+                f'без отсечения: партиций {len(full):>3}, {full_ms:8.1f} мс   x{full_ms / pruned_ms:.1f}'
+            )
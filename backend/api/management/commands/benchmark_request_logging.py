@@ -0,0 +1,98 @@
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import resolve
+from api.middleware.logging_middleware import LoggingMiddleware
+from api.utils.logger_utils import flush_logs, setup_logging
+
+
+class Command(BaseCommand):
+    help = (
+        'Накладные расходы журнала запросов (LoggingMiddleware) на запрос: прежний текстовый '
+        'журнал с синхронной записью, структурированный JSON с фоновой записью и он же '
+        'с выборкой успешных запросов. Обработчик запроса пустой, записи идут во временные файлы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000, help='Запросов на каждый режим и уровень')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8], help='Число одновременных потоков')
+        parser.add_argument('--sample-rate', type=float, default=0.1, help='Доля успешных запросов в режиме с выборкой')
+
+    def handle(self, *args, **options):
+        path = f'/api/deliveries/{uuid.uuid4()}/'
+        response = HttpResponse(b'{}', content_type='application/json')
+        modes = [
+            ('без журнала', None, 1.0),
+            ('текст, синхронно', False, 1.0),
+            ('JSON, фоновая запись', True, 1.0),
+            (f'JSON, фон, {options["sample_rate"]:.0%} 2xx', True, options['sample_rate']),
+        ]
+        try:
+            with tempfile.TemporaryDirectory() as log_dir, open(f'{log_dir}/stdout.log', 'w') as stream:
+                for concurrency in options['concurrency']:
+                    baseline = None
+                    for title, structured, sample_rate in modes:
+                        if structured is None:
+                            handler = lambda request: response
+                        else:
+                            setup_logging(structured, stream=stream, log_dir=log_dir)
+                            with override_settings(LOG_STRUCTURED=structured, LOG_SUCCESS_SAMPLE_RATE=sample_rate):
+                                handler = LoggingMiddleware(lambda request: response)
+                        latencies, elapsed = self._run(handler, path, concurrency, options['requests'])
+                        # Фоновый поток дописывает очередь после ответа, в задержку запроса это не входит
+                        drain_started = time.perf_counter()
+                        flush_logs()
+                        drain = time.perf_counter() - drain_started
+
+                        mean = statistics.fmean(latencies) * 1e6
+                        p99 = statistics.quantiles(latencies, n=100)[98] * 1e6
+                        line = (
+                            f'потоков {concurrency:>2}  {title:<26} среднее {mean:7.1f} мкс, p99 {p99:7.1f} мкс, '
+                            f'{options["requests"] / elapsed:8.0f} запр/с, дозапись очереди {drain * 1000:6.1f} мс'
+                        )
+                        if baseline is None:
+                            baseline = mean
+                        else:
+                            line += f', журнал +{mean - baseline:.1f} мкс на запрос'
+                        self.stdout.write(line)
+        finally:
+            setup_logging()
+
+    @staticmethod
+    def _run(handler, path, concurrency, total):
+        """total вызовов handler в concurrency потоках: задержки (с) и общее время (с)"""
+        factory = RequestFactory()
+        match = resolve(path)
+        user = User(pk=1, username='benchmark')
+        latencies = []
+        lock = threading.Lock()
+        remaining = iter(range(total))
+
+        def worker():
+            local = []
+            while True:
+                with lock:
+                    if next(remaining, None) is None:
+                        break
+                request = factory.get(path)
+                request.resolver_match = match
+                request.user = user
+                started = time.perf_counter()
+                handler(request)
+                local.append(time.perf_counter() - started)
+            with lock:
+                latencies.extend(local)
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, time.perf_counter() - started
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from api.models import Delivery, DeliveryService
+from api.utils.benchmark import explain, timeit
+from api.utils.filters import SERVICES_MATCH_ALL, SERVICES_MATCH_ANY, filter_by_services
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает фильтр по услугам: прежний JOIN + DISTINCT и полусоединение EXISTS '
+        'в режимах any/all. Для каждого варианта измеряется первая страница списка и COUNT.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, nargs='+', default=[1, 2, 3],
+                            help='Сколько услуг передавать в фильтр (можно несколько значений)')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        all_ids = list(DeliveryService.objects.order_by('name').values_list('id', flat=True))
+        page_size, repeat = options['page_size'], options['repeat']
+        base = Delivery.objects.order_by('-departure_datetime', '-id')
+
+        variants = [
+            ('JOIN + DISTINCT (прежний)', lambda ids: base.filter(services__id__in=ids).distinct()),
+            ('EXISTS, любая из услуг', lambda ids: filter_by_services(base, ids, SERVICES_MATCH_ANY)),
+            ('EXISTS, все услуги', lambda ids: filter_by_services(base, ids, SERVICES_MATCH_ALL)),
+        ]
+
+        for count in options['services']:
+            ids = all_ids[:count]
+            self.stdout.write(self.style.MIGRATE_HEADING(f'Услуг в фильтре: {len(ids)}'))
+            for label, build in variants:
+                queryset = build(ids)
+                page = explain(queryset[:page_size])
+                count_ms = timeit(lambda: queryset.count(), repeat=repeat)
+                self.stdout.write(
+                    f"  {label:<28} страница: {page['execution_ms']:9.2f} мс   "
+                    f"COUNT: {count_ms:9.2f} мс   {page['node']}"
+                )
+                if options['verbosity'] > 1:
+                    self.stdout.write(page['plan'])
@@ -0,0 +1,78 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+from api.models import Delivery
+from api.utils.query_budget import QueryCounter
+from api.utils.status_transitions import STATUS_COMPLETED, allowed_sources, get_status
+from api.views import DeliveryViewSet
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает завершение доставок по одной (POST /api/deliveries/{id}/complete/) '
+        'и пачкой (POST /api/deliveries/transition/): время и число SQL-запросов. '
+        'Все изменения откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, nargs='+', default=[100, 1000, 5000])
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(is_superuser=True).first() or User(username='benchmark', is_superuser=True)
+        target = get_status(STATUS_COMPLETED)
+        if target is None:
+            raise CommandError(f"Статус '{STATUS_COMPLETED}' не найден: заполните справочник перед запуском")
+        sources = [status.pk for status in allowed_sources(target)]
+        if not sources:
+            raise CommandError(f"Нет статусов, из которых допускается переход в '{STATUS_COMPLETED}'")
+
+        factory = APIRequestFactory()
+        complete_view = DeliveryViewSet.as_view({'post': 'complete'})
+        transition_view = DeliveryViewSet.as_view({'post': 'transition'})
+
+        def single(ids):
+            for pk in ids:
+                request = factory.post(f'/api/deliveries/{pk}/complete/')
+                force_authenticate(request, user=user)
+                response = complete_view(request, pk=pk)
+                if response.status_code != 200:
+                    raise CommandError(f'Завершение завершилось ошибкой: {response.data}')
+
+        def bulk(ids):
+            request = factory.post('/api/deliveries/transition/', {'ids': ids, 'status': str(target.pk)}, format='json')
+            force_authenticate(request, user=user)
+            response = transition_view(request)
+            if response.status_code != 200 or len(response.data['changed']) != len(ids):
+                raise CommandError(f'Смена статуса завершилась ошибкой: {response.data}')
+
+        for count in options['count']:
+            ids = [str(pk) for pk in Delivery.objects.filter(status__in=sources).values_list('pk', flat=True)[:count]]
+            if len(ids) < count:
+                raise CommandError(f'Недостаточно доставок в исходных статусах: {len(ids)} из {count}')
+            single_ms, single_queries = self._measure(single, ids)
+            bulk_ms, bulk_queries = self._measure(bulk, ids)
+            self.stdout.write(
+                f'{count:>6} доставок   по одной: {single_ms:9.1f} мс, {single_queries:>6} запросов   '
+                f'пачкой: {bulk_ms:8.1f} мс, {bulk_queries:>4} запросов   '
+                f'ускорение: x{single_ms / bulk_ms:.1f}'
+            )
+
+    @staticmethod
+    def _measure(func, ids):
+        """Время (мс) и число запросов func; изменения откатываются"""
+        try:
+            with transaction.atomic():
+                with QueryCounter() as queries:
+                    started = time.perf_counter()
+                    func(ids)
+                    elapsed = (time.perf_counter() - started) * 1000
+                raise _Rollback
+        except _Rollback:
+            pass
+        return elapsed, queries.count
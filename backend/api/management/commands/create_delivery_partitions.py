@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from api.models import Delivery
+from api.utils.partitions import PARTITIONS_AHEAD_MONTHS, MonthlyPartitions, add_months, month_start, partition_name
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает помесячные партиции доставок заранее: на текущий месяц и --months месяцев вперед. '
+        'Строки, попавшие в партицию по умолчанию, переносятся в партиции своих месяцев. '
+        'Запускайте периодически (например, раз в сутки из cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months', type=int, default=PARTITIONS_AHEAD_MONTHS, help='На сколько месяцев вперед создавать партиции'
+        )
+
+    def handle(self, *args, **options):
+        partitions = MonthlyPartitions(Delivery)
+        if not partitions.is_partitioned():
+            raise CommandError('Таблица доставок не секционирована: примените миграции')
+
+        current = month_start(timezone.localdate())
+        months = {add_months(current, offset) for offset in range(options['months'] + 1)}
+        months.update(partitions.default_months())
+        for month in sorted(months):
+            moved = partitions.create(month)
+            if moved is not None:
+                self.stdout.write(f'Создана партиция {partition_name(partitions.table, month)}, перенесено строк: {moved}')
+        self.stdout.write(self.style.SUCCESS(f'Партиций доставок: {len(partitions.partitions())}'))
@@ -0,0 +1,123 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from api.models import Delivery, DeliveryService, DeliveryStatus, PackageType, TransportModel
+from api.utils import rollup
+
+DEFAULT_REFERENCES = {
+    TransportModel: ['Газель', 'Камаз', 'МАЗ', 'Валдай', 'Volvo FH'],
+    PackageType: ['Коробка', 'Паллета', 'Контейнер', 'Пакет'],
+    DeliveryService: ['Экспресс-доставка', 'Страховка', 'СМС-уведомление', 'Погрузка', 'Хрупкий груз'],
+}
+DEFAULT_STATUSES = [('В ожидании', '#FFFF00'), ('В пути', '#2196F3'), ('Проведено', '#00FF00')]
+# Адреса собираются из случайных городов и улиц, чтобы поиск по ним был избирательным
+ADDRESS_CITIES = [
+    'Москва', 'Санкт-Петербург', 'Новосибирск', 'Екатеринбург', 'Казань', 'Нижний Новгород',
+    'Челябинск', 'Самара', 'Омск', 'Ростов-на-Дону', 'Уфа', 'Красноярск', 'Воронеж', 'Пермь',
+    'Волгоград', 'Краснодар', 'Тверь', 'Тула', 'Ярославль', 'Калининград',
+]
+ADDRESS_STREETS = [
+    'Ленина', 'Пушкина', 'Гагарина', 'Складская', 'Приемная', 'Садовая', 'Лесная', 'Советская',
+    'Мира', 'Заводская', 'Набережная', 'Молодежная', 'Лермонтова', 'Чехова', 'Победы',
+    'Кирова', 'Строителей', 'Транспортная', 'Логистическая', 'Промышленная',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Генерирует синтетические доставки для нагрузочного тестирования и бенчмарков. '
+        'Строки создаются на стороне PostgreSQL через generate_series, пачками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100_000, help='Количество доставок')
+        parser.add_argument('--batch', type=int, default=200_000, help='Размер пачки INSERT')
+        parser.add_argument('--days', type=int, default=730, help='Глубина истории в днях')
+
+    def handle(self, *args, **options):
+        references = {model: self._ensure_references(model, names) for model, names in DEFAULT_REFERENCES.items()}
+        for name, color in DEFAULT_STATUSES:
+            DeliveryStatus.objects.get_or_create(name=name, defaults={'color': color})
+        statuses = [str(pk) for pk in DeliveryStatus.objects.values_list('id', flat=True)]
+
+        delivery_table = Delivery._meta.db_table
+        through = Delivery.services.through
+        count, batch, days = options['count'], options['batch'], options['days']
+
+        created = 0
+        while created < count:
+            size = min(batch, count - created)
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(
+                    """
+                    CREATE TEMP TABLE generated_ids ON COMMIT DROP AS
+                    WITH rows AS (
+                        SELECT gen_random_uuid() AS id,
+                               now() - (random() * %(days)s) * interval '1 day' AS departure
+                        FROM generate_series(1, %(size)s)
+                    )
+                    SELECT * FROM rows
+                    """,
+                    {'days': days, 'size': size},
+                )
+                cursor.execute(
+                    f"""
+                    INSERT INTO {delivery_table} (
+                        id, created_at, updated_at, transport_model_id, transport_number,
+                        departure_datetime, arrival_datetime, distance, departure_address,
+                        arrival_address, media_file, package_type_id, status_id, technical_condition
+                    )
+                    SELECT g.id, g.departure, g.departure,
+                           (%(transport)s::uuid[])[1 + floor(random() * %(transport_n)s)::int],
+                           'А' || lpad((floor(random() * 1000))::text, 3, '0') || 'ВС' || (10 + floor(random() * 190))::int,
+                           g.departure,
+                           g.departure + (0.5 + random() * 72) * interval '1 hour',
+                           round((1 + random() * 1500)::numeric, 2)::float,
+                           (%(cities)s::text[])[1 + floor(random() * %(cities_n)s)::int] || ', ул. '
+                               || (%(streets)s::text[])[1 + floor(random() * %(streets_n)s)::int]
+                               || ', д. ' || (1 + floor(random() * 200))::int,
+                           (%(cities)s::text[])[1 + floor(random() * %(cities_n)s)::int] || ', ул. '
+                               || (%(streets)s::text[])[1 + floor(random() * %(streets_n)s)::int]
+                               || ', д. ' || (1 + floor(random() * 200))::int,
+                           NULL,
+                           (%(package)s::uuid[])[1 + floor(random() * %(package_n)s)::int],
+                           (%(status)s::uuid[])[1 + floor(random() * %(status_n)s)::int],
+                           CASE WHEN random() < 0.05 THEN 'bad' ELSE 'good' END
+                    FROM generated_ids g
+                    """,
+                    {
+                        'transport': references[TransportModel], 'transport_n': len(references[TransportModel]),
+                        'package': references[PackageType], 'package_n': len(references[PackageType]),
+                        'status': statuses, 'status_n': len(statuses),
+                        'cities': ADDRESS_CITIES, 'cities_n': len(ADDRESS_CITIES),
+                        'streets': ADDRESS_STREETS, 'streets_n': len(ADDRESS_STREETS),
+                    },
+                )
+                # Каждая доставка получает от 0 до 2 случайных услуг
+                cursor.execute(
+                    f"""
+                    INSERT INTO {through._meta.db_table} (delivery_id, deliveryservice_id)
+                    SELECT DISTINCT g.id, (%(services)s::uuid[])[1 + floor(random() * %(services_n)s)::int]
+                    FROM generated_ids g
+                    CROSS JOIN LATERAL generate_series(
+                        1, CASE WHEN g.id IS NULL THEN 0 ELSE floor(random() * 3)::int END
+                    ) AS s
+                    """,
+                    {'services': references[DeliveryService], 'services_n': len(references[DeliveryService])},
+                )
+            created += size
+            self.stdout.write(f'Создано доставок: {created}/{count}')
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {delivery_table}')
+            cursor.execute(f'ANALYZE {through._meta.db_table}')
+
+        # Строки вставлены в обход сигналов, поэтому дневной свод аналитики пересобирается целиком
+        self.stdout.write('Пересборка дневного свода аналитики...')
+        rollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Готово: {count} доставок'))
+
+    @staticmethod
+    def _ensure_references(model, names):
+        for name in names:
+            model.objects.get_or_create(name=name)
+        return [str(pk) for pk in model.objects.values_list('id', flat=True)]
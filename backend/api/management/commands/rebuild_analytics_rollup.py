@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from api.utils import rollup
+from api.utils.filters import parse_date
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает дневной свод аналитики (DeliveryDailyRollup) по доставкам пачками дней. '
+        'Каждая пачка - отдельная транзакция: прерванную пересборку можно продолжить с --start-date.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', help='Первый день (YYYY-MM-DD), по умолчанию - самая ранняя доставка')
+        parser.add_argument('--end-date', help='Последний день (YYYY-MM-DD), по умолчанию - самая поздняя доставка')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Дней в одной пачке')
+
+    def handle(self, *args, **options):
+        start = parse_date(options['start_date']) if options['start_date'] else None
+        end = parse_date(options['end_date']) if options['end_date'] else None
+        started = time.perf_counter()
+
+        def progress(first, last):
+            self.stdout.write(f'Пересчитаны дни {first} - {last}')
+
+        rollup.rebuild(start, end, chunk_days=options['chunk_days'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f'Свод пересобран за {time.perf_counter() - started:.1f} с'))
@@ -1,22 +1,86 @@
+import random
+import re
 import time
-from api.utils.logger_utils import logger
+from contextlib import ExitStack
+from functools import lru_cache
+from django.conf import settings
+from django.db import connections
+from api.utils.logger_utils import log_record, logger
+from api.utils.server_timing import reported_timing
+
+
+@lru_cache(maxsize=512)
+def _route_template(route):
+    """Шаблон пути из маршрута URL: '/api/deliveries/{pk}/' вместо регулярного выражения"""
+    template = re.sub(r'\(\?P<(\w+)>[^)]*\)', r'{\1}', route)
+    template = re.sub(r'<(?:\w+:)?(\w+)>', r'{\1}', template)
+    template = template.replace('^', '').replace('$', '').replace('/?', '').replace('\\', '')
+    return '/' + template
+
+
+class _QueryCounter:
+    """Обертка выполнения SQL (connection.execute_wrapper), считающая запросы"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
 
 
 class LoggingMiddleware:
+    """
+    Журнал запросов: метод, шаблон пути, статус, длительность, пользователь и число SQL-запросов
+
+    Для запросов с заголовком Server-Timing (ServerTimingMiddleware) добавляются его замеры.
+    Успешные (2xx) запросы записываются с долей LOG_SUCCESS_SAMPLE_RATE, остальные - всегда.
+    При LOG_STRUCTURED поля ставятся в очередь фоновой записи (log_record)
+    и записываются строкой JSON.
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.structured = settings.LOG_STRUCTURED
+        self.sample_rate = settings.LOG_SUCCESS_SAMPLE_RATE
 
     def __call__(self, request):
-        start_time = time.time()
+        start_time = time.perf_counter()
+
+        # Запросы считаются во всех БД: чтение может идти с реплики
+        queries = _QueryCounter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
 
-        response = self.get_response(request)
+        duration = time.perf_counter() - start_time
+        if 200 <= response.status_code < 300 and self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return response
 
-        duration = time.time() - start_time
-        logger.info(
-            f"Запрос: {request.method} {request.path} - "
-            f"Статус: {response.status_code} - "
-            f"Длительность: {duration:.2f}s - "
-            f"Пользователь: {request.user}"
-        )
+        user = getattr(request, 'user', None)
+        timing = reported_timing(request)
+        if self.structured:
+            match = request.resolver_match
+            fields = {
+                "method": request.method,
+                "path": _route_template(match.route) if match is not None else None,
+                "status": response.status_code,
+                "duration_ms": round(duration * 1000, 2),
+                "user_id": user.pk if user is not None and user.is_authenticated else None,
+                "queries": queries.count,
+            }
+            if timing is not None:
+                fields["timing"] = timing.as_fields()
+            log_record("INFO", "request", fields, name=__name__)
+        else:
+            logger.info(
+                f"Запрос: {request.method} {request.path} - "
+                f"Статус: {response.status_code} - "
+                f"Длительность: {duration:.2f}s - "
+                f"Пользователь: {user} - "
+                f"SQL-запросов: {queries.count}"
+                + (f" - Server-Timing: {timing.header()}" if timing is not None else "")
+            )
 
-        return response
\ No newline at end of file
+        return response
@@ -0,0 +1,17 @@
+from api.utils.reference_cache import reference_cache
+
+
+class ReferenceCacheMiddleware:
+    """
+    Сверка кэша справочников с изменениями других воркеров в начале запроса
+
+    Один запрос к ReferenceVersion: снимки справочников, измененных другими процессами,
+    сбрасываются до того, как представление проверит по ним pk или посчитает ETag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reference_cache.sync()
+        return self.get_response(request)
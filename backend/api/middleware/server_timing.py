@@ -0,0 +1,44 @@
+import time
+from contextlib import ExitStack
+from django.db import connections
+from api.utils.server_timing import activate, deactivate, reported_timing, start_timing
+
+
+class ServerTimingMiddleware:
+    """
+    Заголовок Server-Timing: время SQL-запросов, аутентификации, сериализации и рендеринга
+
+    Отдается персоналу (SERVER_TIMING_STAFF) и доле запросов SERVER_TIMING_SAMPLE_RATE.
+    Стоит перед LoggingMiddleware, чтобы журнал запросов получил те же замеры.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timing = start_timing()
+        if timing is None:
+            return self.get_response(request)
+
+        request.server_timing = timing
+        token = activate(timing)
+        try:
+            # SQL-запросы замеряются во всех БД: чтение может идти с реплики
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timing))
+                response = self.get_response(request)
+        finally:
+            deactivate(token)
+
+        if reported_timing(request) is not None:
+            response['Server-Timing'] = timing.header()
+        return response
+
+    def process_template_response(self, request, response):
+        """Рендеринг ответов DRF идет сразу после этого хука и заканчивается post-render callback"""
+        timing = getattr(request, 'server_timing', None)
+        if timing is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: timing.add('render', time.perf_counter() - started))
+        return response
@@ -0,0 +1,64 @@
+# Generated by Django 5.0.4 on 2026-10-18 10:15
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Индексы строятся CONCURRENTLY, чтобы не блокировать запись в таблицу доставок
+    atomic = False
+
+    dependencies = [
+        ('api', '0002_remove_deliverystatus_code_alter_deliverystatus_name'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='delivery',
+            index=models.Index(fields=['-departure_datetime', '-id'], name='delivery_departure_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='delivery',
+            index=models.Index(fields=['status', '-departure_datetime'], name='delivery_status_departure_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='delivery',
+            index=models.Index(fields=['transport_model', '-departure_datetime'], name='delivery_transport_dep_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='delivery',
+            index=models.Index(fields=['package_type', '-departure_datetime'], name='delivery_package_dep_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='delivery',
+            index=models.Index(fields=['arrival_datetime', 'id'], name='delivery_arrival_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='delivery',
+            index=models.Index(fields=['distance', 'id'], name='delivery_distance_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='delivery',
+            index=models.Index(fields=['created_at', 'id'], name='delivery_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='delivery',
+            index=models.Index(condition=models.Q(('technical_condition', 'bad')), fields=['-departure_datetime'], name='delivery_bad_condition_idx'),
+        ),
+        migrations.AlterField(
+            model_name='delivery',
+            name='package_type',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='deliveries', to='api.packagetype', verbose_name='Тип упаковки'),
+        ),
+        migrations.AlterField(
+            model_name='delivery',
+            name='status',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='deliveries', to='api.deliverystatus', verbose_name='Статус доставки'),
+        ),
+        migrations.AlterField(
+            model_name='delivery',
+            name='transport_model',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='deliveries', to='api.transportmodel', verbose_name='Модель транспорта'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.0.4 on 2026-10-18 10:17
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.datetime
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api', '0003_delivery_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='delivery',
+            name='duration',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast(django.db.models.functions.datetime.Extract(models.ExpressionWrapper(django.db.models.expressions.CombinedExpression(models.F('arrival_datetime'), '-', models.F('departure_datetime')), output_field=models.DurationField()), 'epoch'), output_field=models.FloatField()), '/', models.Value(3600.0)), output_field=models.FloatField(), verbose_name='Длительность (ч)'),
+        ),
+        AddIndexConcurrently(
+            model_name='delivery',
+            index=models.Index(fields=['duration', 'id'], name='delivery_duration_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # Индекс на автоматически созданной промежуточной таблице M2M нельзя описать
+    # через Meta.indexes, поэтому он создается SQL. Строится CONCURRENTLY.
+    atomic = False
+
+    dependencies = [
+        ('api', '0004_delivery_duration'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS delivery_services_service_idx '
+                'ON api_delivery_services (deliveryservice_id, delivery_id)'
+            ),
+            reverse_sql='DROP INDEX CONCURRENTLY IF EXISTS delivery_services_service_idx',
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.4 on 2026-10-18 10:26
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently, TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api', '0005_delivery_services_service_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='delivery',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('departure_address', 'arrival_address', config='russian'), output_field=django.contrib.postgres.search.SearchVectorField(), verbose_name='Поисковый вектор адресов'),
+        ),
+        AddIndexConcurrently(
+            model_name='delivery',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('transport_number'), name='gin_trgm_ops'), name='delivery_number_trgm_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='delivery',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='delivery_search_vector_idx'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.0.4 on 2026-10-18 12:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_rollup(apps, schema_editor):
+    """Первичное заполнение свода по уже существующим доставкам одним запросом"""
+    schema_editor.execute(
+        """
+        INSERT INTO api_deliverydailyrollup (
+            day, status_id, transport_model_id, service_id,
+            count, distance_sum, duration_sum, without_services_count
+        )
+        WITH d AS MATERIALIZED (
+            SELECT id, (arrival_datetime AT TIME ZONE %s)::date AS day,
+                   status_id, transport_model_id, distance, duration
+            FROM api_delivery
+        ),
+        without_services AS (
+            SELECT day, status_id, transport_model_id, COUNT(*) AS count
+            FROM d
+            WHERE NOT EXISTS (SELECT 1 FROM api_delivery_services t WHERE t.delivery_id = d.id)
+            GROUP BY day, status_id, transport_model_id
+        )
+        SELECT g.day, g.status_id, g.transport_model_id, NULL,
+               g.count, g.distance_sum, g.duration_sum, COALESCE(w.count, 0)
+        FROM (
+            SELECT day, status_id, transport_model_id,
+                   COUNT(*) AS count, SUM(distance) AS distance_sum, SUM(duration) AS duration_sum
+            FROM d
+            GROUP BY day, status_id, transport_model_id
+        ) g
+        LEFT JOIN without_services w USING (day, status_id, transport_model_id)
+        UNION ALL
+        SELECT d.day, d.status_id, d.transport_model_id, t.deliveryservice_id,
+               COUNT(*), SUM(d.distance), SUM(d.duration), 0
+        FROM d JOIN api_delivery_services t ON t.delivery_id = d.id
+        GROUP BY d.day, d.status_id, d.transport_model_id, t.deliveryservice_id
+        """,
+        params=[settings.TIME_ZONE],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_delivery_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День доставки')),
+                ('count', models.IntegerField(verbose_name='Количество доставок')),
+                ('distance_sum', models.FloatField(verbose_name='Сумма дистанций (км)')),
+                ('duration_sum', models.FloatField(verbose_name='Сумма длительностей (ч)')),
+                ('without_services_count', models.IntegerField(default=0, verbose_name='Доставок без услуг')),
+                ('service', models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.deliveryservice', verbose_name='Услуга')),
+                ('status', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.deliverystatus', verbose_name='Статус доставки')),
+                ('transport_model', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.transportmodel', verbose_name='Модель транспорта')),
+            ],
+            options={
+                'verbose_name': 'Дневной свод доставок',
+                'verbose_name_plural': 'Дневные своды доставок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='deliverydailyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('service__isnull', True)), fields=('day', 'status', 'transport_model'), name='rollup_day_total_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='deliverydailyrollup',
+            constraint=models.UniqueConstraint(condition=models.Q(('service__isnull', False)), fields=('day', 'service', 'status', 'transport_model'), name='rollup_day_service_uniq'),
+        ),
+        migrations.RunPython(populate_rollup, migrations.RunPython.noop),
+    ]
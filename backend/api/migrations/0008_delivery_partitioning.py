@@ -0,0 +1,175 @@
+from datetime import date, datetime
+
+from django.db import migrations
+from django.utils import timezone
+
+# Партиции создаются до месяца текущая дата + PARTITIONS_AHEAD_MONTHS
+PARTITIONS_AHEAD_MONTHS = 3
+
+# Связь доставки с услугами: внешний ключ на секционированную таблицу невозможен
+# (уникальный ключ обязан включать колонку секционирования), поэтому ссылочная
+# целостность проверяется триггерами уровня оператора
+THROUGH_INTEGRITY_SQL = """
+CREATE FUNCTION api_delivery_services_check_insert() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM new_rows n
+        WHERE NOT EXISTS (SELECT 1 FROM api_delivery d WHERE d.id = n.delivery_id)
+    ) THEN
+        RAISE EXCEPTION 'insert or update on table "api_delivery_services" violates foreign key to "api_delivery"'
+            USING ERRCODE = 'foreign_key_violation';
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER api_delivery_services_check_insert
+    AFTER INSERT ON api_delivery_services REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION api_delivery_services_check_insert();
+
+CREATE TRIGGER api_delivery_services_check_update
+    AFTER UPDATE ON api_delivery_services REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION api_delivery_services_check_insert();
+
+CREATE FUNCTION api_delivery_check_delete() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM old_rows o JOIN api_delivery_services t ON t.delivery_id = o.id
+        WHERE NOT EXISTS (SELECT 1 FROM api_delivery d WHERE d.id = o.id)
+    ) THEN
+        RAISE EXCEPTION 'update or delete on table "api_delivery" violates foreign key from "api_delivery_services"'
+            USING ERRCODE = 'foreign_key_violation';
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER api_delivery_check_delete
+    AFTER DELETE ON api_delivery REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION api_delivery_check_delete();
+"""
+
+DROP_THROUGH_INTEGRITY_SQL = """
+DROP TRIGGER IF EXISTS api_delivery_check_delete ON api_delivery;
+DROP FUNCTION IF EXISTS api_delivery_check_delete();
+DROP TRIGGER IF EXISTS api_delivery_services_check_insert ON api_delivery_services;
+DROP TRIGGER IF EXISTS api_delivery_services_check_update ON api_delivery_services;
+DROP FUNCTION IF EXISTS api_delivery_services_check_insert();
+"""
+
+# Внешние ключи старой таблицы переносятся на новую с теми же именами
+COPY_FOREIGN_KEYS_SQL = """
+DO $$
+DECLARE
+    constraint_row record;
+BEGIN
+    FOR constraint_row IN
+        SELECT conname, pg_get_constraintdef(oid) AS definition
+        FROM pg_constraint WHERE conrelid = '{source}'::regclass AND contype = 'f'
+    LOOP
+        EXECUTE format('ALTER TABLE {target} ADD CONSTRAINT %I %s', constraint_row.conname, constraint_row.definition);
+    END LOOP;
+END;
+$$;
+"""
+
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _copy_rows(schema_editor, Delivery, source, target):
+    # Генерируемые колонки (duration, search_vector) пересчитываются самой БД
+    columns = ', '.join(
+        schema_editor.quote_name(field.column)
+        for field in Delivery._meta.concrete_fields
+        if not getattr(field, 'generated', False)
+    )
+    schema_editor.execute(f'INSERT INTO {target} ({columns}) SELECT {columns} FROM {source}')
+
+
+def _create_indexes(schema_editor, Delivery):
+    for index in Delivery._meta.indexes:
+        schema_editor.add_index(Delivery, index)
+
+
+def partition_deliveries(apps, schema_editor):
+    """
+    Переводит api_delivery в таблицу, секционированную по месяцам arrival_datetime
+
+    Первичный ключ становится (id, arrival_datetime), внешний ключ из api_delivery_services
+    заменяется триггерами. Партиции создаются на весь период данных и PARTITIONS_AHEAD_MONTHS
+    месяцев вперед, строки вне них попадают в api_delivery_default.
+    """
+    Delivery = apps.get_model('api', 'Delivery')
+    execute = schema_editor.execute
+
+    execute('ALTER TABLE api_delivery RENAME TO api_delivery_unpartitioned')
+    execute(
+        'CREATE TABLE api_delivery (LIKE api_delivery_unpartitioned INCLUDING DEFAULTS INCLUDING GENERATED) '
+        'PARTITION BY RANGE (arrival_datetime)'
+    )
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT MIN(arrival_datetime), MAX(arrival_datetime) FROM api_delivery_unpartitioned')
+        first, last = cursor.fetchone()
+    today = timezone.localdate()
+    month = _month_start(timezone.localtime(first).date() if first else today)
+    end = _add_months(_month_start(today), PARTITIONS_AHEAD_MONTHS)
+    if last is not None:
+        end = max(end, _month_start(timezone.localtime(last).date()))
+    while month <= end:
+        execute(
+            f'CREATE TABLE api_delivery_p{month:%Y_%m} PARTITION OF api_delivery FOR VALUES FROM (%s) TO (%s)',
+            [
+                timezone.make_aware(datetime(month.year, month.month, 1)),
+                timezone.make_aware(datetime.combine(_add_months(month, 1), datetime.min.time())),
+            ],
+        )
+        month = _add_months(month, 1)
+    execute('CREATE TABLE api_delivery_default PARTITION OF api_delivery DEFAULT')
+
+    _copy_rows(schema_editor, Delivery, 'api_delivery_unpartitioned', 'api_delivery')
+    execute(COPY_FOREIGN_KEYS_SQL.format(source='api_delivery_unpartitioned', target='api_delivery'), None)
+    # Вместе со старой таблицей удаляется внешний ключ из api_delivery_services
+    execute('DROP TABLE api_delivery_unpartitioned CASCADE')
+    execute('ALTER TABLE api_delivery ADD CONSTRAINT api_delivery_pkey PRIMARY KEY (id, arrival_datetime)')
+    _create_indexes(schema_editor, Delivery)
+    execute(THROUGH_INTEGRITY_SQL)
+    execute('ANALYZE api_delivery')
+
+
+def unpartition_deliveries(apps, schema_editor):
+    """Возвращает обычную таблицу api_delivery с первичным ключом id и внешним ключом из услуг"""
+    Delivery = apps.get_model('api', 'Delivery')
+    execute = schema_editor.execute
+
+    execute(DROP_THROUGH_INTEGRITY_SQL)
+    execute('ALTER TABLE api_delivery RENAME TO api_delivery_partitioned')
+    execute('CREATE TABLE api_delivery (LIKE api_delivery_partitioned INCLUDING DEFAULTS INCLUDING GENERATED)')
+    _copy_rows(schema_editor, Delivery, 'api_delivery_partitioned', 'api_delivery')
+    execute(COPY_FOREIGN_KEYS_SQL.format(source='api_delivery_partitioned', target='api_delivery'), None)
+    execute('DROP TABLE api_delivery_partitioned CASCADE')
+    execute('ALTER TABLE api_delivery ADD CONSTRAINT api_delivery_pkey PRIMARY KEY (id)')
+    _create_indexes(schema_editor, Delivery)
+    execute(
+        'ALTER TABLE api_delivery_services ADD CONSTRAINT api_delivery_services_delivery_id_e6a25d83_fk_api_delivery_id '
+        'FOREIGN KEY (delivery_id) REFERENCES api_delivery (id) DEFERRABLE INITIALLY DEFERRED'
+    )
+    execute('ANALYZE api_delivery')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_delivery_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_deliveries, unpartition_deliveries),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.4 on 2026-10-18 13:17
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_delivery_partitioning'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryArchive',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('transport_number', models.CharField(max_length=50, verbose_name='Номер транспорта')),
+                ('departure_datetime', models.DateTimeField(verbose_name='Время отправки')),
+                ('arrival_datetime', models.DateTimeField(verbose_name='Время доставки')),
+                ('duration', models.FloatField(verbose_name='Длительность (ч)')),
+                ('distance', models.FloatField(verbose_name='Дистанция (км)')),
+                ('departure_address', models.CharField(blank=True, max_length=255, null=True, verbose_name='Адрес отправки')),
+                ('arrival_address', models.CharField(blank=True, max_length=255, null=True, verbose_name='Адрес доставки')),
+                ('media_file', models.FileField(blank=True, null=True, upload_to='delivery_files/%Y/%m/%d/', verbose_name='Медиафайл')),
+                ('services', django.contrib.postgres.fields.ArrayField(base_field=models.UUIDField(), blank=True, default=list, size=None, verbose_name='Услуги')),
+                ('technical_condition', models.CharField(max_length=10, verbose_name='Техническое состояние')),
+                ('created_at', models.DateTimeField(verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(verbose_name='Дата обновления')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата архивации')),
+                ('package_type', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.packagetype', verbose_name='Тип упаковки')),
+                ('status', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.deliverystatus', verbose_name='Статус доставки')),
+                ('transport_model', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='api.transportmodel', verbose_name='Модель транспорта')),
+            ],
+            options={
+                'verbose_name': 'Архивная доставка',
+                'verbose_name_plural': 'Архивные доставки',
+                'indexes': [models.Index(fields=['arrival_datetime'], name='delivery_archive_arrival_idx')],
+            },
+        ),
+    ]
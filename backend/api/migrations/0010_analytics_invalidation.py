@@ -0,0 +1,27 @@
+# Generated by Django 5.0.4 on 2026-10-18 13:58
+
+import django.contrib.postgres.fields
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_delivery_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsInvalidation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('days', django.contrib.postgres.fields.ArrayField(base_field=models.DateField(), null=True, size=None, verbose_name='Дни доставки')),
+                ('created_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), db_index=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Сброс кэша аналитики',
+                'verbose_name_plural': 'Сбросы кэша аналитики',
+            },
+        ),
+    ]
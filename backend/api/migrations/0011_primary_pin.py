@@ -0,0 +1,27 @@
+# Generated by Django 5.0.4 on 2026-10-18 14:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_analytics_invalidation'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrimaryPin',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('until', models.DateTimeField(verbose_name='Читать с основной БД до')),
+            ],
+            options={
+                'verbose_name': 'Закрепление за основной БД',
+                'verbose_name_plural': 'Закрепления за основной БД',
+            },
+        ),
+    ]
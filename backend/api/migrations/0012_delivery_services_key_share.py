@@ -0,0 +1,52 @@
+from django.db import migrations
+
+# Проверка вставки связи с услугой (миграция 0008) читала доставки без блокировки:
+# параллельное удаление доставки не видело незакоммиченную связь, и после обоих
+# коммитов связь оставалась без доставки. Теперь доставки новых связей блокируются
+# FOR KEY SHARE, как это делает проверка настоящего внешнего ключа: удаление ждет
+# коммита вставки и его триггер видит связь, а вставка после удаления не находит
+# доставку. Поиск только по id проверяет все партиции (первичный ключ - (id, arrival_datetime)).
+LOCKING_CHECK_SQL = """
+CREATE OR REPLACE FUNCTION api_delivery_services_check_insert() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM 1 FROM api_delivery d
+    WHERE d.id IN (SELECT n.delivery_id FROM new_rows n)
+    ORDER BY d.id
+    FOR KEY SHARE OF d;
+    IF EXISTS (
+        SELECT 1 FROM new_rows n
+        WHERE NOT EXISTS (SELECT 1 FROM api_delivery d WHERE d.id = n.delivery_id)
+    ) THEN
+        RAISE EXCEPTION 'insert or update on table "api_delivery_services" violates foreign key to "api_delivery"'
+            USING ERRCODE = 'foreign_key_violation';
+    END IF;
+    RETURN NULL;
+END;
+$$;
+"""
+
+PLAIN_CHECK_SQL = """
+CREATE OR REPLACE FUNCTION api_delivery_services_check_insert() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM new_rows n
+        WHERE NOT EXISTS (SELECT 1 FROM api_delivery d WHERE d.id = n.delivery_id)
+    ) THEN
+        RAISE EXCEPTION 'insert or update on table "api_delivery_services" violates foreign key to "api_delivery"'
+            USING ERRCODE = 'foreign_key_violation';
+    END IF;
+    RETURN NULL;
+END;
+$$;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_primary_pin'),
+    ]
+
+    operations = [
+        migrations.RunSQL(LOCKING_CHECK_SQL, PLAIN_CHECK_SQL),
+    ]
@@ -1,6 +1,9 @@
 from .base import BaseModel
-from .reference import TransportModel, PackageType, DeliveryService, DeliveryStatus, CargoType
+from .reference import TransportModel, PackageType, DeliveryService, DeliveryStatus, CargoType, ReferenceVersion
 from .delivery import Delivery
+from .analytics import AnalyticsInvalidation, DeliveryDailyRollup
+from .archive import DeliveryArchive
+from .replica import PrimaryPin
 
 __all__ = [
     'BaseModel',
@@ -9,5 +12,10 @@ __all__ = [
     'DeliveryService',
     'DeliveryStatus',
     'CargoType',
+    'ReferenceVersion',
     'Delivery',
+    'DeliveryDailyRollup',
+    'AnalyticsInvalidation',
+    'DeliveryArchive',
+    'PrimaryPin',
 ]
\ No newline at end of file
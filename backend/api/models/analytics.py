@@ -0,0 +1,80 @@
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+from django.db.models.functions import Now
+from .reference import TransportModel, DeliveryService, DeliveryStatus
+
+
+class DeliveryDailyRollup(models.Model):
+    """
+    Дневной свод по доставкам для аналитики
+
+    Одна строка на день доставки (в TIME_ZONE) x статус x модель транспорта x услугу.
+    Строка без услуги (service = NULL) содержит итоги по всем доставкам группы,
+    а также число доставок без услуг. Строка с услугой - итоги по доставкам с этой услугой.
+    Свод изменяется на вклад изменившихся доставок в той же транзакции (api.utils.rollup).
+    Счетчики - IntegerField: вычитаемые дельты вставляются отрицательными значениями.
+    """
+
+    day = models.DateField(verbose_name="День доставки")
+    status = models.ForeignKey(
+        DeliveryStatus,
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_index=False,
+        verbose_name="Статус доставки"
+    )
+    transport_model = models.ForeignKey(
+        TransportModel,
+        on_delete=models.CASCADE,
+        related_name="+",
+        db_index=False,
+        verbose_name="Модель транспорта"
+    )
+    service = models.ForeignKey(
+        DeliveryService,
+        on_delete=models.CASCADE,
+        related_name="+",
+        null=True,
+        db_index=False,
+        verbose_name="Услуга"
+    )
+    count = models.IntegerField(verbose_name="Количество доставок")
+    distance_sum = models.FloatField(verbose_name="Сумма дистанций (км)")
+    duration_sum = models.FloatField(verbose_name="Сумма длительностей (ч)")
+    without_services_count = models.IntegerField(default=0, verbose_name="Доставок без услуг")
+
+    class Meta:
+        verbose_name = "Дневной свод доставок"
+        verbose_name_plural = "Дневные своды доставок"
+        # Уникальность отдельно для строк без услуги и с услугой: NULL в уникальном
+        # индексе не сравнивается (NULLS NOT DISTINCT появился только в PostgreSQL 15)
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "status", "transport_model"],
+                condition=models.Q(service__isnull=True),
+                name="rollup_day_total_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=["day", "service", "status", "transport_model"],
+                condition=models.Q(service__isnull=False),
+                name="rollup_day_service_uniq",
+            ),
+        ]
+
+
+class AnalyticsInvalidation(models.Model):
+    """
+    Сброс кэша аналитики, выполненный одним из процессов
+
+    Строка вставляется после коммита изменения; остальные процессы (воркеры uvicorn)
+    читают новые строки при обращении к кэшу и сбрасывают у себя те же записи
+    (api.utils.analytics_cache). days - затронутые дни доставки, NULL - весь кэш.
+    Строки старше ANALYTICS_CACHE_TIMEOUT удаляются.
+    """
+
+    days = ArrayField(models.DateField(), null=True, verbose_name="Дни доставки")
+    created_at = models.DateTimeField(db_default=Now(), db_index=True, verbose_name="Дата создания")
+
+    class Meta:
+        verbose_name = "Сброс кэша аналитики"
+        verbose_name_plural = "Сбросы кэша аналитики"
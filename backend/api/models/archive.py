@@ -0,0 +1,69 @@
+from django.contrib.postgres.fields import ArrayField
+from django.db import models
+from .reference import TransportModel, PackageType, DeliveryStatus
+
+
+class DeliveryArchive(models.Model):
+    """
+    Архив проведенных доставок старше срока хранения
+
+    Строки переносятся из Delivery командой archive_deliveries с теми же id,
+    временем создания и изменения. Архив хранит те же данные, что видны в ответе
+    retrieve, но компактнее: услуги - массивом идентификаторов вместо строк
+    промежуточной таблицы, длительность - обычной колонкой, без поискового вектора
+    и индексов для фильтров списка. Вклад архивных доставок остается в дневном своде
+    аналитики (api.utils.rollup учитывает архив при пересчете).
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    transport_model = models.ForeignKey(
+        TransportModel,
+        on_delete=models.PROTECT,
+        related_name="+",
+        db_index=False,
+        verbose_name="Модель транспорта"
+    )
+    transport_number = models.CharField(max_length=50, verbose_name="Номер транспорта")
+    departure_datetime = models.DateTimeField(verbose_name="Время отправки")
+    arrival_datetime = models.DateTimeField(verbose_name="Время доставки")
+    duration = models.FloatField(verbose_name="Длительность (ч)")
+    distance = models.FloatField(verbose_name="Дистанция (км)")
+    departure_address = models.CharField(max_length=255, blank=True, null=True, verbose_name="Адрес отправки")
+    arrival_address = models.CharField(max_length=255, blank=True, null=True, verbose_name="Адрес доставки")
+    media_file = models.FileField(
+        upload_to="delivery_files/%Y/%m/%d/",
+        blank=True,
+        null=True,
+        verbose_name="Медиафайл"
+    )
+    # Идентификаторы услуг; ссылку на удаленную услугу убирает api.utils.rollup
+    services = ArrayField(models.UUIDField(), default=list, blank=True, verbose_name="Услуги")
+    package_type = models.ForeignKey(
+        PackageType,
+        on_delete=models.PROTECT,
+        related_name="+",
+        db_index=False,
+        verbose_name="Тип упаковки"
+    )
+    status = models.ForeignKey(
+        DeliveryStatus,
+        on_delete=models.PROTECT,
+        related_name="+",
+        db_index=False,
+        verbose_name="Статус доставки"
+    )
+    technical_condition = models.CharField(max_length=10, verbose_name="Техническое состояние")
+    created_at = models.DateTimeField(verbose_name="Дата создания")
+    updated_at = models.DateTimeField(verbose_name="Дата обновления")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата архивации")
+
+    class Meta:
+        verbose_name = "Архивная доставка"
+        verbose_name_plural = "Архивные доставки"
+        # Единственный вторичный индекс - для пересчета свода и аналитики по датам
+        indexes = [
+            models.Index(fields=["arrival_datetime"], name="delivery_archive_arrival_idx"),
+        ]
+
+    def __str__(self):
+        return f"Архивная доставка #{self.id} ({self.transport_number})"
@@ -1,4 +1,7 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import models, router, transaction
+from django.db.models.functions import Cast, Extract, Upper
 from django.core.validators import MinValueValidator
 from .base import BaseModel
 from .reference import TransportModel, PackageType, DeliveryService, DeliveryStatus
@@ -9,6 +12,9 @@ class Delivery(BaseModel):
     Модель доставки
 
     Основная модель доставки, содержащая всю информацию о доставке.
+    Таблица секционирована по месяцам arrival_datetime (миграция 0008): первичный ключ
+    в БД - (id, arrival_datetime), поэтому уникальность одного id БД не проверяет, а поиск
+    только по id проверяет все партиции. Связь с услугами проверяется триггерами.
     """
 
     class TechnicalCondition(models.TextChoices):
@@ -20,6 +26,7 @@ class Delivery(BaseModel):
         TransportModel,
         on_delete=models.PROTECT,
         related_name="deliveries",
+        db_index=False,
         verbose_name="Модель транспорта"
     )
     transport_number = models.CharField(max_length=50, verbose_name="Номер транспорта")
@@ -27,6 +34,23 @@ class Delivery(BaseModel):
     # Время
     departure_datetime = models.DateTimeField(verbose_name="Время отправки")
     arrival_datetime = models.DateTimeField(verbose_name="Время доставки")
+    # Длительность в часах вычисляется и хранится самой БД, поэтому по ней
+    # можно фильтровать и сортировать с использованием индекса
+    duration = models.GeneratedField(
+        expression=Cast(
+            Extract(
+                models.ExpressionWrapper(
+                    models.F("arrival_datetime") - models.F("departure_datetime"),
+                    output_field=models.DurationField(),
+                ),
+                "epoch",
+            ),
+            output_field=models.FloatField(),
+        ) / models.Value(3600.0),
+        output_field=models.FloatField(),
+        db_persist=True,
+        verbose_name="Длительность (ч)",
+    )
 
     # Дистанция и адреса
     distance = models.FloatField(
@@ -45,6 +69,13 @@ class Delivery(BaseModel):
         null=True,
         verbose_name="Адрес доставки"
     )
+    # Полнотекстовый вектор адресов для поиска (?search=), пересчитывается самой БД
+    search_vector = models.GeneratedField(
+        expression=SearchVector("departure_address", "arrival_address", config="russian"),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        verbose_name="Поисковый вектор адресов",
+    )
 
     # Медиафайл
     media_file = models.FileField(
@@ -64,12 +95,14 @@ class Delivery(BaseModel):
         PackageType,
         on_delete=models.PROTECT,
         related_name="deliveries",
+        db_index=False,
         verbose_name="Тип упаковки"
     )
     status = models.ForeignKey(
         DeliveryStatus,
         on_delete=models.PROTECT,
         related_name="deliveries",
+        db_index=False,
         verbose_name="Статус доставки"
     )
     technical_condition = models.CharField(
@@ -83,14 +116,35 @@ class Delivery(BaseModel):
         verbose_name = "Доставка"
         verbose_name_plural = "Доставки"
         ordering = ["-departure_datetime"]
+        # Индексы повторяют фильтры и сортировки DeliveryViewSet. Одиночные индексы
+        # по FK не создаются: их заменяют составные индексы с FK в первой колонке.
+        indexes = [
+            models.Index(fields=["-departure_datetime", "-id"], name="delivery_departure_idx"),
+            models.Index(fields=["status", "-departure_datetime"], name="delivery_status_departure_idx"),
+            models.Index(fields=["transport_model", "-departure_datetime"], name="delivery_transport_dep_idx"),
+            models.Index(fields=["package_type", "-departure_datetime"], name="delivery_package_dep_idx"),
+            models.Index(fields=["arrival_datetime", "id"], name="delivery_arrival_idx"),
+            models.Index(fields=["distance", "id"], name="delivery_distance_idx"),
+            models.Index(fields=["created_at", "id"], name="delivery_created_idx"),
+            models.Index(fields=["duration", "id"], name="delivery_duration_idx"),
+            # Поиск: триграммы для подстрок и нечетких совпадений в номере транспорта,
+            # GIN по tsvector - для поиска по словам в адресах
+            GinIndex(OpClass(Upper("transport_number"), name="gin_trgm_ops"), name="delivery_number_trgm_idx"),
+            GinIndex(fields=["search_vector"], name="delivery_search_vector_idx"),
+            # Неисправный транспорт - редкое значение, поэтому индекс частичный
+            models.Index(
+                fields=["-departure_datetime"],
+                condition=models.Q(technical_condition="bad"),
+                name="delivery_bad_condition_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Дневной свод аналитики (api.utils.rollup) изменяется в pre_save/post_save,
+        # поэтому сохранение и изменение свода - одна транзакция
+        using = kwargs.get("using") or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Доставка #{self.id} ({self.transport_model} {self.transport_number})"
-
-    @property
-    def duration(self):
-        """Рассчитывает длительность доставки в часах"""
-        if self.departure_datetime and self.arrival_datetime:
-            duration = self.arrival_datetime - self.departure_datetime
-            return duration.total_seconds() / 3600
-        return None
\ No newline at end of file
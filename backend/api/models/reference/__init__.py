@@ -3,11 +3,13 @@ from .devilery_service import DeliveryService
 from .devilery_status import DeliveryStatus
 from .package_type import PackageType
 from .transport import TransportModel
+from .version import ReferenceVersion
 
 __all__ = [
     "CargoType",
     "DeliveryService",
     "DeliveryStatus",
     "PackageType",
+    "ReferenceVersion",
     "TransportModel"
 ]
\ No newline at end of file
@@ -0,0 +1,18 @@
+from django.db import models
+
+
+class ReferenceVersion(models.Model):
+    """
+    Номер изменения справочника, общий для всех процессов
+
+    После коммита сохранения или удаления записи справочника номер увеличивается;
+    воркеры сверяют номера в начале запроса и перечитывают изменившиеся справочники
+    (api.utils.reference_cache). model - метка модели, например 'api.DeliveryStatus'.
+    """
+
+    model = models.CharField(max_length=100, primary_key=True, verbose_name="Модель справочника")
+    version = models.BigIntegerField(verbose_name="Номер изменения")
+
+    class Meta:
+        verbose_name = "Версия справочника"
+        verbose_name_plural = "Версии справочников"
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.db import models
+
+
+class PrimaryPin(models.Model):
+    """
+    Момент, до которого пользователь читает с основной БД
+
+    Строка обновляется после успешного изменяющего запроса (ReplicaReadMixin) и общая
+    для всех воркеров, поэтому закрепление действует и для клиентов без cookie
+    (Bearer-токен). Читается и пишется только в основной БД.
+    """
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="+",
+        verbose_name="Пользователь"
+    )
+    until = models.DateTimeField(verbose_name="Читать с основной БД до")
+
+    class Meta:
+        verbose_name = "Закрепление за основной БД"
+        verbose_name_plural = "Закрепления за основной БД"
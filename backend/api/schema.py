@@ -16,6 +16,8 @@ from api.views.reference.devilery_service import DeliveryServiceViewSet
 from api.views.reference.devilery_status import DeliveryStatusViewSet
 from api.views.reference.cargo import CargoTypeViewSet
 from api.views.analytics import DeliveryAnalyticsViewSet
+from api.views.metrics import InternalMetricsView
+from api.serializers import DeliveryTransitionSerializer
 
 # Примеры UUID для использования в примерах
 EXAMPLE_UUID = "550e8400-e29b-41d4-a716-446655440000"
@@ -199,6 +201,7 @@ DELIVERY_CREATE_REQUEST_EXAMPLE = {
 
 # Примеры для аналитики
 ANALYTICS_RESPONSE_EXAMPLE = {
+    "bucket": "day",
     "daily_stats": [
         {
             "date": "2023-10-01",
@@ -249,6 +252,27 @@ ANALYTICS_RESPONSE_EXAMPLE = {
     "total_distance": 1331.05
 }
 
+# Пример необязательных разделов аналитики (include=percentiles,histogram)
+ANALYTICS_DISTRIBUTIONS_EXAMPLE = {
+    "duration_percentiles": {
+        "by_status": [
+            {"status__name": "Проведено", "status__color": "#00FF00", "count": 8, "p50": 5.5, "p90": 11.2, "p99": 23.4}
+        ],
+        "by_transport": [
+            {"transport_model__name": "Газель", "count": 8, "p50": 6.0, "p90": 12.1, "p99": 22.8}
+        ]
+    },
+    "distance_histogram": {
+        "edges": [0.0, 50.0, 100.0, 150.0],
+        "by_status": [
+            {"status__name": "Проведено", "status__color": "#00FF00", "counts": [2, 5, 1]}
+        ],
+        "by_transport": [
+            {"transport_model__name": "Газель", "counts": [2, 5, 1]}
+        ]
+    }
+}
+
 # Параметры фильтрации для доставок
 DELIVERY_FILTER_PARAMETERS = [
     OpenApiParameter(
@@ -318,15 +342,26 @@ DELIVERY_FILTER_PARAMETERS = [
         required=False,
         type=OpenApiTypes.STR
     ),
+    OpenApiParameter(
+        name='services_match',
+        description='Режим фильтра по услугам: any - есть хотя бы одна из услуг (по умолчанию), all - есть все перечисленные услуги',
+        required=False,
+        type=OpenApiTypes.STR,
+        enum=['any', 'all']
+    ),
     OpenApiParameter(
         name='search',
-        description='Поиск по номеру транспорта, адресу отправки, адресу доставки. Пример: Москва',
+        description='Поиск по номеру транспорта (подстрока или похожий номер) и по словам адресов '
+                    'отправки и доставки (с учетом словоформ, слово можно ввести частично). '
+                    'Без параметра ordering результаты сортируются по релевантности. Пример: Москва',
         required=False,
         type=OpenApiTypes.STR
     ),
     OpenApiParameter(
         name='ordering',
-        description='Сортировка по полям (со знаком минус для обратной сортировки). Пример: -departure_datetime',
+        description='Сортировка по полям (со знаком минус для обратной сортировки). '
+                    'Доступные поля: departure_datetime, arrival_datetime, distance, duration, created_at. '
+                    'Пример: -departure_datetime',
         required=False,
         type=OpenApiTypes.STR
     ),
@@ -352,12 +387,39 @@ ANALYTICS_FILTER_PARAMETERS = [
         required=False,
         type=OpenApiTypes.STR
     ),
+    OpenApiParameter(
+        name='services_match',
+        description='Режим фильтра по услугам: any - есть хотя бы одна из услуг (по умолчанию), all - есть все перечисленные услуги',
+        required=False,
+        type=OpenApiTypes.STR,
+        enum=['any', 'all']
+    ),
     OpenApiParameter(
         name='cargo_types',
         description='Фильтрация по UUID типов груза, через запятую. Пример: 550e8400-e29b-41d4-a716-446655440006,550e8400-e29b-41d4-a716-446655440007',
         required=False,
         type=OpenApiTypes.STR
     ),
+    OpenApiParameter(
+        name='bucket',
+        description=(
+            'Интервал временного ряда daily_stats в часовом поясе сервиса: hour, day (по умолчанию), '
+            'week, month или auto - наименьший интервал, при котором точек не больше 200'
+        ),
+        required=False,
+        type=OpenApiTypes.STR,
+        enum=['hour', 'day', 'week', 'month', 'auto']
+    ),
+    OpenApiParameter(
+        name='include',
+        description=(
+            'Необязательные разделы ответа через запятую: percentiles - перцентили длительности '
+            '(p50/p90/p99, часы), histogram - гистограмма дистанций (20 равных интервалов) '
+            'по статусам и моделям транспорта. Пример: percentiles,histogram'
+        ),
+        required=False,
+        type=OpenApiTypes.STR
+    ),
 ]
 
 # Параметры пагинации
@@ -376,6 +438,59 @@ PAGINATION_PARAMETERS = [
     ),
 ]
 
+# Параметры курсорной пагинации (только для списка доставок)
+CURSOR_PAGINATION_PARAMETERS = [
+    OpenApiParameter(
+        name='pagination',
+        description='Режим пагинации. cursor - курсорная пагинация без подсчета общего количества (ответ без count). Пример: cursor',
+        required=False,
+        type=OpenApiTypes.STR,
+        enum=['cursor']
+    ),
+    OpenApiParameter(
+        name='cursor',
+        description='Курсор страницы из полей next/previous ответа. Включает курсорную пагинацию.',
+        required=False,
+        type=OpenApiTypes.STR
+    ),
+]
+
+# Параметры выборочных полей доставок
+FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        name='fields',
+        description='Поля, которые нужно вернуть, через запятую. Связанные данные, не попавшие в список, '
+                    'не загружаются из БД. Пример: id,transport_number,status_name',
+        required=False,
+        type=OpenApiTypes.STR
+    ),
+    OpenApiParameter(
+        name='omit',
+        description='Поля, которые нужно исключить из ответа, через запятую. Пример: services,status_color',
+        required=False,
+        type=OpenApiTypes.STR
+    ),
+]
+
+# Параметры условных запросов (ETag / Last-Modified)
+CONDITIONAL_PARAMETERS = [
+    OpenApiParameter(
+        name='If-None-Match',
+        location=OpenApiParameter.HEADER,
+        description='ETag из предыдущего ответа. Если данные не изменились, возвращается 304 без тела',
+        required=False,
+        type=OpenApiTypes.STR
+    ),
+    OpenApiParameter(
+        name='If-Modified-Since',
+        location=OpenApiParameter.HEADER,
+        description='Last-Modified из предыдущего ответа. Учитывается только без If-None-Match '
+                    'и только для отдельной записи',
+        required=False,
+        type=OpenApiTypes.STR
+    ),
+]
+
 # Расширение схемы для авторизации
 extend_schema_view_auth = extend_schema_view(
     post=extend_schema(
@@ -577,9 +692,10 @@ extend_schema_view_transport = extend_schema_view(
 
         Используется для получения справочных данных по транспортным средствам, которые могут быть использованы для доставки.
         """,
-        parameters=PAGINATION_PARAMETERS,
+        parameters=PAGINATION_PARAMETERS + CONDITIONAL_PARAMETERS,
         responses={
             status.HTTP_200_OK: OpenApiTypes.OBJECT,
+            status.HTTP_304_NOT_MODIFIED: None,
             status.HTTP_401_UNAUTHORIZED: OpenApiTypes.OBJECT,
             status.HTTP_404_NOT_FOUND: OpenApiTypes.OBJECT,
             status.HTTP_500_INTERNAL_SERVER_ERROR: OpenApiTypes.OBJECT,
@@ -621,8 +737,10 @@ extend_schema_view_transport = extend_schema_view(
         description="""
         Возвращает детальную информацию о конкретной модели транспорта по её идентификатору.
         """,
+        parameters=CONDITIONAL_PARAMETERS,
         responses={
             status.HTTP_200_OK: OpenApiTypes.OBJECT,
+            status.HTTP_304_NOT_MODIFIED: None,
             status.HTTP_401_UNAUTHORIZED: OpenApiTypes.OBJECT,
             status.HTTP_404_NOT_FOUND: OpenApiTypes.OBJECT,
             status.HTTP_500_INTERNAL_SERVER_ERROR: OpenApiTypes.OBJECT,
@@ -662,9 +780,10 @@ extend_schema_view_package_type = extend_schema_view(
 
         Используется для получения справочных данных по типам упаковки, которые могут быть использованы для доставки.
         """,
-        parameters=PAGINATION_PARAMETERS,
+        parameters=PAGINATION_PARAMETERS + CONDITIONAL_PARAMETERS,
         responses={
             status.HTTP_200_OK: OpenApiTypes.OBJECT,
+            status.HTTP_304_NOT_MODIFIED: None,
             status.HTTP_401_UNAUTHORIZED: OpenApiTypes.OBJECT,
             status.HTTP_404_NOT_FOUND: OpenApiTypes.OBJECT,
             status.HTTP_500_INTERNAL_SERVER_ERROR: OpenApiTypes.OBJECT,
@@ -706,8 +825,10 @@ extend_schema_view_package_type = extend_schema_view(
         description="""
         Возвращает детальную информацию о конкретном типе упаковки по его идентификатору.
         """,
+        parameters=CONDITIONAL_PARAMETERS,
         responses={
             status.HTTP_200_OK: OpenApiTypes.OBJECT,
+            status.HTTP_304_NOT_MODIFIED: None,
             status.HTTP_401_UNAUTHORIZED: OpenApiTypes.OBJECT,
             status.HTTP_404_NOT_FOUND: OpenApiTypes.OBJECT,
             status.HTTP_500_INTERNAL_SERVER_ERROR: OpenApiTypes.OBJECT,
@@ -747,9 +868,10 @@ extend_schema_view_delivery_service = extend_schema_view(
 
         Используется для получения справочных данных по услугам, которые могут быть предоставлены при доставке.
         """,
-        parameters=PAGINATION_PARAMETERS,
+        parameters=PAGINATION_PARAMETERS + CONDITIONAL_PARAMETERS,
         responses={
             status.HTTP_200_OK: OpenApiTypes.OBJECT,
+            status.HTTP_304_NOT_MODIFIED: None,
             status.HTTP_401_UNAUTHORIZED: OpenApiTypes.OBJECT,
             status.HTTP_404_NOT_FOUND: OpenApiTypes.OBJECT,
             status.HTTP_500_INTERNAL_SERVER_ERROR: OpenApiTypes.OBJECT,
@@ -791,8 +913,10 @@ extend_schema_view_delivery_service = extend_schema_view(
         description="""
         Возвращает детальную информацию о конкретной услуге доставки по её идентификатору.
         """,
+        parameters=CONDITIONAL_PARAMETERS,
         responses={
             status.HTTP_200_OK: OpenApiTypes.OBJECT,
+            status.HTTP_304_NOT_MODIFIED: None,
             status.HTTP_401_UNAUTHORIZED: OpenApiTypes.OBJECT,
             status.HTTP_404_NOT_FOUND: OpenApiTypes.OBJECT,
             status.HTTP_500_INTERNAL_SERVER_ERROR: OpenApiTypes.OBJECT,
@@ -832,9 +956,10 @@ extend_schema_view_delivery_status = extend_schema_view(
 
         Используется для получения справочных данных по статусам, в которых может находиться доставка.
         """,
-        parameters=PAGINATION_PARAMETERS,
+        parameters=PAGINATION_PARAMETERS + CONDITIONAL_PARAMETERS,
         responses={
             status.HTTP_200_OK: OpenApiTypes.OBJECT,
+            status.HTTP_304_NOT_MODIFIED: None,
             status.HTTP_401_UNAUTHORIZED: OpenApiTypes.OBJECT,
             status.HTTP_404_NOT_FOUND: OpenApiTypes.OBJECT,
             status.HTTP_500_INTERNAL_SERVER_ERROR: OpenApiTypes.OBJECT,
@@ -874,8 +999,10 @@ extend_schema_view_delivery_status = extend_schema_view(
         description="""
         Возвращает детальную информацию о конкретном статусе доставки по его идентификатору.
         """,
+        parameters=CONDITIONAL_PARAMETERS,
         responses={
             status.HTTP_200_OK: OpenApiTypes.OBJECT,
+            status.HTTP_304_NOT_MODIFIED: None,
             status.HTTP_401_UNAUTHORIZED: OpenApiTypes.OBJECT,
             status.HTTP_404_NOT_FOUND: OpenApiTypes.OBJECT,
             status.HTTP_500_INTERNAL_SERVER_ERROR: OpenApiTypes.OBJECT,
@@ -915,9 +1042,10 @@ extend_schema_view_cargo_type = extend_schema_view(
 
         Используется для получения справочных данных по типам грузов, которые могут быть перевезены.
         """,
-        parameters=PAGINATION_PARAMETERS,
+        parameters=PAGINATION_PARAMETERS + CONDITIONAL_PARAMETERS,
         responses={
             status.HTTP_200_OK: OpenApiTypes.OBJECT,
+            status.HTTP_304_NOT_MODIFIED: None,
             status.HTTP_401_UNAUTHORIZED: OpenApiTypes.OBJECT,
             status.HTTP_404_NOT_FOUND: OpenApiTypes.OBJECT,
             status.HTTP_500_INTERNAL_SERVER_ERROR: OpenApiTypes.OBJECT,
@@ -959,8 +1087,10 @@ extend_schema_view_cargo_type = extend_schema_view(
         description="""
         Возвращает детальную информацию о конкретном типе груза по его идентификатору.
         """,
+        parameters=CONDITIONAL_PARAMETERS,
         responses={
             status.HTTP_200_OK: OpenApiTypes.OBJECT,
+            status.HTTP_304_NOT_MODIFIED: None,
             status.HTTP_401_UNAUTHORIZED: OpenApiTypes.OBJECT,
             status.HTTP_404_NOT_FOUND: OpenApiTypes.OBJECT,
             status.HTTP_500_INTERNAL_SERVER_ERROR: OpenApiTypes.OBJECT,
@@ -1000,10 +1130,15 @@ extend_schema_view_delivery = extend_schema_view(
 
         Для списка доставок используется упрощенный сериализатор, содержащий только основные данные.
         Для получения полной информации о доставке используйте эндпоинт получения конкретной доставки.
+
+        Для глубокой прокрутки используйте курсорную пагинацию (pagination=cursor): страницы
+        отдаются за постоянное время, переход выполняется по ссылкам next/previous.
+        ETag курсорной страницы описывает только эту страницу (ее записи и ссылки).
         """,
-        parameters=DELIVERY_FILTER_PARAMETERS + PAGINATION_PARAMETERS,
+        parameters=DELIVERY_FILTER_PARAMETERS + PAGINATION_PARAMETERS + CURSOR_PAGINATION_PARAMETERS + FIELDS_PARAMETERS + CONDITIONAL_PARAMETERS,
         responses={
             status.HTTP_200_OK: OpenApiTypes.OBJECT,
+            status.HTTP_304_NOT_MODIFIED: None,
             status.HTTP_400_BAD_REQUEST: OpenApiTypes.OBJECT,
             status.HTTP_401_UNAUTHORIZED: OpenApiTypes.OBJECT,
             status.HTTP_404_NOT_FOUND: OpenApiTypes.OBJECT,
@@ -1038,9 +1173,14 @@ extend_schema_view_delivery = extend_schema_view(
 
         Включает все поля доставки, включая время, адреса, информацию о транспорте,
         статус, услуги и другие параметры.
+
+        Проведенные доставки, перенесенные в архив (archive_deliveries), возвращаются
+        в том же формате, но без ETag; изменить или удалить их нельзя (404).
         """,
+        parameters=FIELDS_PARAMETERS + CONDITIONAL_PARAMETERS,
         responses={
             status.HTTP_200_OK: OpenApiTypes.OBJECT,
+            status.HTTP_304_NOT_MODIFIED: None,
             status.HTTP_400_BAD_REQUEST: OpenApiTypes.OBJECT,
             status.HTTP_401_UNAUTHORIZED: OpenApiTypes.OBJECT,
             status.HTTP_404_NOT_FOUND: OpenApiTypes.OBJECT,
@@ -1238,7 +1378,9 @@ extend_schema_complete = extend_schema(
     operation_id='deliveries_complete',
     summary='Завершение доставки',
     description="""
-    Изменяет статус доставки на "Проведено".
+    Изменяет статус доставки на "Проведено", если переход из текущего статуса
+    допускается таблицей переходов (из "В ожидании" и "В пути"). Повторное
+    завершение уже проведенной доставки ничего не меняет и возвращает доставку.
 
     Это действие используется для быстрого завершения доставки без необходимости 
     выполнять полное обновление через PUT или PATCH запросы.
@@ -1283,6 +1425,165 @@ extend_schema_complete = extend_schema(
 original_complete = DeliveryViewSet.complete
 DeliveryViewSet.complete = extend_schema_complete(original_complete)
 
+# Расширение схемы для массовых операций с доставками
+extend_schema_bulk = extend_schema(
+    tags=['Доставки'],
+    operation_id='deliveries_bulk',
+    summary='Массовое создание, изменение и удаление доставок',
+    description="""
+    Принимает объект со списками create (новые доставки), update (частичные изменения с полем id)
+    и delete (идентификаторы). Всего не более 5000 элементов.
+
+    Каждый элемент проверяется отдельно: корректные элементы сохраняются одной транзакцией,
+    по некорректным возвращаются ошибки с операцией и индексом элемента в исходном списке.
+    Если не сохранен ни один элемент, возвращается 400 с тем же телом ответа.
+    """,
+    request=OpenApiTypes.OBJECT,
+    responses={
+        status.HTTP_200_OK: OpenApiTypes.OBJECT,
+        status.HTTP_400_BAD_REQUEST: OpenApiTypes.OBJECT,
+        status.HTTP_401_UNAUTHORIZED: OpenApiTypes.OBJECT,
+        status.HTTP_500_INTERNAL_SERVER_ERROR: OpenApiTypes.OBJECT,
+    },
+    examples=[
+        OpenApiExample(
+            'Запрос',
+            value={
+                "create": [DELIVERY_CREATE_REQUEST_EXAMPLE],
+                "update": [{"id": EXAMPLE_UUID, "distance": 130.0}],
+                "delete": ["550e8400-e29b-41d4-a716-446655440009"]
+            },
+            request_only=True,
+            summary='Создание, изменение и удаление'
+        ),
+        OpenApiExample(
+            'Частичный успех',
+            value={
+                "created": [{"index": 0, "id": "550e8400-e29b-41d4-a716-446655440010"}],
+                "updated": [],
+                "deleted": [{"index": 0, "id": "550e8400-e29b-41d4-a716-446655440009"}],
+                "errors": [
+                    {"operation": "update", "index": 0, "id": EXAMPLE_UUID,
+                     "errors": {"detail": "Страница не найдена."}}
+                ]
+            },
+            response_only=True,
+            summary='Часть элементов не сохранена'
+        ),
+        OpenApiExample(
+            'Ошибка запроса',
+            value={"detail": "Слишком много элементов: 6000, допускается не более 5000."},
+            response_only=True,
+            status_codes=['400'],
+            summary='Превышен размер пачки'
+        ),
+        *AUTH_ERROR_EXAMPLES,
+        ITERNAL_SERVER_ERROR_EXAMPLE
+    ]
+)
+
+# Добавляем схему для массовых операций
+DeliveryViewSet.bulk = extend_schema_bulk(DeliveryViewSet.bulk)
+
+# Расширение схемы для массовой смены статуса доставок
+extend_schema_transition = extend_schema(
+    tags=['Доставки'],
+    operation_id='deliveries_transition',
+    summary='Массовая смена статуса доставок',
+    description="""
+    Переводит доставки с переданными идентификаторами (не более 5000) в статус status.
+    Статус меняется одним условным запросом только у доставок, текущий статус которых
+    допускает переход: "В ожидании" -> "В пути" / "Проведено", "В пути" -> "В ожидании" / "Проведено".
+
+    В ответе перечислены изменившиеся доставки (changed), доставки, уже находившиеся
+    в целевом статусе (unchanged), доставки с недопустимым переходом и их текущим статусом
+    (rejected) и ненайденные доставки (not_found). Если не изменилась ни одна доставка
+    и есть отказы, возвращается 400 с тем же телом ответа.
+    """,
+    request=DeliveryTransitionSerializer,
+    responses={
+        status.HTTP_200_OK: OpenApiTypes.OBJECT,
+        status.HTTP_400_BAD_REQUEST: OpenApiTypes.OBJECT,
+        status.HTTP_401_UNAUTHORIZED: OpenApiTypes.OBJECT,
+        status.HTTP_500_INTERNAL_SERVER_ERROR: OpenApiTypes.OBJECT,
+    },
+    examples=[
+        OpenApiExample(
+            'Запрос',
+            value={
+                "ids": [EXAMPLE_UUID, "550e8400-e29b-41d4-a716-446655440009"],
+                "status": "550e8400-e29b-41d4-a716-446655440003"
+            },
+            request_only=True,
+            summary='Перевод доставок в статус'
+        ),
+        OpenApiExample(
+            'Частичный успех',
+            value={
+                "status": "550e8400-e29b-41d4-a716-446655440003",
+                "changed": [EXAMPLE_UUID],
+                "unchanged": [],
+                "rejected": [
+                    {"id": "550e8400-e29b-41d4-a716-446655440009",
+                     "status": "550e8400-e29b-41d4-a716-446655440004"}
+                ],
+                "not_found": []
+            },
+            response_only=True,
+            summary='Часть доставок не изменена'
+        ),
+        *AUTH_ERROR_EXAMPLES,
+        ITERNAL_SERVER_ERROR_EXAMPLE
+    ]
+)
+
+# Добавляем схему для массовой смены статуса
+DeliveryViewSet.transition = extend_schema_transition(DeliveryViewSet.transition)
+
+# Расширение схемы для выгрузки доставок
+extend_schema_export = extend_schema(
+    tags=['Доставки'],
+    operation_id='deliveries_export',
+    summary='Выгрузка доставок в CSV или NDJSON',
+    description="""
+    Выгружает все доставки, подходящие под фильтры списка, без пагинации.
+
+    Ответ передается потоком: строки читаются из БД пачками, поэтому размер выгрузки
+    не ограничен. Колонки совпадают с полями списка доставок и учитывают параметры fields / omit.
+    В CSV услуги перечисляются через запятую в одной ячейке, в NDJSON - массивом.
+    """,
+    parameters=DELIVERY_FILTER_PARAMETERS + FIELDS_PARAMETERS + [
+        OpenApiParameter(
+            name='export_format',
+            description='Формат выгрузки: csv (по умолчанию) или ndjson',
+            required=False,
+            type=OpenApiTypes.STR,
+            enum=['csv', 'ndjson']
+        ),
+    ],
+    responses={
+        (status.HTTP_200_OK, 'text/csv'): OpenApiTypes.STR,
+        (status.HTTP_200_OK, 'application/x-ndjson'): OpenApiTypes.STR,
+        status.HTTP_400_BAD_REQUEST: OpenApiTypes.OBJECT,
+        status.HTTP_401_UNAUTHORIZED: OpenApiTypes.OBJECT,
+        status.HTTP_500_INTERNAL_SERVER_ERROR: OpenApiTypes.OBJECT,
+    },
+    examples=[
+        OpenApiExample(
+            'Ошибка формата',
+            value={"detail": "Неизвестный формат выгрузки. Допустимые значения: csv, ndjson"},
+            response_only=True,
+            status_codes=['400'],
+            summary='Неизвестный формат'
+        ),
+        *AUTH_ERROR_EXAMPLES,
+        ITERNAL_SERVER_ERROR_EXAMPLE
+    ]
+)
+
+# Добавляем схему для выгрузки
+DeliveryViewSet.export = extend_schema_export(DeliveryViewSet.export)
+
 # Применяем основную схему для DeliveryViewSet
 DeliveryViewSet = extend_schema_view_delivery(DeliveryViewSet)
 
@@ -1296,17 +1597,26 @@ extend_schema_view_analytics = extend_schema_view(
         Возвращает статистические данные по доставкам для построения отчетов и графиков.
 
         Аналитика включает:
-        - Статистику по дням (количество доставок, общее и среднее расстояние)
+        - Статистику по интервалам bucket: часам, дням, неделям или месяцам
+          (количество доставок, общее и среднее расстояние)
         - Статистику по статусам (количество доставок в каждом статусе)
         - Статистику по моделям транспорта
         - Статистику по услугам
         - Общую статистику (общее количество доставок и общее расстояние)
 
         Можно фильтровать по дате, услугам и типам груза.
+
+        По параметру include добавляются разделы duration_percentiles (перцентили
+        длительности) и distance_histogram (границы интервалов edges и число доставок
+        в каждом интервале) по статусам и моделям транспорта.
+
+        Ответы кэшируются по фильтрам на ANALYTICS_CACHE_TIMEOUT секунд; изменение доставок
+        сбрасывает записи, в диапазон дат которых попадают затронутые дни.
         """,
         parameters=ANALYTICS_FILTER_PARAMETERS,
         responses={
             status.HTTP_200_OK: OpenApiTypes.OBJECT,
+            status.HTTP_400_BAD_REQUEST: OpenApiTypes.OBJECT,
             status.HTTP_401_UNAUTHORIZED: OpenApiTypes.OBJECT,
             status.HTTP_405_METHOD_NOT_ALLOWED: OpenApiTypes.OBJECT,
             status.HTTP_500_INTERNAL_SERVER_ERROR: OpenApiTypes.OBJECT,
@@ -1318,6 +1628,12 @@ extend_schema_view_analytics = extend_schema_view(
                 response_only=True,
                 summary='Аналитика по доставкам'
             ),
+            OpenApiExample(
+                'Разделы include',
+                value=ANALYTICS_DISTRIBUTIONS_EXAMPLE,
+                response_only=True,
+                summary='Перцентили длительности и гистограмма дистанций (3 интервала для краткости)'
+            ),
             *AUTH_ERROR_EXAMPLES,
             OpenApiExample(
                 'Ошибка передачи параметра',
@@ -1343,4 +1659,97 @@ extend_schema_view_analytics = extend_schema_view(
 )
 
 # Применяем схему для DeliveryAnalyticsView
-DeliveryAnalyticsView = extend_schema_view_analytics(DeliveryAnalyticsViewSet)
\ No newline at end of file
+DeliveryAnalyticsView = extend_schema_view_analytics(DeliveryAnalyticsViewSet)
+
+# Пример ответа внутренних метрик
+INTERNAL_METRICS_RESPONSE_EXAMPLE = {
+    "reference_cache": {
+        "deliverystatus": {
+            "version": 2,
+            "size": 3,
+            "hits": 1520,
+            "misses": 3,
+            "loads": 3,
+            "invalidations": 2,
+            "shared_invalidations": 1
+        }
+    },
+    "analytics_cache": {
+        "size": 12,
+        "in_flight": 0,
+        "hits": 840,
+        "misses": 31,
+        "waits": 6,
+        "computes": 31,
+        "compute_time_avg_ms": 412.5,
+        "compute_time_max_ms": 2950.3,
+        "invalidations": 18,
+        "invalidated_entries": 9,
+        "shared_invalidations": 5,
+        "evictions": 0
+    },
+    "db_pool": {
+        "default": {
+            "max_size": 10,
+            "size": 4,
+            "idle": 3,
+            "in_use": 1,
+            "waiting": 0,
+            "checkouts": 15230,
+            "connects": 6,
+            "waits": 12,
+            "wait_time_avg_ms": 3.4,
+            "wait_time_max_ms": 18.9,
+            "timeouts": 0,
+            "health_checks": 41,
+            "health_check_failures": 0,
+            "closed_lifetime": 2,
+            "closed_idle": 0,
+            "closed_broken": 0
+        }
+    }
+}
+
+# Расширение схемы для внутренних метрик
+extend_schema_view_internal_metrics = extend_schema_view(
+    get=extend_schema(
+        tags=['Служебное'],
+        operation_id='internal_metrics',
+        summary='Внутренние метрики процесса',
+        description="""
+        Возвращает счетчики процесса (воркера), обработавшего запрос.
+
+        reference_cache - кэш справочников: версия и размер снимка, попадания, промахи,
+        загрузки из БД, сбросы и сбросы по изменениям других процессов (shared_invalidations).
+
+        analytics_cache - кэш ответов аналитики: число записей и вычислений в процессе,
+        попадания, промахи, ожидания чужого вычисления (waits), число и время вычислений,
+        сбросы и сброшенные записи, сбросы, полученные от других процессов
+        (shared_invalidations), вытеснения по размеру.
+
+        db_pool - пулы соединений с БД по псевдонимам (пусто, если пул выключен):
+        размер, свободные и занятые соединения, ожидающие потоки, выдачи и открытия
+        соединений, число и время ожиданий, отказы по таймауту, проверки соединений
+        и закрытия по времени жизни, простою и ошибкам.
+
+        Доступно только администраторам.
+        """,
+        responses={
+            status.HTTP_200_OK: OpenApiTypes.OBJECT,
+            status.HTTP_401_UNAUTHORIZED: OpenApiTypes.OBJECT,
+            status.HTTP_403_FORBIDDEN: OpenApiTypes.OBJECT,
+        },
+        examples=[
+            OpenApiExample(
+                'Успешный ответ',
+                value=INTERNAL_METRICS_RESPONSE_EXAMPLE,
+                response_only=True,
+                summary='Метрики кэшей и пула соединений'
+            ),
+            *AUTH_ERROR_EXAMPLES,
+        ]
+    )
+)
+
+# Применяем схему для InternalMetricsView
+InternalMetricsView = extend_schema_view_internal_metrics(InternalMetricsView)
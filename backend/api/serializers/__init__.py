@@ -1,5 +1,10 @@
 from .user import UserSerializer, CustomTokenObtainPairSerializer
-from .delivery import DeliveryListSerializer, DeliveryDetailSerializer
+from .delivery import (
+    DeliveryListSerializer,
+    DeliveryDetailSerializer,
+    DeliveryTransitionSerializer,
+    DeliveryArchiveSerializer
+)
 from .reference import (
     TransportModelSerializer,
     PackageTypeSerializer,
@@ -12,6 +17,8 @@ from .analytics import (
     AnalyticsStatusSerializer,
     AnalyticsTransportSerializer,
     AnalyticsServiceSerializer,
+    AnalyticsDurationPercentilesSerializer,
+    AnalyticsDistanceHistogramSerializer,
     DeliveryAnalyticsSerializer
 )
 
@@ -20,6 +27,8 @@ __all__ = [
     "UserSerializer",
     "DeliveryListSerializer",
     "DeliveryDetailSerializer",
+    "DeliveryTransitionSerializer",
+    "DeliveryArchiveSerializer",
     "TransportModelSerializer",
     "PackageTypeSerializer",
     "DeliveryServiceSerializer",
@@ -29,5 +38,7 @@ __all__ = [
     "AnalyticsStatusSerializer",
     "AnalyticsTransportSerializer",
     "AnalyticsServiceSerializer",
+    "AnalyticsDurationPercentilesSerializer",
+    "AnalyticsDistanceHistogramSerializer",
     "DeliveryAnalyticsSerializer"
 ]
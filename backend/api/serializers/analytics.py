@@ -1,15 +1,24 @@
+from datetime import datetime
 from rest_framework import serializers
+from api.serializers.mixins import TimedRepresentationMixin
 
 
 class AnalyticsDailySerializer(serializers.Serializer):
     """
-    Сериализатор для ежедневной статистики доставок
+    Сериализатор для статистики доставок по интервалам (bucket)
+
+    date - начало интервала: дата для day/week/month, дата и время для hour.
     """
-    date = serializers.DateField()
+    date = serializers.SerializerMethodField()
     count = serializers.IntegerField()
     total_distance = serializers.FloatField()
     avg_distance = serializers.FloatField()
 
+    def get_date(self, obj):
+        value = obj['date']
+        field = serializers.DateTimeField() if isinstance(value, datetime) else serializers.DateField()
+        return field.to_representation(value)
+
 
 class AnalyticsStatusSerializer(serializers.Serializer):
     """
@@ -36,13 +45,74 @@ class AnalyticsServiceSerializer(serializers.Serializer):
     count = serializers.IntegerField()
 
 
-class DeliveryAnalyticsSerializer(serializers.Serializer):
+class AnalyticsStatusPercentilesSerializer(serializers.Serializer):
+    """
+    Сериализатор перцентилей длительности доставок (в часах) по статусу
+    """
+    status__name = serializers.CharField()
+    status__color = serializers.CharField()
+    count = serializers.IntegerField()
+    p50 = serializers.FloatField(allow_null=True)
+    p90 = serializers.FloatField(allow_null=True)
+    p99 = serializers.FloatField(allow_null=True)
+
+
+class AnalyticsTransportPercentilesSerializer(serializers.Serializer):
+    """
+    Сериализатор перцентилей длительности доставок (в часах) по модели транспорта
+    """
+    transport_model__name = serializers.CharField()
+    count = serializers.IntegerField()
+    p50 = serializers.FloatField(allow_null=True)
+    p90 = serializers.FloatField(allow_null=True)
+    p99 = serializers.FloatField(allow_null=True)
+
+
+class AnalyticsDurationPercentilesSerializer(serializers.Serializer):
+    """
+    Сериализатор перцентилей длительности по статусам и моделям транспорта
+    """
+    by_status = AnalyticsStatusPercentilesSerializer(many=True)
+    by_transport = AnalyticsTransportPercentilesSerializer(many=True)
+
+
+class AnalyticsStatusHistogramSerializer(serializers.Serializer):
+    """
+    Сериализатор гистограммы дистанций по статусу
+    """
+    status__name = serializers.CharField()
+    status__color = serializers.CharField()
+    counts = serializers.ListField(child=serializers.IntegerField())
+
+
+class AnalyticsTransportHistogramSerializer(serializers.Serializer):
+    """
+    Сериализатор гистограммы дистанций по модели транспорта
+    """
+    transport_model__name = serializers.CharField()
+    counts = serializers.ListField(child=serializers.IntegerField())
+
+
+class AnalyticsDistanceHistogramSerializer(serializers.Serializer):
+    """
+    Сериализатор гистограммы дистанций: границы интервалов (км) и число доставок в них
+    """
+    edges = serializers.ListField(child=serializers.FloatField())
+    by_status = AnalyticsStatusHistogramSerializer(many=True)
+    by_transport = AnalyticsTransportHistogramSerializer(many=True)
+
+
+class DeliveryAnalyticsSerializer(TimedRepresentationMixin, serializers.Serializer):
     """
     Сериализатор для полной аналитики доставок
     """
+    bucket = serializers.CharField()
     daily_stats = AnalyticsDailySerializer(many=True)
     status_stats = AnalyticsStatusSerializer(many=True)
     transport_stats = AnalyticsTransportSerializer(many=True)
     service_stats = AnalyticsServiceSerializer(many=True)
     total_deliveries = serializers.IntegerField()
-    total_distance = serializers.FloatField()
\ No newline at end of file
+    total_distance = serializers.FloatField()
+    # Необязательные разделы (параметр include)
+    duration_percentiles = AnalyticsDurationPercentilesSerializer(required=False)
+    distance_histogram = AnalyticsDistanceHistogramSerializer(required=False)
\ No newline at end of file
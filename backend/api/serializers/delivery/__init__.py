@@ -1,7 +1,11 @@
 from .delivery_list import DeliveryListSerializer
 from .delivery_detail import DeliveryDetailSerializer
+from .delivery_transition import DeliveryTransitionSerializer
+from .delivery_archive import DeliveryArchiveSerializer
 
 __all__ = [
     "DeliveryListSerializer",
-    "DeliveryDetailSerializer"
+    "DeliveryDetailSerializer",
+    "DeliveryTransitionSerializer",
+    "DeliveryArchiveSerializer"
 ]
@@ -0,0 +1,20 @@
+from rest_framework import serializers
+from api.models import DeliveryArchive
+from api.serializers.delivery.delivery_detail import DeliveryDetailSerializer
+from api.serializers.mixins import SparseFieldsetMixin, TimedRepresentationMixin
+
+
+class DeliveryArchiveSerializer(TimedRepresentationMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Сериализатор архивной доставки
+
+    Только для чтения. Ответ совпадает по форме с DeliveryDetailSerializer:
+    справочники и услуги - идентификаторами.
+    """
+
+    services = serializers.ListField(child=serializers.UUIDField(), read_only=True)
+
+    class Meta:
+        model = DeliveryArchive
+        fields = DeliveryDetailSerializer.Meta.fields
+        read_only_fields = fields
@@ -1,18 +1,22 @@
 from rest_framework import serializers
 from api.models import Delivery, TransportModel, PackageType, DeliveryService, DeliveryStatus
+from api.serializers.fields import CachedPrimaryKeyRelatedField
+from api.serializers.mixins import SparseFieldsetMixin, TimedRepresentationMixin
 
 
-class DeliveryDetailSerializer(serializers.ModelSerializer):
+class DeliveryDetailSerializer(TimedRepresentationMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Сериализатор для детальной информации о доставке
 
     Содержит полную информацию о доставке.
+    При чтении поддерживает выборочные поля (?fields= / ?omit=).
+    Ссылки на справочники проверяются по кэшу справочников, без запросов к БД.
     """
 
-    transport_model = serializers.PrimaryKeyRelatedField(queryset=TransportModel.objects.all())
-    package_type = serializers.PrimaryKeyRelatedField(queryset=PackageType.objects.all())
-    status = serializers.PrimaryKeyRelatedField(queryset=DeliveryStatus.objects.all())
-    services = serializers.PrimaryKeyRelatedField(
+    transport_model = CachedPrimaryKeyRelatedField(queryset=TransportModel.objects.all())
+    package_type = CachedPrimaryKeyRelatedField(queryset=PackageType.objects.all())
+    status = CachedPrimaryKeyRelatedField(queryset=DeliveryStatus.objects.all())
+    services = CachedPrimaryKeyRelatedField(
         queryset=DeliveryService.objects.all(),
         many=True
     )
@@ -39,3 +43,10 @@ class DeliveryDetailSerializer(serializers.ModelSerializer):
             'updated_at',
         )
         read_only_fields = ('created_at', 'updated_at')
+
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        # duration вычисляется БД и после UPDATE не обновляется в экземпляре
+        if {'departure_datetime', 'arrival_datetime'} & validated_data.keys():
+            instance.refresh_from_db(fields=['duration'])
+        return instance
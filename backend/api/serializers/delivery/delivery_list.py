@@ -1,12 +1,14 @@
 from rest_framework import serializers
 from api.models import Delivery
+from api.serializers.mixins import SparseFieldsetMixin, TimedRepresentationMixin
 
 
-class DeliveryListSerializer(serializers.ModelSerializer):
+class DeliveryListSerializer(TimedRepresentationMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Сериализатор для списка доставок
 
     Содержит основную информацию о доставке для отображения в списке.
+    Поддерживает выборочные поля: ?fields=id,transport_number или ?omit=services.
     """
 
     transport_model_name = serializers.CharField(source='transport_model.name', read_only=True)
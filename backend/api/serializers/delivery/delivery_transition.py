@@ -0,0 +1,14 @@
+from rest_framework import serializers
+from api.models import DeliveryStatus
+from api.serializers.fields import CachedPrimaryKeyRelatedField
+
+
+class DeliveryTransitionSerializer(serializers.Serializer):
+    """
+    Сериализатор запроса на смену статуса доставок
+
+    Целевой статус проверяется по кэшу справочников, без запроса к БД.
+    """
+
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=5000)
+    status = CachedPrimaryKeyRelatedField(queryset=DeliveryStatus.objects.all())
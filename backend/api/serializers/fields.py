@@ -0,0 +1,24 @@
+from rest_framework import serializers
+from api.utils.reference_cache import reference_cache
+
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField для справочников, проверяющий pk по кэшу в памяти
+
+    Ошибки валидации совпадают с PrimaryKeyRelatedField, запрос к БД выполняется
+    только для pk, которого нет в снимке справочника.
+    """
+
+    def to_internal_value(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            obj = reference_cache.get(self.get_queryset().model, data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
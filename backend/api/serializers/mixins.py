@@ -0,0 +1,55 @@
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from api.utils.server_timing import measure
+
+
+class SparseFieldsetMixin:
+    """
+    Выборочные поля сериализатора (?fields= / ?omit=)
+
+    fields - имена полей через запятую, которые нужно оставить в ответе;
+    omit - имена полей через запятую, которые нужно исключить.
+    Неизвестные имена игнорируются. Параметры учитываются только для чтения
+    (GET/HEAD) и только на верхнем уровне: при записи сериализатор работает
+    с полным набором полей. Так как план запроса строится по полям сериализатора,
+    исключенные связи не попадают ни в JOIN, ни в prefetch.
+    """
+
+    fields_query_param = 'fields'
+    omit_query_param = 'omit'
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS or not self._is_root():
+            return fields
+
+        only = self._parse_names(request.query_params.get(self.fields_query_param))
+        omit = self._parse_names(request.query_params.get(self.omit_query_param))
+        if only:
+            fields = {name: field for name, field in fields.items() if name in only}
+        if omit:
+            fields = {name: field for name, field in fields.items() if name not in omit}
+        return fields
+
+    def _is_root(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    @staticmethod
+    def _parse_names(value):
+        return {name.strip() for name in value.split(',') if name.strip()} if value else set()
+
+
+class TimedRepresentationMixin:
+    """
+    Замер to_representation в метрику serialize заголовка Server-Timing
+
+    Вложенные сериализаторы внутри замеряемого вызова повторно не учитываются.
+    """
+
+    def to_representation(self, instance):
+        with measure('serialize'):
+            return super().to_representation(instance)
@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from api.serializers.mixins import TimedRepresentationMixin
 from api.models import CargoType
 
 
-class CargoTypeSerializer(serializers.ModelSerializer):
+class CargoTypeSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """
     Сериализатор для типов груза
 
@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from api.serializers.mixins import TimedRepresentationMixin
 from api.models import DeliveryService
 
 
-class DeliveryServiceSerializer(serializers.ModelSerializer):
+class DeliveryServiceSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """
     Сериализатор для услуг доставки
 
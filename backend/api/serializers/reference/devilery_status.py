@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from api.serializers.mixins import TimedRepresentationMixin
 from api.models import DeliveryStatus
 
 
-class DeliveryStatusSerializer(serializers.ModelSerializer):
+class DeliveryStatusSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """
     Сериализатор для статусов доставки
 
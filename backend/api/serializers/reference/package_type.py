@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from api.serializers.mixins import TimedRepresentationMixin
 from api.models import PackageType
 
 
-class PackageTypeSerializer(serializers.ModelSerializer):
+class PackageTypeSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """
     Сериализатор для типов упаковки
 
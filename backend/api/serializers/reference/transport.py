@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from api.serializers.mixins import TimedRepresentationMixin
 from api.models import TransportModel
 
 
-class TransportModelSerializer(serializers.ModelSerializer):
+class TransportModelSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """
     Сериализатор для моделей транспорта
 
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from api.serializers.mixins import TimedRepresentationMixin
 from django.contrib.auth.models import User
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
@@ -9,7 +10,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
     pass
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     """
     Сериализатор для пользователей
 
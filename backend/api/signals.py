@@ -0,0 +1,34 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.dispatch import Signal
+
+# Массовая запись в обход save()/delete() (BulkWriter, условный UPDATE статусов):
+# pre_bulk_write - перед записью, pks строк, которые могут измениться или удалиться;
+# post_bulk_write - после записи, pks созданных и (возможно) измененных строк.
+# Отправляются с sender=модель и аргументами pks, using, state внутри транзакции записи;
+# state - один и тот же словарь в паре pre/post, в нем обработчики передают прочитанное до записи.
+# Если отправлен pre_bulk_write, post_bulk_write отправляется всегда (в том числе с пустым pks).
+pre_bulk_write = Signal()
+post_bulk_write = Signal()
+
+# Модели, массовая запись которых идет в текущем контексте: изменение уже учтено
+# обработчиками pre_bulk_write / post_bulk_write, сигналы save/delete его не повторяют
+_bulk_models = ContextVar('bulk_write_models', default=frozenset())
+
+
+@contextmanager
+def bulk_write(model):
+    """Помечает записи model внутри блока как массовые (например, delete() в BulkWriter)"""
+    token = _bulk_models.set(_bulk_models.get() | {model})
+    try:
+        yield
+    finally:
+        _bulk_models.reset(token)
+
+
+def in_bulk_write(model):
+    return model in _bulk_models.get()
+
+# Дневной свод аналитики изменился за дни days (sender=DeliveryDailyRollup, аргументы days, using).
+# Отправляется внутри транзакции записи, до коммита.
+rollup_changed = Signal()
@@ -0,0 +1,61 @@
+import random
+from datetime import timedelta
+from django.utils import timezone
+from api.models import Delivery, DeliveryService, DeliveryStatus, PackageType, TransportModel
+from api.utils.reference_cache import REFERENCE_MODELS, reference_cache
+
+
+def create_references():
+    """Справочники для доставок: по несколько моделей транспорта, упаковок, статусов и услуг"""
+    return {
+        'transport_models': [TransportModel.objects.create(name=f'Модель {i}') for i in range(3)],
+        'package_types': [PackageType.objects.create(name=f'Упаковка {i}') for i in range(2)],
+        'statuses': [
+            DeliveryStatus.objects.create(name='В ожидании', color='#FFFF00'),
+            DeliveryStatus.objects.create(name='Проведено', color='#00FF00'),
+        ],
+        'services': [DeliveryService.objects.create(name=f'Услуга {i}') for i in range(4)],
+    }
+
+
+def create_deliveries(references, count, seed=1):
+    """
+    count доставок со всеми FK и услугами
+
+    Каждая пятая доставка без услуг, у части доставок время без микросекунд.
+    """
+    rng = random.Random(seed)
+    base = timezone.now().replace(microsecond=0) - timedelta(days=30)
+    deliveries = []
+    for index in range(count):
+        departure = base + timedelta(minutes=rng.randint(0, 40000))
+        if index % 2:
+            departure = departure.replace(microsecond=rng.randint(1, 999999))
+        deliveries.append(Delivery(
+            transport_model=rng.choice(references['transport_models']),
+            transport_number=f'А{index:03d}ВС77',
+            departure_datetime=departure,
+            arrival_datetime=departure + timedelta(hours=rng.randint(1, 48), minutes=rng.randint(0, 59)),
+            distance=round(rng.uniform(1, 500), 3),
+            departure_address='Москва, ул. Пушкина',
+            arrival_address=None if index % 3 == 0 else 'Тверь',
+            package_type=rng.choice(references['package_types']),
+            status=rng.choice(references['statuses']),
+            technical_condition=rng.choice(Delivery.TechnicalCondition.values),
+        ))
+    Delivery.objects.bulk_create(deliveries)
+
+    links = [
+        Delivery.services.through(delivery_id=delivery.id, deliveryservice_id=service.id)
+        for index, delivery in enumerate(deliveries) if index % 5
+        for service in rng.sample(references['services'], rng.randint(1, 3))
+    ]
+    Delivery.services.through.objects.bulk_create(links)
+    return deliveries
+
+
+def reset_reference_cache():
+    """Перечитывает справочники в кэш процесса: тесты не должны видеть снимки других тестов"""
+    for model in REFERENCE_MODELS:
+        reference_cache.invalidate(model)
+        reference_cache.all(model)
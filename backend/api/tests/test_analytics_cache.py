@@ -0,0 +1,93 @@
+import time
+from datetime import date
+from unittest import mock
+from django.test import TestCase, override_settings
+from api.db.routers import read_from
+from api.models import AnalyticsInvalidation, DeliveryDailyRollup
+from api.signals import rollup_changed
+from api.utils.analytics_cache import AnalyticsCache
+
+
+@override_settings(ANALYTICS_CACHE_TIMEOUT=60)
+class SharedInvalidationTests(TestCase):
+    """Сбросы кэша аналитики одного процесса применяются в остальных (отдельные экземпляры кэша)"""
+
+    def setUp(self):
+        self.worker = AnalyticsCache()
+        self.other = AnalyticsCache()
+        self.key = AnalyticsCache.key(start_date='2026-01-01', end_date='2026-01-31')
+        self.computes = 0
+
+    def compute(self):
+        self.computes += 1
+        return {'computes': self.computes}
+
+    def test_overlapping_days(self):
+        self.worker.get_or_compute(self.key, self.compute)
+        self.other.publish({date(2026, 1, 15)})
+        self.assertEqual(self.worker.get_or_compute(self.key, self.compute), {'computes': 2})
+        self.assertEqual(self.worker.stats()['shared_invalidations'], 1)
+        # Примененный сброс не применяется повторно
+        self.assertEqual(self.worker.get_or_compute(self.key, self.compute), {'computes': 2})
+
+    def test_other_days(self):
+        self.worker.get_or_compute(self.key, self.compute)
+        self.other.publish({date(2026, 2, 1)})
+        self.assertEqual(self.worker.get_or_compute(self.key, self.compute), {'computes': 1})
+
+    def test_whole_cache(self):
+        self.worker.get_or_compute(self.key, self.compute)
+        self.other.publish()
+        self.assertEqual(self.worker.get_or_compute(self.key, self.compute), {'computes': 2})
+
+    def test_own_invalidation(self):
+        self.worker.get_or_compute(self.key, self.compute)
+        self.worker.publish({date(2026, 1, 15)})
+        self.worker.get_or_compute(self.key, self.compute)
+        self.assertEqual(self.worker.stats()['shared_invalidations'], 0)
+
+    def test_published_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            rollup_changed.send(sender=DeliveryDailyRollup, days={date(2026, 1, 15)}, using='default')
+        self.assertFalse(AnalyticsInvalidation.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(list(AnalyticsInvalidation.objects.values_list('days', flat=True)), [[date(2026, 1, 15)]])
+
+
+@override_settings(ANALYTICS_CACHE_TIMEOUT=60, REPLICA_PIN_SECONDS=5)
+class ReplicaLagTests(TestCase):
+    """Ответ, вычисленный на реплике сразу после сброса, не сохраняется"""
+
+    def setUp(self):
+        self.cache = AnalyticsCache()
+        self.key = AnalyticsCache.key(start_date='2026-01-01', end_date='2026-01-31')
+        self.computes = 0
+
+    def compute(self):
+        self.computes += 1
+        return self.computes
+
+    def test_replica_after_invalidation(self):
+        self.cache.invalidate({date(2026, 1, 15)})
+        with read_from('default'):
+            self.cache.get_or_compute(self.key, self.compute)
+            self.assertEqual(self.cache.get_or_compute(self.key, self.compute), 2)
+
+    def test_replica_other_days(self):
+        self.cache.invalidate({date(2026, 2, 15)})
+        with read_from('default'):
+            self.cache.get_or_compute(self.key, self.compute)
+            self.assertEqual(self.cache.get_or_compute(self.key, self.compute), 1)
+
+    def test_primary_after_invalidation(self):
+        self.cache.invalidate({date(2026, 1, 15)})
+        self.cache.get_or_compute(self.key, self.compute)
+        self.assertEqual(self.cache.get_or_compute(self.key, self.compute), 1)
+
+    def test_replica_after_pin_window(self):
+        self.cache.invalidate({date(2026, 1, 15)})
+        with mock.patch('api.utils.analytics_cache.time.monotonic', return_value=time.monotonic() + 6):
+            with read_from('default'):
+                self.cache.get_or_compute(self.key, self.compute)
+                self.assertEqual(self.cache.get_or_compute(self.key, self.compute), 1)
@@ -0,0 +1,86 @@
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
+from api.models import DeliveryDailyRollup
+from api.serializers import DeliveryListSerializer
+from api.tests.fixtures import create_deliveries, create_references, reset_reference_cache
+from api.utils.benchmark import build_view
+from api.utils.fast_serialization import get_values_serializer
+from api.views import DeliveryViewSet
+
+
+class RollupServiceSerializer(serializers.ModelSerializer):
+    """Поля через FK, допускающий NULL (service)"""
+
+    service_name = serializers.CharField(source='service.name', read_only=True)
+
+    class Meta:
+        model = DeliveryDailyRollup
+        fields = ('day', 'count', 'service_name')
+
+
+class RollupServiceIdSerializer(serializers.ModelSerializer):
+    service_id = serializers.UUIDField(read_only=True)
+
+    class Meta:
+        model = DeliveryDailyRollup
+        fields = ('day', 'service_id')
+
+
+class ValuesSerializerParityTests(TestCase):
+    """ValuesSerializer отдает тот же JSON, что и DeliveryListSerializer(many=True)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.references = create_references()
+        cls.deliveries = create_deliveries(cls.references, 60)
+
+    def setUp(self):
+        reset_reference_cache()
+
+    def assertParity(self, query_string=''):
+        view = build_view(DeliveryViewSet, query_string)
+        queryset = view.filter_queryset(view.get_queryset())
+        values_serializer = get_values_serializer(view.get_serializer())
+        self.assertIsNotNone(values_serializer, f'быстрый путь недоступен для ?{query_string}')
+
+        expected = view.get_serializer(list(queryset), many=True).data
+        actual = values_serializer.serialize(values_serializer.prepare(queryset, extra_fields=view.get_page_columns()))
+        self.assertEqual(len(actual), len(self.deliveries))
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(actual).decode(), renderer.render(expected).decode())
+        return actual
+
+    def test_default_fields(self):
+        data = self.assertParity()
+        self.assertEqual(tuple(data[0]), DeliveryListSerializer.Meta.fields)
+
+    def test_empty_services(self):
+        data = self.assertParity()
+        self.assertIn([], [item['services'] for item in data])
+        self.assertTrue(any(item['services'] for item in data))
+
+    def test_fields(self):
+        data = self.assertParity('fields=id,transport_number,status_name,departure_datetime,services')
+        self.assertEqual(list(data[0]), ['id', 'transport_number', 'departure_datetime', 'status_name', 'services'])
+
+    def test_omit(self):
+        data = self.assertParity('omit=services,status_color,created_at')
+        self.assertNotIn('services', data[0])
+        self.assertNotIn('created_at', data[0])
+
+    def test_ordering(self):
+        self.assertParity('ordering=-distance')
+
+    def test_time_zones(self):
+        # Время отдается в текущем часовом поясе запроса, UTC - с суффиксом Z
+        for name, suffix in (('UTC', 'Z'), ('Europe/Moscow', '+03:00'), ('America/New_York', '-0')):
+            with self.subTest(time_zone=name), timezone.override(name):
+                data = self.assertParity()
+                self.assertIn(suffix, data[0]['departure_datetime'])
+
+    def test_nullable_foreign_keys_fall_back(self):
+        # Для FK с NULL values() и DRF расходятся, поэтому быстрый путь не компилируется
+        self.assertIsNone(get_values_serializer(RollupServiceSerializer()))
+        self.assertIsNone(get_values_serializer(RollupServiceIdSerializer()))
@@ -0,0 +1,42 @@
+import io
+import json
+import shutil
+import tempfile
+from django.test import SimpleTestCase
+from api.utils import logger_utils
+
+
+class BackgroundWriterTests(SimpleTestCase):
+    """Фоновая запись структурированного журнала не теряет строки и не оставляет потоков"""
+
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.log_dir, True)
+        self.stream = io.StringIO()
+        logger_utils.setup_logging(structured=True, stream=self.stream, log_dir=self.log_dir)
+
+    def tearDown(self):
+        logger_utils.setup_logging()
+
+    def lines(self):
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def log(self, count):
+        for index in range(count):
+            logger_utils.log_record('INFO', 'Запрос', {'index': index})
+
+    def test_reconfigure_stops_writer(self):
+        writer = logger_utils._background_writer
+        self.log(1000)
+        logger_utils.setup_logging(structured=True, stream=self.stream, log_dir=self.log_dir)
+        self.assertTrue(writer.stopped)
+        self.assertFalse(writer.thread.is_alive())
+        self.assertEqual(len(self.lines()), 1000)
+
+    def test_exit_writes_queue(self):
+        writer = logger_utils._background_writer
+        self.log(1000)
+        logger_utils._stop_background_writer()
+        self.assertIsNone(logger_utils._background_writer)
+        self.assertFalse(writer.thread.is_alive())
+        self.assertEqual([line['index'] for line in self.lines()], list(range(1000)))
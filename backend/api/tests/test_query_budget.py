@@ -0,0 +1,92 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from api.tests.fixtures import create_deliveries, create_references, reset_reference_cache
+from api.utils.query_budget import QueryBudgetExceeded
+from api.views import DeliveryViewSet
+
+PAGE_SIZE = 200
+# Сверка версий справочников в ReferenceCacheMiddleware - до представления, вне бюджета действия
+MIDDLEWARE_QUERIES = 1
+
+
+@override_settings(QUERY_BUDGET_MODE='raise')
+class DeliveryQueryBudgetTests(TestCase):
+    """
+    Число SQL-запросов списка и карточки доставки не зависит от числа строк
+
+    В режиме QUERY_BUDGET_MODE='raise' превышение бюджета QueryBudgetMixin
+    выбрасывает QueryBudgetExceeded, и тест падает. Запросы считаются и здесь,
+    чтобы сообщение об ошибке показало их текст. Пользователь аутентифицируется
+    по JWT, поэтому его загрузка входит в бюджет, как в рабочем запросе.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('budget', password='budget-password')
+        cls.references = create_references()
+        cls.deliveries = create_deliveries(cls.references, PAGE_SIZE + 50)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        # Заполнение кэша справочников - разовая загрузка процесса, в бюджет запроса не входит
+        reset_reference_cache()
+
+    def get(self, url, budget):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        self.assertLessEqual(
+            len(queries), budget + MIDDLEWARE_QUERIES, '\n'.join(query['sql'] for query in queries.captured_queries)
+        )
+        return response
+
+    def test_list(self):
+        response = self.get(f'/api/deliveries/?page_size={PAGE_SIZE}', DeliveryViewSet.query_budget['list'])
+        results = response.json()['results']
+        self.assertEqual(len(results), PAGE_SIZE)
+        self.assertTrue(any(item['services'] for item in results))
+        self.assertTrue(all(item['status_name'] and item['transport_model_name'] for item in results))
+
+    def test_list_without_values_path(self):
+        # Обычный сериализатор DRF: FK через JOIN, услуги одним prefetch-запросом
+        with mock.patch.object(DeliveryViewSet, 'values_list_enabled', False):
+            response = self.get(f'/api/deliveries/?page_size={PAGE_SIZE}', DeliveryViewSet.query_budget['list'])
+        self.assertEqual(len(response.json()['results']), PAGE_SIZE)
+
+    def test_list_filtered(self):
+        service = self.references['services'][0]
+        url = f'/api/deliveries/?page_size={PAGE_SIZE}&services={service.id}&search=Тверь&ordering=-distance'
+        response = self.get(url, DeliveryViewSet.query_budget['list'])
+        self.assertTrue(response.json()['results'])
+
+    def test_list_cursor(self):
+        budget = DeliveryViewSet.query_budget['list_cursor']
+        response = self.get(f'/api/deliveries/?pagination=cursor&page_size={PAGE_SIZE}', budget)
+        data = response.json()
+        self.assertEqual(len(data['results']), PAGE_SIZE)
+        # Глубина страницы не меняет число запросов
+        response = self.get(data['next'], budget)
+        self.assertEqual(len(response.json()['results']), 50)
+
+    def test_retrieve(self):
+        delivery = next(delivery for delivery in self.deliveries if delivery.services.exists())
+        response = self.get(f'/api/deliveries/{delivery.id}/', DeliveryViewSet.query_budget['retrieve'])
+        self.assertEqual(response.json()['id'], str(delivery.id))
+        self.assertTrue(response.json()['services'])
+
+    @override_settings(DATABASE_REPLICAS=['default'])
+    def test_list_with_replica(self):
+        # Проверка закрепления пользователя за основной БД - один запрос сверх бюджета действия
+        response = self.get(f'/api/deliveries/?page_size={PAGE_SIZE}', DeliveryViewSet.query_budget['list'] + 1)
+        self.assertEqual(len(response.json()['results']), PAGE_SIZE)
+
+    def test_exceeded_budget_raises(self):
+        with mock.patch.object(DeliveryViewSet, 'query_budget', {'list': 1}):
+            with self.assertRaises(QueryBudgetExceeded), self.assertLogs('django.request', 'ERROR'):
+                self.client.get(f'/api/deliveries/?page_size={PAGE_SIZE}')
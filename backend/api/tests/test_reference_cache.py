@@ -0,0 +1,72 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from api.models import Delivery, DeliveryStatus, ReferenceVersion
+from api.tests.fixtures import create_deliveries, create_references, reset_reference_cache
+from api.utils.reference_cache import ReferenceCache
+
+
+@override_settings(REFERENCE_CACHE_TIMEOUT=60)
+class SharedVersionTests(TestCase):
+    """Изменения справочников одного процесса видны остальным (отдельные экземпляры кэша)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reference', password='reference-password')
+        cls.references = create_references()
+        cls.source = create_deliveries(cls.references, 1)[0]
+
+    def setUp(self):
+        reset_reference_cache()
+        self.worker = ReferenceCache()
+        self.other = ReferenceCache()
+
+    def delete_in_other_worker(self, obj):
+        with mock.patch('api.utils.reference_cache.reference_cache', self.other), \
+                self.captureOnCommitCallbacks(execute=True):
+            obj.delete()
+
+    def test_deleted(self):
+        status = DeliveryStatus.objects.create(name='Отменено')
+        self.assertEqual(self.worker.get(DeliveryStatus, status.pk), status)
+        self.delete_in_other_worker(status)
+        self.assertEqual(ReferenceVersion.objects.get(model='api.DeliveryStatus').version, 1)
+
+        self.worker.sync()
+        self.assertIsNone(self.worker.get(DeliveryStatus, status.pk))
+        self.assertEqual(self.worker.stats()['deliverystatus']['shared_invalidations'], 1)
+        # Примененное изменение не сбрасывает снимок повторно
+        self.worker.sync()
+        self.assertEqual(self.worker.stats()['deliverystatus']['shared_invalidations'], 1)
+
+    def test_own_change(self):
+        self.worker.sync()
+        self.worker.publish(DeliveryStatus)
+        self.worker.sync()
+        self.assertEqual(self.worker.stats()['deliverystatus']['shared_invalidations'], 0)
+
+    def test_create_with_deleted_status(self):
+        # Статус удален в другом воркере: проверка pk - ошибка 400, а не нарушение FK при INSERT
+        status = DeliveryStatus.objects.create(name='Отменено')
+        pk = status.pk
+        reset_reference_cache()
+        self.delete_in_other_worker(status)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        response = client.post('/api/deliveries/', {
+            'transport_model': self.source.transport_model_id,
+            'transport_number': 'Г001ВС77',
+            'departure_datetime': self.source.departure_datetime.isoformat(),
+            'arrival_datetime': self.source.arrival_datetime.isoformat(),
+            'distance': 5,
+            'departure_address': 'Москва',
+            'package_type': self.source.package_type_id,
+            'status': pk,
+            'services': [],
+        }, format='json')
+        self.assertEqual(response.status_code, 400, response.content[:500])
+        self.assertEqual(response.json()['status'][0], f'Недопустимый первичный ключ "{pk}" - объект не существует.')
+        self.assertEqual(Delivery.objects.count(), 1)
@@ -0,0 +1,43 @@
+import time
+from unittest import mock
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from api.db import routers
+from api.tests.fixtures import create_deliveries, create_references, reset_reference_cache
+
+
+class PrimaryPinTests(TestCase):
+    """Закрепление за основной БД общее для воркеров (отдельные экземпляры _PrimaryPins)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('pinned', password='pinned-password')
+
+    def test_shared(self):
+        routers._PrimaryPins().pin(self.user.pk, time.time() + 5)
+        self.assertTrue(routers._PrimaryPins().is_pinned(self.user.pk))
+
+    def test_expired(self):
+        routers._PrimaryPins().pin(self.user.pk, time.time() - 1)
+        self.assertFalse(routers._PrimaryPins().is_pinned(self.user.pk))
+
+    @override_settings(DATABASE_REPLICAS=['default'])
+    def test_bearer_client_in_other_worker(self):
+        delivery = create_deliveries(create_references(), 1)[0]
+        reset_reference_cache()
+        token = f'Bearer {AccessToken.for_user(self.user)}'
+
+        writer = APIClient()
+        writer.credentials(HTTP_AUTHORIZATION=token)
+        response = writer.patch(f'/api/deliveries/{delivery.pk}/', {'distance': 10}, format='json')
+        self.assertEqual(response.status_code, 200, response.content[:500])
+
+        # Чтение без cookie в воркере, который не обрабатывал запись
+        reader = APIClient()
+        reader.credentials(HTTP_AUTHORIZATION=token)
+        with mock.patch('api.views.mixins.primary_pins', routers._PrimaryPins()), \
+                mock.patch('api.views.mixins.read_from_primary', wraps=routers.read_from_primary) as primary:
+            self.assertEqual(reader.get('/api/deliveries/').status_code, 200)
+        primary.assert_called_once()
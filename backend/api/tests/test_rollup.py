@@ -0,0 +1,165 @@
+from datetime import timedelta
+from unittest import mock
+from django.db import connection
+from django.db.transaction import TransactionManagementError
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from api.models import Delivery, DeliveryDailyRollup
+from api.serializers import DeliveryDetailSerializer
+from api.signals import pre_bulk_write
+from api.tests.fixtures import create_deliveries, create_references, reset_reference_cache
+from api.utils import rollup
+from api.utils.bulk import BulkWriter
+from api.utils.status_transitions import transition_deliveries
+
+
+class RollupDeltaTests(TestCase):
+    """
+    Изменения доставок переносятся в дневной свод по дельтам
+
+    После каждого изменения свод должен совпасть с пересчетом тех же дней
+    по данным доставок (rollup.rebuild).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.references = create_references()
+        cls.deliveries = create_deliveries(cls.references, 40)
+        rollup.rebuild()
+
+    def setUp(self):
+        reset_reference_cache()
+
+    def snapshot(self):
+        return {
+            (row.day, row.status_id, row.transport_model_id, row.service_id): (
+                row.count, round(row.distance_sum, 6), round(row.duration_sum, 6), row.without_services_count
+            )
+            for row in DeliveryDailyRollup.objects.all()
+        }
+
+    def assertConsistent(self):
+        actual = self.snapshot()
+        rollup.rebuild()
+        self.assertEqual(actual, self.snapshot())
+
+    def delivery(self, index=0, with_services=True):
+        deliveries = [delivery for number, delivery in enumerate(self.deliveries) if bool(number % 5) == with_services]
+        return Delivery.objects.get(pk=deliveries[index].pk)
+
+    def test_save(self):
+        delivery = self.delivery()
+        delivery.status = self.references['statuses'][1]
+        delivery.distance += 10
+        delivery.arrival_datetime += timedelta(days=3)
+        delivery.save()
+        self.assertConsistent()
+
+    def test_save_update_fields(self):
+        delivery = self.delivery()
+        delivery.transport_model = next(
+            model for model in self.references['transport_models'] if model.pk != delivery.transport_model_id
+        )
+        delivery.distance = 0
+        delivery.save(update_fields=['transport_model'])
+        self.assertConsistent()
+
+    def test_save_deferred(self):
+        delivery = Delivery.objects.only('id', 'departure_datetime').get(pk=self.deliveries[1].pk)
+        delivery.departure_datetime -= timedelta(hours=5)
+        delivery.save()
+        self.assertConsistent()
+
+    def test_create_and_delete(self):
+        source = self.delivery()
+        delivery = Delivery.objects.create(
+            transport_model=source.transport_model,
+            transport_number='Б001ВС77',
+            departure_datetime=source.departure_datetime,
+            arrival_datetime=source.arrival_datetime + timedelta(days=40),
+            distance=12.5,
+            departure_address='Москва',
+            package_type=source.package_type,
+            status=source.status,
+        )
+        self.assertConsistent()
+        self.delivery(1).delete()
+        delivery.delete()
+        self.assertConsistent()
+
+    def test_delete_deferred(self):
+        # Частично загруженные доставки (не BulkWriter) тоже вычитаются из свода
+        Delivery.objects.filter(pk=self.deliveries[1].pk).only('pk').delete()
+        self.assertConsistent()
+        Delivery.objects.filter(pk__in=[self.deliveries[2].pk, self.deliveries[3].pk]).defer('arrival_datetime').delete()
+        self.assertConsistent()
+        self.assertEqual(Delivery.objects.count(), len(self.deliveries) - 3)
+
+    def test_services(self):
+        services = self.references['services']
+        delivery = self.delivery(with_services=False)
+        delivery.services.add(*services[:2])
+        self.assertConsistent()
+        delivery.services.remove(services[0], services[3])
+        self.assertConsistent()
+        delivery.services.clear()
+        self.assertConsistent()
+
+    def test_services_reverse(self):
+        service = self.references['services'][0]
+        service.deliveries.add(self.delivery(with_services=False), self.delivery(1, with_services=False))
+        self.assertConsistent()
+        service.deliveries.remove(self.delivery(with_services=False))
+        self.assertConsistent()
+        service.deliveries.clear()
+        self.assertConsistent()
+
+    def test_service_delete(self):
+        self.references['services'][1].delete()
+        self.assertConsistent()
+
+    def test_transition(self):
+        pending, done = self.references['statuses']
+        ids = list(Delivery.objects.filter(status=pending).values_list('pk', flat=True)[:10])
+        with CaptureQueriesContext(connection) as queries:
+            transition_deliveries(ids, done)
+        self.assertConsistent()
+        # Точка сохранения, чтение прежних строк, UPDATE, чтение новых, блокировки дней,
+        # изменение свода, удаление опустевших строк
+        self.assertLessEqual(len(queries), 8, '\n'.join(query['sql'] for query in queries.captured_queries))
+
+    def test_bulk(self):
+        source = self.delivery()
+        item = {
+            'transport_model': source.transport_model_id,
+            'transport_number': 'В001ВС77',
+            'departure_datetime': source.departure_datetime.isoformat(),
+            'arrival_datetime': (source.arrival_datetime + timedelta(days=2)).isoformat(),
+            'distance': 5,
+            'departure_address': 'Москва',
+            'package_type': source.package_type_id,
+            'status': source.status_id,
+            'services': [self.references['services'][2].pk],
+        }
+        result = BulkWriter(DeliveryDetailSerializer).save(
+            create=[item],
+            update=[{'id': source.pk, 'distance': 1, 'services': []}],
+        )
+        self.assertEqual(len(result.created) + len(result.updated), 2, result.errors)
+        self.assertConsistent()
+        result = BulkWriter(DeliveryDetailSerializer).save(delete=[self.deliveries[2].pk, self.deliveries[3].pk])
+        self.assertEqual(len(result.deleted), 2, result.errors)
+        self.assertConsistent()
+
+    def test_save_queries(self):
+        delivery = self.delivery()
+        delivery.status = self.references['statuses'][1]
+        with CaptureQueriesContext(connection) as queries:
+            delivery.save()
+        # Чтение прежней строки, UPDATE, блокировки дней, изменение свода, удаление опустевших строк
+        self.assertLessEqual(len(queries), 5, '\n'.join(query['sql'] for query in queries.captured_queries))
+
+    def test_requires_transaction(self):
+        with mock.patch.object(connection, 'in_atomic_block', False):
+            with self.assertRaises(TransactionManagementError):
+                pre_bulk_write.send(sender=Delivery, pks=[self.deliveries[0].pk], using='default', state={})
@@ -10,7 +10,8 @@ from .views import (
     DeliveryServiceViewSet,
     DeliveryStatusViewSet,
     CargoTypeViewSet,
-    DeliveryAnalyticsViewSet
+    DeliveryAnalyticsViewSet,
+    InternalMetricsView
 )
 
 # Создаем роутер для ViewSet
@@ -29,6 +30,9 @@ urlpatterns = [
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/me/', UserProfileView.as_view(), name='user_profile'),
 
+    # Служебные метрики
+    path('internal/metrics/', InternalMetricsView.as_view(), name='internal_metrics'),
+
     # ViewSet маршруты
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -0,0 +1,416 @@
+from datetime import datetime
+from django.contrib.postgres.fields import ArrayField
+from django.db import connections, router
+from django.db.models import DateField, DateTimeField, F, UUIDField, Value
+from django.db.models.functions import Cast, Trunc
+from django.utils import timezone
+from api.models import DeliveryDailyRollup, DeliveryService, DeliveryStatus, TransportModel
+from api.utils.filters import parse_date
+from api.utils.reference_cache import reference_cache
+from api.utils.rollup import delivery_bounds
+
+BUCKET_HOUR = 'hour'
+BUCKET_DAY = 'day'
+BUCKET_WEEK = 'week'
+BUCKET_MONTH = 'month'
+BUCKET_AUTO = 'auto'
+BUCKETS = (BUCKET_HOUR, BUCKET_DAY, BUCKET_WEEK, BUCKET_MONTH, BUCKET_AUTO)
+
+# Интервалы по возрастанию и их примерная длина в днях (для выбора bucket=auto)
+_BUCKET_DAYS = ((BUCKET_HOUR, 1 / 24), (BUCKET_DAY, 1), (BUCKET_WEEK, 7), (BUCKET_MONTH, 30.4))
+
+# Наибольшее число точек временного ряда при bucket=auto
+AUTO_BUCKET_MAX_POINTS = 200
+
+
+def resolve_bucket(bucket, start_date=None, end_date=None):
+    """
+    Интервал временного ряда; для auto - наименьший, при котором точек не больше AUTO_BUCKET_MAX_POINTS
+
+    Незаданные границы периода берутся по самой ранней и самой поздней доставке (с учетом архива).
+    """
+    if bucket != BUCKET_AUTO:
+        return bucket
+    start = parse_date(start_date) if start_date else None
+    end = parse_date(end_date) if end_date else None
+    if start is None or end is None:
+        first, last = delivery_bounds()
+        if first is None:
+            return BUCKET_DAY
+        start = start or timezone.localtime(first).date()
+        end = end or timezone.localtime(last).date()
+    days = max((end - start).days + 1, 1)
+    for name, length in _BUCKET_DAYS:
+        if days / length <= AUTO_BUCKET_MAX_POINTS:
+            return name
+    return BUCKET_MONTH
+
+
+def _bucket_value(value, bucket):
+    """Начало интервала из DATE_TRUNC: дата для day/week/month, момент времени в TIME_ZONE для hour"""
+    if not isinstance(value, datetime):
+        return value
+    if bucket == BUCKET_HOUR:
+        return timezone.make_aware(value, timezone.get_default_timezone())
+    return value.date()
+
+
+def _build(rows, bucket=BUCKET_DAY, unnamed_services=True):
+    """
+    Ответ аналитики из строк (группировка, интервал, статус, ключ, количество, сумма дистанций)
+
+    Группировка - period, status, transport или service; ключ - модель транспорта или услуга.
+    Группы справочников объединяются по названию, как при группировке по name в ORM.
+    """
+    daily, statuses, transports, services = [], {}, {}, {}
+    for grouping, period, status_id, key, count, total_distance in rows:
+        if grouping == 'period':
+            daily.append({
+                'date': _bucket_value(period, bucket),
+                'count': count,
+                'total_distance': total_distance,
+                'avg_distance': total_distance / count,
+            })
+        elif grouping == 'status':
+            status = reference_cache.get(DeliveryStatus, status_id)
+            name = (status.name, status.color) if status else (None, None)
+            statuses[name] = statuses.get(name, 0) + count
+        elif grouping == 'transport':
+            transport = reference_cache.get(TransportModel, key)
+            name = transport.name if transport else None
+            transports[name] = transports.get(name, 0) + count
+        elif key is not None or unnamed_services:
+            # Доставки без услуг попадают в группу без названия, как при LEFT JOIN по services
+            service = reference_cache.get(DeliveryService, key) if key is not None else None
+            name = service.name if service else None
+            services[name] = services.get(name, 0) + count
+
+    daily.sort(key=lambda item: item['date'])
+    return {
+        'bucket': bucket,
+        'daily_stats': daily,
+        'status_stats': [
+            {'status__name': name, 'status__color': color, 'count': count}
+            for (name, color), count in _by_count(statuses)
+        ],
+        'transport_stats': [
+            {'transport_model__name': name, 'count': count}
+            for name, count in _by_count(transports)
+        ],
+        'service_stats': [
+            {'services__name': name, 'count': count}
+            for name, count in _by_count(services)
+        ],
+        'total_deliveries': sum(item['count'] for item in daily),
+        'total_distance': sum(item['total_distance'] for item in daily),
+    }
+
+
+def _by_count(groups):
+    """Группы по убыванию числа доставок, как order_by('-count')"""
+    return sorted(groups.items(), key=lambda item: -item[1])
+
+
+class DeliveryAnalytics:
+    """
+    Аналитика доставок за один проход по отфильтрованным строкам
+
+    Отфильтрованные доставки читаются один раз в материализованный CTE.
+    Статистика по интервалам bucket (начало интервала - DATE_TRUNC в TIME_ZONE), статусам и моделям транспорта считается из него одним
+    GROUP BY GROUPING SETS, статистика по услугам - соединением того же CTE
+    с промежуточной таблицей услуг. Итоги складываются из статистики по дням.
+    Названия статусов, моделей и услуг берутся из кэша справочников.
+
+    Результат совпадает по форме с DeliveryAnalyticsSerializer.
+    Архивные доставки (archive - queryset DeliveryArchive с теми же фильтрами)
+    добавляются в CTE через UNION ALL, их услуги берутся из массива services.
+    """
+
+    def __init__(self, queryset, service_ids=(), bucket=BUCKET_DAY, archive=None):
+        self.queryset = queryset
+        self.service_ids = list(service_ids)
+        self.bucket = bucket
+        self.archive = archive
+
+    def _rows(self, queryset, services):
+        output_field = DateTimeField() if self.bucket == BUCKET_HOUR else DateField()
+        return queryset.order_by().annotate(
+            _period=Trunc('arrival_datetime', self.bucket, output_field=output_field),
+            _services=services,
+        ).values_list('pk', '_period', 'status_id', 'transport_model_id', 'distance', '_services')
+
+    def compute(self):
+        # У действующих доставок услуги в промежуточной таблице, в CTE для них NULL
+        base = self._rows(self.queryset, Cast(Value(None), ArrayField(UUIDField())))
+        base_sql, params = base.query.sql_with_params()
+        model = self.queryset.model
+        through = model._meta.get_field('services').remote_field.through
+        connection = connections[self.queryset.db]
+        qn = connection.ops.quote_name
+
+        # При фильтре по услугам статистика услуг считается только по выбранным
+        service_condition = ''
+        service_params = []
+        if self.service_ids:
+            service_condition = f' AND t.{qn("deliveryservice_id")} = ANY(%s::uuid[])'
+            service_params = [self.service_ids]
+
+        archive_rows = archive_services = ''
+        archive_params = archive_service_params = []
+        if self.archive is not None:
+            archive_sql, archive_params = self._rows(self.archive, F('services')).query.sql_with_params()
+            archive_rows = f' UNION ALL ({archive_sql})'
+            # Архивная доставка без (выбранных) услуг попадает в группу без услуги, как при LEFT JOIN
+            archive_condition = ' WHERE a.id = ANY(%s::uuid[])' if self.service_ids else ''
+            archive_services = f"""
+                UNION ALL
+                SELECT 'service', NULL, NULL, a.id, COUNT(*), NULL
+                FROM d LEFT JOIN LATERAL (
+                    SELECT a.id FROM unnest(d.{qn("_services")}) AS a(id){archive_condition}
+                ) a ON TRUE
+                WHERE d.{qn("_services")} IS NOT NULL
+                GROUP BY a.id
+            """
+            archive_service_params = service_params
+
+        sql = f"""
+            WITH d AS MATERIALIZED (({base_sql}){archive_rows})
+            SELECT
+                CASE
+                    WHEN GROUPING(d.{qn("_period")}) = 0 THEN 'period'
+                    WHEN GROUPING(d.{qn("status_id")}) = 0 THEN 'status'
+                    ELSE 'transport'
+                END,
+                d.{qn("_period")}, d.{qn("status_id")}, d.{qn("transport_model_id")},
+                COUNT(*), SUM(d.{qn("distance")})
+            FROM d
+            GROUP BY GROUPING SETS ((d.{qn("_period")}), (d.{qn("status_id")}), (d.{qn("transport_model_id")}))
+            UNION ALL
+            SELECT 'service', NULL, NULL, t.{qn("deliveryservice_id")}, COUNT(*), NULL
+            FROM d LEFT JOIN {qn(through._meta.db_table)} t
+                ON t.{qn("delivery_id")} = d.{qn("id")}{service_condition}
+            WHERE d.{qn("_services")} IS NULL
+            GROUP BY t.{qn("deliveryservice_id")}
+            {archive_services}
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*params, *archive_params, *service_params, *archive_service_params])
+            rows = cursor.fetchall()
+        return _build(rows, self.bucket, unnamed_services=not self.service_ids)
+
+
+class RollupAnalytics:
+    """
+    Аналитика доставок по дневному своду (DeliveryDailyRollup)
+
+    Свод отвечает на фильтр по диапазону дат и не более чем одной услуге с интервалом
+    не меньше дня: для одной услуги берутся ее строки свода, без услуги - итоговые
+    строки (service = NULL). Недели и месяцы - DATE_TRUNC по дням свода.
+    Запрос читает несколько строк на день вместо всех доставок за период.
+    Результат совпадает по форме и значениям с DeliveryAnalytics (с точностью
+    до порядка сложения сумм).
+    """
+
+    def __init__(self, start_date=None, end_date=None, service_ids=(), bucket=BUCKET_DAY):
+        self.bucket = bucket
+        self.start_date = parse_date(start_date) if start_date else None
+        self.end_date = parse_date(end_date) if end_date else None
+        service_ids = list(dict.fromkeys(service_ids))
+        # Некорректный идентификатор дает ту же ошибку, что и фильтр по услугам
+        self.service_id = DeliveryService._meta.pk.to_python(service_ids[0]) if service_ids else None
+
+    @staticmethod
+    def supports(service_ids=(), bucket=BUCKET_DAY, **filters):
+        """Можно ли ответить по своду: только даты, не более одной услуги и интервал от дня"""
+        return not any(filters.values()) and len(set(service_ids)) <= 1 and bucket != BUCKET_HOUR
+
+    def compute(self):
+        using = router.db_for_read(DeliveryDailyRollup)
+        connection = connections[using]
+        qn = connection.ops.quote_name
+        table = qn(DeliveryDailyRollup._meta.db_table)
+
+        conditions, params = [], []
+        if self.start_date:
+            conditions.append('day >= %s')
+            params.append(self.start_date)
+        if self.end_date:
+            conditions.append('day <= %s')
+            params.append(self.end_date)
+        days = ''.join(f' AND {condition}' for condition in conditions)
+
+        if self.service_id is None:
+            sql = f"""
+                {self._grouping_sets_sql(table, 'service_id IS NULL' + days)}
+                UNION ALL
+                SELECT 'service', NULL, NULL, service_id, SUM(count), NULL
+                FROM {table} WHERE service_id IS NOT NULL{days}
+                GROUP BY service_id
+                UNION ALL
+                SELECT 'service', NULL, NULL, NULL, SUM(without_services_count), NULL
+                FROM {table} WHERE service_id IS NULL{days}
+                HAVING SUM(without_services_count) > 0
+            """
+            params = params * 3
+        else:
+            sql = f"""
+                {self._grouping_sets_sql(table, 'service_id = %s' + days)}
+                UNION ALL
+                SELECT 'service', NULL, NULL, service_id, SUM(count), NULL
+                FROM {table} WHERE service_id = %s{days}
+                GROUP BY service_id
+            """
+            params = [self.service_id, *params] * 2
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return _build(rows, self.bucket, unnamed_services=self.service_id is None)
+
+    def _grouping_sets_sql(self, table, where):
+        period = 'day' if self.bucket == BUCKET_DAY else f"date_trunc('{self.bucket}', day::timestamp)::date"
+        return f"""
+            SELECT
+                CASE
+                    WHEN GROUPING({period}) = 0 THEN 'period'
+                    WHEN GROUPING(status_id) = 0 THEN 'status'
+                    ELSE 'transport'
+                END,
+                {period}, status_id, transport_model_id, SUM(count), SUM(distance_sum)
+            FROM {table}
+            WHERE {where}
+            GROUP BY GROUPING SETS (({period}), (status_id), (transport_model_id))
+        """
+
+
+SECTION_PERCENTILES = 'percentiles'
+SECTION_HISTOGRAM = 'histogram'
+SECTIONS = (SECTION_PERCENTILES, SECTION_HISTOGRAM)
+
+# Перцентили длительности (в процентах) и число интервалов гистограммы дистанций
+DURATION_PERCENTILES = (50, 90, 99)
+HISTOGRAM_BUCKETS = 20
+
+
+class DeliveryDistributions:
+    """
+    Распределения длительности и дистанции по отфильтрованным доставкам
+
+    Перцентили длительности (percentile_cont) и гистограмма дистанций (width_bucket
+    по равным интервалам от наименьшей до наибольшей дистанции) считаются по статусам
+    и моделям транспорта одним запросом по материализованному CTE.
+    Дневной свод на эти разделы не отвечает: перцентили не складываются из дневных
+    сумм, а границы гистограммы зависят от фильтров. Архивные доставки (archive)
+    добавляются в CTE через UNION ALL.
+    """
+
+    def __init__(self, queryset, sections=SECTIONS, archive=None):
+        self.queryset = queryset
+        self.sections = set(sections)
+        self.archive = archive
+
+    def compute(self):
+        if not self.sections:
+            return {}
+        columns = ('pk', 'status_id', 'transport_model_id', 'distance', 'duration')
+        base_sql, params = self.queryset.order_by().values_list(*columns).query.sql_with_params()
+        if self.archive is not None:
+            # Архивные доставки с теми же фильтрами входят в распределения наравне с остальными
+            archive_sql, archive_params = self.archive.order_by().values_list(*columns).query.sql_with_params()
+            base_sql, params = f'({base_sql}) UNION ALL ({archive_sql})', (*params, *archive_params)
+        connection = connections[self.queryset.db]
+        qn = connection.ops.quote_name
+        status, transport = f'd.{qn("status_id")}', f'd.{qn("transport_model_id")}'
+        distance, duration = f'd.{qn("distance")}', f'd.{qn("duration")}'
+
+        parts, part_params = [], []
+        if SECTION_PERCENTILES in self.sections:
+            parts.append(f"""
+                SELECT
+                    CASE WHEN GROUPING({status}) = 0 THEN 'percentiles_status' ELSE 'percentiles_transport' END,
+                    {status}, {transport}, NULL::integer, COUNT(*),
+                    percentile_cont(%s::float8[]) WITHIN GROUP (ORDER BY {duration})
+                FROM d
+                GROUP BY GROUPING SETS (({status}), ({transport}))
+            """)
+            part_params.append([percent / 100 for percent in DURATION_PERCENTILES])
+        if SECTION_HISTOGRAM in self.sections:
+            # Наибольшая дистанция попадает в последний интервал, а не за его границу
+            parts.append(f"""
+                SELECT 'bounds', NULL, NULL, NULL, COUNT(*), ARRAY[MIN({distance}), MAX({distance})] FROM d
+                UNION ALL
+                SELECT
+                    CASE WHEN GROUPING({status}) = 0 THEN 'histogram_status' ELSE 'histogram_transport' END,
+                    {status}, {transport}, d.bucket, COUNT(*), NULL
+                FROM (
+                    SELECT d.*, CASE WHEN b.hi > b.lo
+                        THEN LEAST(width_bucket({distance}, b.lo, b.hi, %s), %s) ELSE 1 END AS bucket
+                    FROM d, (SELECT MIN({distance}) AS lo, MAX({distance}) AS hi FROM d) b
+                ) d
+                GROUP BY GROUPING SETS (({status}, d.bucket), ({transport}, d.bucket))
+            """)
+            part_params += [HISTOGRAM_BUCKETS, HISTOGRAM_BUCKETS]
+
+        sql = f'WITH d AS MATERIALIZED ({base_sql}) ' + ' UNION ALL '.join(parts)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [*params, *part_params])
+            rows = cursor.fetchall()
+        return self._build(rows)
+
+    def _build(self, rows):
+        by_status, by_transport, histogram_status, histogram_transport, edges = [], [], {}, {}, []
+        for grouping, status_id, transport_id, bucket, count, values in rows:
+            if grouping == 'percentiles_status':
+                status = reference_cache.get(DeliveryStatus, status_id)
+                by_status.append({
+                    'status__name': status.name if status else None,
+                    'status__color': status.color if status else None,
+                    'count': count,
+                    **self._percentiles(values),
+                })
+            elif grouping == 'percentiles_transport':
+                transport = reference_cache.get(TransportModel, transport_id)
+                by_transport.append({
+                    'transport_model__name': transport.name if transport else None,
+                    'count': count,
+                    **self._percentiles(values),
+                })
+            elif grouping == 'bounds':
+                low, high = values
+                if count:
+                    step = (high - low) / HISTOGRAM_BUCKETS
+                    edges = [low + step * index for index in range(HISTOGRAM_BUCKETS)] + [high]
+            elif grouping == 'histogram_status':
+                histogram_status.setdefault(status_id, [0] * HISTOGRAM_BUCKETS)[bucket - 1] = count
+            else:
+                histogram_transport.setdefault(transport_id, [0] * HISTOGRAM_BUCKETS)[bucket - 1] = count
+
+        result = {}
+        if SECTION_PERCENTILES in self.sections:
+            result['duration_percentiles'] = {
+                'by_status': sorted(by_status, key=lambda item: -item['count']),
+                'by_transport': sorted(by_transport, key=lambda item: -item['count']),
+            }
+        if SECTION_HISTOGRAM in self.sections:
+            statuses = []
+            for status_id, counts in histogram_status.items():
+                status = reference_cache.get(DeliveryStatus, status_id)
+                statuses.append({
+                    'status__name': status.name if status else None,
+                    'status__color': status.color if status else None,
+                    'counts': counts,
+                })
+            transports = []
+            for transport_id, counts in histogram_transport.items():
+                transport = reference_cache.get(TransportModel, transport_id)
+                transports.append({'transport_model__name': transport.name if transport else None, 'counts': counts})
+            result['distance_histogram'] = {
+                'edges': edges,
+                'by_status': sorted(statuses, key=lambda item: -sum(item['counts'])),
+                'by_transport': sorted(transports, key=lambda item: -sum(item['counts'])),
+            }
+        return result
+
+    @staticmethod
+    def _percentiles(values):
+        return {f'p{percent}': value for percent, value in zip(DURATION_PERCENTILES, values or [None] * len(DURATION_PERCENTILES))}
@@ -0,0 +1,327 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import timedelta
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from api.db.routers import current_read_alias
+from api.models import AnalyticsInvalidation, DeliveryService, DeliveryStatus, TransportModel
+from api.signals import rollup_changed
+from api.utils.filters import SERVICES_MATCH_ANY, parse_date
+
+# Справочники, названия которых попадают в ответ аналитики
+ANALYTICS_REFERENCE_MODELS = (DeliveryStatus, TransportModel, DeliveryService)
+
+# Строка сброса вставляется отдельным запросом после коммита и может стать видна позже
+# строк с большим created_at: столько секунд уже прочитанных строк читается повторно
+SHARED_INVALIDATION_LAG = 5
+
+
+@dataclass(frozen=True)
+class AnalyticsKey:
+    """Нормализованные параметры запроса аналитики"""
+
+    start_date: object
+    end_date: object
+    services: tuple
+    services_match: str
+    cargo_types: tuple
+    bucket: str
+    sections: tuple
+
+    def overlaps(self, days):
+        """Попадает ли хотя бы один из дней в диапазон дат ключа"""
+        return any(
+            (self.start_date is None or day >= self.start_date)
+            and (self.end_date is None or day <= self.end_date)
+            for day in days
+        )
+
+
+@dataclass
+class _Entry:
+    value: object
+    stored_at: float
+
+
+@dataclass
+class _Flight:
+    """Вычисление, которого ждут одинаковые параллельные запросы"""
+
+    done: threading.Event = field(default_factory=threading.Event)
+    value: object = None
+    error: BaseException = None
+
+
+@dataclass
+class _Counters:
+    hits: int = 0
+    misses: int = 0
+    waits: int = 0
+    computes: int = 0
+    compute_time: float = 0.0
+    compute_time_max: float = 0.0
+    invalidations: int = 0
+    invalidated_entries: int = 0
+    shared_invalidations: int = 0
+    evictions: int = 0
+
+
+class AnalyticsCache:
+    """
+    Кэш ответов аналитики в памяти процесса
+
+    Ключ - нормализованные фильтры и интервал (AnalyticsKey). Изменение доставок сбрасывает
+    только записи, диапазон дат которых содержит затронутые дни (сигнал rollup_changed),
+    изменение справочников - весь кэш; сброс выполняется сразу и повторно после
+    коммита транзакции. После коммита сброс записывается в таблицу AnalyticsInvalidation,
+    и каждое обращение к кэшу сначала применяет сбросы других процессов (один запрос
+    к основной БД). Ответ, вычисленный на реплике менее чем через REPLICA_PIN_SECONDS
+    после пересекающегося сброса, отдается, но не сохраняется: реплика могла отставать.
+    Одинаковые параллельные запросы ждут одно вычисление.
+
+    Кэшированные ответы общие для всех запросов, изменять их нельзя.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._flights = {}
+        # Последние сбросы (номер, дни или None для всего кэша, время): вычисление, начатое
+        # до пересекающегося с ним сброса, не сохраняется
+        self._sequence = 0
+        self._recent = deque(maxlen=1024)
+        self._counters = _Counters()
+        # Общие сбросы: уже примененные строки {id: created_at}, граница чтения и время очистки
+        self._shared_seen = {}
+        self._shared_since = None
+        self._pruned_at = None
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'ANALYTICS_CACHE_TIMEOUT', 60)
+
+    @property
+    def max_entries(self):
+        return getattr(settings, 'ANALYTICS_CACHE_MAX_ENTRIES', 256)
+
+    @staticmethod
+    def key(
+        start_date=None, end_date=None, service_ids=(), services_match=SERVICES_MATCH_ANY, cargo_type_ids=(),
+        bucket='day', sections=(),
+    ):
+        """
+        Ключ кэша по параметрам запроса
+
+        Некорректная дата приводит к той же ошибке валидации, что и фильтр по датам.
+        """
+        services = tuple(sorted(set(service_ids)))
+        return AnalyticsKey(
+            start_date=parse_date(start_date) if start_date else None,
+            end_date=parse_date(end_date) if end_date else None,
+            services=services,
+            # Режим сопоставления услуг важен только для нескольких услуг
+            services_match=services_match if len(services) > 1 else SERVICES_MATCH_ANY,
+            cargo_types=tuple(sorted(set(cargo_type_ids))),
+            bucket=bucket,
+            sections=tuple(sorted(set(sections))),
+        )
+
+    def get_or_compute(self, key, compute):
+        """Ответ из кэша или результат compute(), вычисленный одним из одинаковых запросов"""
+        if self.timeout <= 0:
+            return compute()
+
+        self.sync()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.stored_at < self.timeout:
+                self._entries.move_to_end(key)
+                self._counters.hits += 1
+                return entry.value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._counters.misses += 1
+            else:
+                self._counters.waits += 1
+            sequence = self._sequence
+        # Вычисление на реплике вскоре после сброса могло не увидеть изменение
+        replica = current_read_alias() is not None
+        started_at = time.monotonic()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        started = time.perf_counter()
+        try:
+            flight.value = compute()
+            # Сброс другого процесса во время вычисления: результат не сохраняется
+            self.sync()
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                del self._flights[key]
+                self._counters.computes += 1
+                self._counters.compute_time += elapsed
+                self._counters.compute_time_max = max(self._counters.compute_time_max, elapsed)
+                if (
+                    flight.error is None
+                    and self._still_valid(key, sequence)
+                    and not (replica and self._recently_invalidated(key, started_at))
+                ):
+                    self._store(key, flight.value)
+            flight.done.set()
+        return flight.value
+
+    def invalidate(self, days=None):
+        """Сбрасывает записи, диапазон которых содержит дни days (None - весь кэш)"""
+        days = None if days is None else frozenset(days)
+        with self._lock:
+            self._sequence += 1
+            self._recent.append((self._sequence, days, time.monotonic()))
+            self._counters.invalidations += 1
+            stale = [key for key in self._entries if days is None or key.overlaps(days)]
+            for key in stale:
+                del self._entries[key]
+            self._counters.invalidated_entries += len(stale)
+
+    def publish(self, days=None):
+        """
+        Записывает сброс для остальных процессов
+
+        Вызывается после коммита изменения, поэтому прочитавший строку процесс
+        увидит и само изменение. Заодно раз в ANALYTICS_CACHE_TIMEOUT удаляются строки,
+        которые уже не могут сбросить ни одну действующую запись.
+        """
+        if self.timeout <= 0:
+            return
+        using = router.db_for_write(AnalyticsInvalidation)
+        row = AnalyticsInvalidation.objects.using(using).create(days=None if days is None else sorted(days))
+        now = time.monotonic()
+        with self._lock:
+            # Свой сброс уже применен
+            self._shared_seen[row.pk] = timezone.now()
+            prune = self._pruned_at is None or now - self._pruned_at >= self.timeout
+            if prune:
+                self._pruned_at = now
+        if prune:
+            AnalyticsInvalidation.objects.using(using).filter(
+                created_at__lt=timezone.now() - timedelta(seconds=self.timeout + SHARED_INVALIDATION_LAG)
+            ).delete()
+
+    def sync(self):
+        """Применяет сбросы, записанные другими процессами с прошлой проверки"""
+        since = self._shared_since
+        if since is None:
+            since = timezone.now() - timedelta(seconds=SHARED_INVALIDATION_LAG)
+        rows = list(
+            AnalyticsInvalidation.objects.using(router.db_for_write(AnalyticsInvalidation))
+            .filter(created_at__gt=since)
+            .values_list('pk', 'days', 'created_at')
+        )
+        fresh = []
+        with self._lock:
+            for pk, days, created_at in rows:
+                if pk not in self._shared_seen:
+                    self._shared_seen[pk] = created_at
+                    fresh.append(days)
+            latest = max((created_at for _, _, created_at in rows), default=since)
+            self._shared_since = max(self._shared_since or since, latest - timedelta(seconds=SHARED_INVALIDATION_LAG))
+            self._shared_seen = {
+                pk: created_at for pk, created_at in self._shared_seen.items() if created_at > self._shared_since
+            }
+            self._counters.shared_invalidations += len(fresh)
+        for days in fresh:
+            self.invalidate(days)
+
+    def stats(self):
+        """Счетчики обращений и время вычислений"""
+        counters = self._counters
+        return {
+            'size': len(self._entries),
+            'in_flight': len(self._flights),
+            'hits': counters.hits,
+            'misses': counters.misses,
+            'waits': counters.waits,
+            'computes': counters.computes,
+            'compute_time_avg_ms': round(counters.compute_time / counters.computes * 1000, 1) if counters.computes else 0,
+            'compute_time_max_ms': round(counters.compute_time_max * 1000, 1),
+            'invalidations': counters.invalidations,
+            'invalidated_entries': counters.invalidated_entries,
+            'shared_invalidations': counters.shared_invalidations,
+            'evictions': counters.evictions,
+        }
+
+    def _still_valid(self, key, sequence):
+        """Не было ли с начала вычисления сброса, затрагивающего key"""
+        if sequence == self._sequence:
+            return True
+        if not self._recent or self._recent[0][0] > sequence + 1:
+            # Часть сбросов уже вытеснена из истории: проверить нельзя
+            return False
+        return not any(
+            number > sequence and (days is None or key.overlaps(days))
+            for number, days, _ in self._recent
+        )
+
+    def _recently_invalidated(self, key, started_at):
+        """
+        Был ли сброс key менее чем за REPLICA_PIN_SECONDS до начала вычисления
+
+        Столько же клиент после записи читает с основной БД: реплика могла еще
+        не получить изменение, и вычисленный на ней ответ в кэш не попадает.
+        """
+        since = started_at - settings.REPLICA_PIN_SECONDS
+        if len(self._recent) == self._recent.maxlen and self._recent[0][2] > since:
+            # Часть недавних сбросов уже вытеснена из истории
+            return True
+        return any(at > since and (days is None or key.overlaps(days)) for _, days, at in self._recent)
+
+    def _store(self, key, value):
+        self._entries[key] = _Entry(value=value, stored_at=time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters.evictions += 1
+
+
+analytics_cache = AnalyticsCache()
+
+
+def _after_commit(days):
+    analytics_cache.invalidate(days)
+    analytics_cache.publish(days)
+
+
+def _invalidate(days=None):
+    analytics_cache.invalidate(days)
+    # Повторно после коммита: ответ, вычисленный до коммита, мог не увидеть изменения.
+    # Тогда же сброс получают остальные процессы
+    transaction.on_commit(lambda: _after_commit(days), robust=True)
+
+
+def _on_rollup_changed(sender, days, **kwargs):
+    _invalidate(days)
+
+
+def _on_reference_changed(sender, **kwargs):
+    _invalidate()
+
+
+def connect_signals():
+    """Подключает сброс кэша аналитики к изменению доставок и справочников"""
+    rollup_changed.connect(_on_rollup_changed, dispatch_uid='analytics_cache_rollup')
+    for model in ANALYTICS_REFERENCE_MODELS:
+        post_save.connect(_on_reference_changed, sender=model, dispatch_uid=f'analytics_cache_save_{model.__name__}')
+        post_delete.connect(_on_reference_changed, sender=model, dispatch_uid=f'analytics_cache_delete_{model.__name__}')
@@ -0,0 +1,80 @@
+from django.contrib.postgres.fields import ArrayField
+from django.db import connections, router, transaction
+from django.db.models import F, Func, UUIDField, Value
+from api.models import Delivery, DeliveryArchive
+
+# Размер пачки переноса по умолчанию (archive_deliveries --batch-size)
+ARCHIVE_BATCH_SIZE = 1000
+
+
+def archive_batch(status, before, limit=ARCHIVE_BATCH_SIZE, using=None):
+    """
+    Переносит в архив до limit доставок статуса status, доставленных раньше before
+
+    Берутся самые старые по времени отправки строки; строки, заблокированные
+    другими транзакциями, пропускаются (SKIP LOCKED). Доставка, ее услуги
+    и архивная строка удаляются и вставляются одним оператором в отдельной
+    транзакции, поэтому прерванный перенос продолжается с оставшихся строк.
+    Сигналы записи не отправляются: вклад доставки в дневной свод не меняется,
+    так как свод учитывает архив. Возвращает число перенесенных строк.
+    """
+    using = using or router.db_for_write(Delivery)
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    delivery = qn(Delivery._meta.db_table)
+    through = qn(Delivery.services.through._meta.db_table)
+    archive = qn(DeliveryArchive._meta.db_table)
+    columns = [
+        field.column for field in DeliveryArchive._meta.concrete_fields
+        if field.name not in ('services', 'archived_at')
+    ]
+    select = ', '.join(f'm.{qn(column)}' for column in columns)
+
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        # Время отправки не позже доставки, поэтому условие по нему позволяет
+        # читать пачку по индексу (статус, время отправки) от самых старых строк
+        cursor.execute(
+            f"""
+            WITH batch AS (
+                SELECT id FROM {delivery}
+                WHERE status_id = %(status)s AND departure_datetime < %(before)s AND arrival_datetime < %(before)s
+                ORDER BY departure_datetime
+                LIMIT %(limit)s
+                FOR UPDATE SKIP LOCKED
+            ),
+            links AS (
+                DELETE FROM {through} t USING batch b WHERE t.delivery_id = b.id
+                RETURNING t.delivery_id, t.deliveryservice_id
+            ),
+            moved AS (
+                -- Массив id вместо соединения с batch: поиск по первичному ключу
+                -- в партициях до before, а не хеш-соединение со всей таблицей
+                DELETE FROM {delivery} d
+                WHERE d.id = ANY(ARRAY(SELECT id FROM batch)) AND d.arrival_datetime < %(before)s
+                RETURNING d.*
+            )
+            INSERT INTO {archive} ({', '.join(qn(column) for column in columns)}, services, archived_at)
+            SELECT {select}, COALESCE(l.services, '{{}}'), now()
+            FROM moved m
+            LEFT JOIN (
+                SELECT delivery_id, array_agg(deliveryservice_id ORDER BY deliveryservice_id) AS services
+                FROM links GROUP BY delivery_id
+            ) l ON l.delivery_id = m.id
+            """,
+            {'status': status.pk, 'before': before, 'limit': limit},
+        )
+        return cursor.rowcount
+
+
+def remove_service(service_id, pks, using=None):
+    """Убирает услугу service_id из архивных доставок pks (при удалении услуги)"""
+    if not pks:
+        return
+    DeliveryArchive.objects.using(using).filter(pk__in=pks).update(
+        services=Func(
+            F('services'),
+            Value(service_id, output_field=UUIDField()),
+            function='array_remove',
+            output_field=ArrayField(UUIDField()),
+        )
+    )
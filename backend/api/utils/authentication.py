@@ -0,0 +1,16 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from api.utils.server_timing import measure
+
+
+class TimedJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация с замером времени в метрику auth заголовка Server-Timing"""
+
+    def authenticate(self, request):
+        with measure('auth'):
+            return super().authenticate(request)
+
+
+class TimedJWTScheme(SimpleJWTScheme):
+    """Схема OpenAPI для TimedJWTAuthentication: расширение drf-spectacular не учитывает подклассы"""
+    target_class = TimedJWTAuthentication
@@ -0,0 +1,122 @@
+import json
+import statistics
+import time
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection, transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from api.utils.partitions import is_partition
+
+
+def explain(queryset):
+    """
+    Выполняет EXPLAIN ANALYZE для queryset
+
+    Возвращает словарь с временем выполнения (мс), способом чтения основной таблицы
+    queryset и полным планом в текстовом виде.
+    """
+    data = json.loads(queryset.explain(format='json', analyze=True, buffers=True))
+    root = data[0] if isinstance(data, list) else data
+    return {
+        'execution_ms': root.get('Execution Time'),
+        'node': describe_scan(root['Plan'], queryset.model._meta.db_table),
+        'plan': queryset.explain(analyze=True),
+    }
+
+
+def find_scans(node, relation):
+    """Узлы плана, читающие таблицу relation или ее партиции"""
+    name = node.get('Relation Name')
+    if name is not None and (name == relation or is_partition(name, relation)):
+        yield node
+    for child in node.get('Plans', []):
+        yield from find_scans(child, relation)
+
+
+def describe_scan(plan, relation):
+    """Краткое описание того, как план читает таблицу relation"""
+    labels = []
+    for node in find_scans(plan, relation):
+        label = node['Node Type']
+        if node.get('Index Name'):
+            # Индексы партиций называются по партиции: api_delivery_*_..._idx
+            label += f" using {node['Index Name'].replace(node['Relation Name'], f'{relation}_*', 1)}"
+        if label not in labels:
+            labels.append(label)
+    return ', '.join(labels) or plan['Node Type']
+
+
+def capture_queries(func, table):
+    """SQL-запросы (sql, params), которые func выполняет к таблице table; изменения откатываются"""
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        if table in sql:
+            queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with transaction.atomic(), connection.execute_wrapper(record):
+        func()
+        transaction.set_rollback(True)
+    return queries
+
+
+def explain_queries(queries, table, repeat=3, pruning=True):
+    """
+    Лучшее суммарное время выполнения queries (мс) и прочитанные партиции table
+
+    Запросы выполняются через EXPLAIN ANALYZE в откатываемой транзакции, поэтому
+    среди них могут быть и изменяющие. pruning=False отключает отсечение партиций.
+    """
+    best, scanned = None, set()
+    for _ in range(repeat):
+        elapsed = 0.0
+        with transaction.atomic(), connection.cursor() as cursor:
+            if not pruning:
+                cursor.execute('SET LOCAL enable_partition_pruning = off')
+            for sql, params in queries:
+                cursor.execute(f'EXPLAIN (ANALYZE, FORMAT JSON) {sql}', params)
+                plan = cursor.fetchone()[0]
+                root = (json.loads(plan) if isinstance(plan, str) else plan)[0]
+                elapsed += root['Execution Time']
+                # Партиции, отсеченные при выполнении, остаются в плане с нулем проходов
+                scanned.update(
+                    node['Relation Name'] for node in find_scans(root['Plan'], table)
+                    if node.get('Actual Loops', 1) > 0 and node['Relation Name'] != table
+                )
+            transaction.set_rollback(True)
+        best = elapsed if best is None else min(best, elapsed)
+    return best, scanned
+
+
+def timeit(func, repeat=5):
+    """Запускает func repeat раз и возвращает медиану времени выполнения в миллисекундах"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def build_view(viewset_class, query_string='', action='list', user=None, method='get', **kwargs):
+    """
+    Создает экземпляр ViewSet с запросом, как это делает роутер
+
+    Позволяет получить queryset, который представление построит для заданных параметров,
+    без выполнения HTTP-запроса.
+    """
+    factory = APIRequestFactory()
+    django_request = getattr(factory, method)(f'/?{query_string}')
+    django_request.user = user or AnonymousUser()
+    view = viewset_class(action=action, format_kwarg=None, kwargs=kwargs, args=())
+    view.request = Request(django_request)
+    view.request.user = django_request.user
+    view.headers = {}
+    return view
+
+
+def view_queryset(viewset_class, query_string='', page_size=20):
+    """Queryset первой страницы списка, который построит представление для заданных параметров"""
+    view = build_view(viewset_class, query_string)
+    return view.filter_queryset(view.get_queryset())[:page_size]
@@ -0,0 +1,220 @@
+from dataclasses import dataclass, field
+from django.core.exceptions import ValidationError
+from django.db import router, transaction
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.utils import model_meta
+from api.signals import bulk_write, post_bulk_write, pre_bulk_write
+
+BULK_CREATE = 'create'
+BULK_UPDATE = 'update'
+BULK_DELETE = 'delete'
+
+NOT_FOUND_ERROR = {'detail': 'Страница не найдена.'}
+INVALID_ID_ERROR = {'id': ['Некорректный идентификатор.']}
+NOT_OBJECT_ERROR = {'non_field_errors': ['Ожидался объект.']}
+
+
+@dataclass
+class BulkResult:
+    """Результат массовой операции по каждому элементу запроса"""
+
+    created: list = field(default_factory=list)
+    updated: list = field(default_factory=list)
+    deleted: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+
+    def add_error(self, operation, index, errors, pk=None):
+        item = {'operation': operation, 'index': index, 'errors': errors}
+        if pk is not None:
+            item['id'] = str(pk)
+        self.errors.append(item)
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'deleted': self.deleted,
+            'errors': self.errors,
+        }
+
+
+class BulkWriter:
+    """
+    Массовое создание, изменение и удаление записей по ModelSerializer
+
+    Каждый элемент проверяется отдельно (как дочерние элементы ListSerializer:
+    один экземпляр сериализатора и run_validation на элемент), поэтому ошибки
+    возвращаются по элементам, а корректные элементы сохраняются (частичный
+    успех). Запись идет одной транзакцией: строки вставляются через
+    bulk_create, изменения - через bulk_update, связи M2M - пачками строк
+    промежуточной таблицы. Изменяемые записи читаются одним запросом.
+
+    Сигналы save/delete моделей при этом не отправляются, вместо них -
+    pre_bulk_write / post_bulk_write. Поля auto_now при изменении проставляются здесь же.
+    """
+
+    batch_size = 1000
+
+    def __init__(self, serializer_class, context=None):
+        self.serializer_class = serializer_class
+        self.context = context or {}
+        self.model = serializer_class.Meta.model
+        self.pk_field = self.model._meta.pk
+        field_info = model_meta.get_field_info(self.model)
+        self.many_to_many = {name for name, relation in field_info.relations.items() if relation.to_many}
+
+    def save(self, create=(), update=(), delete=()):
+        result = BulkResult()
+        to_create = self._validate_create(create, result)
+        to_update = self._validate_update(update, result)
+        to_delete = self._validate_delete(delete, result)
+
+        using = router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            changed = [instance.pk for _, instance, _ in to_update] + [pk for _, pk in to_delete]
+            state = {}
+            if changed:
+                pre_bulk_write.send(sender=self.model, pks=changed, using=using, state=state)
+            self._create(to_create, result)
+            self._update(to_update, result)
+            self._delete(to_delete, result)
+            written = [item['id'] for item in result.created + result.updated]
+            if changed or written:
+                post_bulk_write.send(sender=self.model, pks=written, using=using, state=state)
+        return result
+
+    def _validate_create(self, items, result):
+        serializer = self.serializer_class(context=self.context)
+        valid = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                result.add_error(BULK_CREATE, index, NOT_OBJECT_ERROR)
+                continue
+            try:
+                valid.append((index, serializer.run_validation(item)))
+            except serializers.ValidationError as exc:
+                result.add_error(BULK_CREATE, index, serializers.as_serializer_error(exc))
+        return valid
+
+    def _validate_update(self, items, result):
+        pks = {}
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                result.add_error(BULK_UPDATE, index, NOT_OBJECT_ERROR)
+                continue
+            try:
+                pks[index] = self.pk_field.to_python(item.get('id'))
+            except ValidationError:
+                result.add_error(BULK_UPDATE, index, INVALID_ID_ERROR)
+                continue
+            if pks[index] is None:
+                del pks[index]
+                result.add_error(BULK_UPDATE, index, INVALID_ID_ERROR)
+
+        instances = self.model._default_manager.in_bulk(set(pks.values()))
+        serializer = self.serializer_class(partial=True, context=self.context)
+        valid = []
+        for index, pk in pks.items():
+            instance = instances.get(pk)
+            if instance is None:
+                result.add_error(BULK_UPDATE, index, NOT_FOUND_ERROR, pk)
+                continue
+            serializer.instance = instance
+            try:
+                valid.append((index, instance, serializer.run_validation(items[index])))
+            except serializers.ValidationError as exc:
+                result.add_error(BULK_UPDATE, index, serializers.as_serializer_error(exc), pk)
+        return valid
+
+    def _validate_delete(self, items, result):
+        pks = {}
+        for index, value in enumerate(items):
+            try:
+                pk = self.pk_field.to_python(value)
+            except ValidationError:
+                pk = None
+            if pk is None:
+                result.add_error(BULK_DELETE, index, INVALID_ID_ERROR)
+                continue
+            pks[index] = pk
+
+        existing = set(
+            self.model._default_manager.filter(pk__in=set(pks.values())).values_list('pk', flat=True)
+        )
+        valid = []
+        for index, pk in pks.items():
+            if pk in existing:
+                valid.append((index, pk))
+            else:
+                result.add_error(BULK_DELETE, index, NOT_FOUND_ERROR, pk)
+        return valid
+
+    def _split(self, validated_data):
+        """Разделяет данные на поля модели и значения M2M"""
+        data = dict(validated_data)
+        many = {name: data.pop(name) for name in self.many_to_many if name in data}
+        return data, many
+
+    def _create(self, items, result):
+        instances, relations = [], []
+        for index, validated_data in items:
+            data, many = self._split(validated_data)
+            instance = self.model(**data)
+            instances.append(instance)
+            relations.append((instance, many))
+            result.created.append({'index': index, 'id': str(instance.pk)})
+
+        self.model._default_manager.bulk_create(instances, batch_size=self.batch_size)
+        self._set_many(relations, clear=False)
+
+    def _update(self, items, result):
+        fields, relations, instances = set(), [], []
+        now = timezone.now()
+        for index, instance, validated_data in items:
+            data, many = self._split(validated_data)
+            for name, value in data.items():
+                setattr(instance, name, value)
+            fields.update(data)
+            # bulk_update не вызывает pre_save, поэтому auto_now выставляется вручную
+            for model_field in self.model._meta.concrete_fields:
+                if getattr(model_field, 'auto_now', False):
+                    setattr(instance, model_field.attname, now)
+                    fields.add(model_field.name)
+            instances.append(instance)
+            if many:
+                relations.append((instance, many))
+            result.updated.append({'index': index, 'id': str(instance.pk)})
+
+        if instances and fields:
+            self.model._default_manager.bulk_update(instances, sorted(fields), batch_size=self.batch_size)
+        self._set_many(relations, clear=True)
+
+    def _delete(self, items, result):
+        pks = [pk for _, pk in items]
+        if pks:
+            # Вклад удаляемых строк уже учтен через pre_bulk_write
+            with bulk_write(self.model):
+                self.model._default_manager.filter(pk__in=pks).only('pk').delete()
+        result.deleted.extend({'index': index, 'id': str(pk)} for index, pk in items)
+
+    def _set_many(self, relations, clear):
+        """Записывает связи M2M пачкой строк промежуточной таблицы на каждое поле"""
+        for name in self.many_to_many:
+            model_field = self.model._meta.get_field(name)
+            through = model_field.remote_field.through
+            source = model_field.m2m_field_name() + '_id'
+            target = model_field.m2m_reverse_field_name() + '_id'
+
+            owners, rows = [], []
+            for instance, many in relations:
+                if name not in many:
+                    continue
+                owners.append(instance.pk)
+                rows.extend(
+                    through(**{source: instance.pk, target: related.pk})
+                    for related in dict.fromkeys(many[name])
+                )
+            if clear and owners:
+                through._default_manager.filter(**{f'{source}__in': owners}).delete()
+            through._default_manager.bulk_create(rows, batch_size=self.batch_size)
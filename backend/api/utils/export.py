@@ -0,0 +1,247 @@
+import csv
+import io
+import json
+from asgiref.sync import sync_to_async
+from django.contrib.postgres.expressions import ArraySubquery
+from django.core.exceptions import FieldDoesNotExist
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connections, transaction
+from django.db.models import OuterRef, TextField
+from django.db.models.functions import Cast
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField, StringRelatedField
+from api.utils.fast_serialization import _DateTimeISO, _converter, _resolve
+from api.utils.reference_cache import REFERENCE_MODELS, reference_cache
+
+EXPORT_FORMAT_CSV = 'csv'
+EXPORT_FORMAT_NDJSON = 'ndjson'
+
+EXPORT_CONTENT_TYPES = {
+    EXPORT_FORMAT_CSV: 'text/csv; charset=utf-8',
+    EXPORT_FORMAT_NDJSON: 'application/x-ndjson; charset=utf-8',
+}
+
+EXPORT_EXTENSIONS = {
+    EXPORT_FORMAT_CSV: 'csv',
+    EXPORT_FORMAT_NDJSON: 'ndjson',
+}
+
+# Разделитель значений M2M в ячейке CSV
+CSV_LIST_SEPARATOR = ', '
+
+# Псевдонимы служебных колонок выгрузки
+_EXPORT_PK = '_export_pk'
+_EXPORT_VALUE = '_export_value'
+
+
+class _ReferenceNames:
+    """Справочник, прочитанный один раз на выгрузку; ключ - pk в виде строки"""
+
+    def __init__(self, model):
+        self.model = model
+        objects = reference_cache.all(model)
+        self.by_pk = {str(obj.pk): obj for obj in objects}
+        self.position = {pk: index for index, pk in enumerate(self.by_pk)}
+
+    def get(self, pk):
+        if pk not in self.by_pk:
+            # Запись появилась после чтения снимка (например, в другом процессе)
+            self.by_pk[pk] = reference_cache.get(self.model, pk)
+            self.position[pk] = len(self.position)
+        return self.by_pk[pk]
+
+    def get_many(self, pks):
+        """Объекты в порядке Meta.ordering справочника, как при prefetch"""
+        objects = [self.get(pk) for pk in pks]
+        return sorted((obj for obj in objects if obj is not None), key=lambda obj: self.position[str(obj.pk)])
+
+
+class QuerysetExporter:
+    """
+    Потоковая выгрузка queryset в CSV или NDJSON по полям сериализатора
+
+    Строки читаются одним запросом через values_list() серверным курсором
+    (iterator) пачками по chunk_size, каждая пачка превращается в один фрагмент
+    ответа, поэтому расход памяти не зависит от числа строк. Поля справочников
+    (FK и M2M на модели из REFERENCE_MODELS) берутся из кэша справочников:
+    запрос читает только id в виде текста, без JOIN, а M2M - массивом id
+    через коррелированный подзапрос. Значения совпадают с представлением
+    сериализатора в JSON.
+    """
+
+    chunk_size = 2000
+
+    def __init__(self, queryset, serializer, export_format):
+        if isinstance(serializer, serializers.ListSerializer):
+            serializer = serializer.child
+        self.model = queryset.model
+        self.export_format = export_format
+        self.references = {}
+        # Колонки values_list: имя -> выражение (None для обычного пути values)
+        self.lookups = {}
+        self.pk_index = self._column(_EXPORT_PK, Cast('pk', TextField()))
+        self.columns = [
+            (name, *self._compile(name, field))
+            for name, field in serializer.fields.items()
+            if not field.write_only
+        ]
+
+        annotations = {alias: expression for alias, expression in self.lookups.items() if expression is not None}
+        # БД фиксируется при создании: строки читаются уже после выхода из представления,
+        # где выбрана реплика (ReplicaReadMixin)
+        self.queryset = (
+            queryset.prefetch_related(None).annotate(**annotations).values_list(*self.lookups).using(queryset.db)
+        )
+
+    @property
+    def content_type(self):
+        return EXPORT_CONTENT_TYPES[self.export_format]
+
+    def __iter__(self):
+        tz = timezone.get_current_timezone()
+        columns = [
+            (name, index, resolve, convert.bind(tz) if isinstance(convert, _DateTimeISO) else convert, many)
+            for name, index, resolve, convert, many in self.columns
+        ]
+        if self.export_format == EXPORT_FORMAT_CSV:
+            yield self._csv_rows([[column[0] for column in columns]])
+
+        # Вне транзакции курсор объявляется WITH HOLD, и PostgreSQL материализует
+        # весь результат при коммите; внутри транзакции строки читаются по мере отдачи
+        with transaction.atomic(using=self.queryset.db):
+            with connections[self.queryset.db].cursor() as cursor:
+                # Выгрузка читает все строки: план для курсора строится под полный
+                # результат, а не под быстрые первые строки (по умолчанию 0.1)
+                cursor.execute('SET LOCAL cursor_tuple_fraction = 1.0')
+            batch = []
+            for row in self.queryset.iterator(chunk_size=self.chunk_size):
+                batch.append(row)
+                if len(batch) >= self.chunk_size:
+                    yield self._render(batch, columns)
+                    batch = []
+            if batch:
+                yield self._render(batch, columns)
+
+    async def aiter(self):
+        """
+        Асинхронная версия для ASGI
+
+        Django отдает синхронный итератор под ASGI только целиком, собрав его в список.
+        Здесь каждый фрагмент читается в потоке запроса, где открыт серверный курсор.
+        """
+        iterator = iter(self)
+        get_next = sync_to_async(next, thread_sensitive=True)
+        try:
+            while True:
+                chunk = await get_next(iterator, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            # При разрыве соединения транзакция и серверный курсор закрываются в потоке,
+            # где открыты, а не сборщиком мусора (возможно, в потоке цикла событий)
+            await sync_to_async(iterator.close, thread_sensitive=True)()
+
+    def _compile(self, name, field):
+        """Индекс колонки, получение значения по справочнику, преобразование и признак M2M"""
+        if isinstance(field, ManyRelatedField):
+            model_field = self._model_field(field.source)
+            child = field.child_relation
+            if (
+                getattr(model_field, 'many_to_many', False)
+                and model_field.related_model in REFERENCE_MODELS
+                and type(child) in (PrimaryKeyRelatedField, StringRelatedField)
+            ):
+                through = model_field.remote_field.through
+                owner = model_field.m2m_field_name()
+                target = model_field.m2m_reverse_field_name()
+                ids = through._default_manager.filter(**{owner: OuterRef('pk')}).annotate(
+                    **{_EXPORT_VALUE: Cast(target, TextField())}
+                ).values(_EXPORT_VALUE)
+                names = self._reference(model_field.related_model)
+                represent = str if isinstance(child, StringRelatedField) else (lambda obj: str(obj.pk))
+                return self._column(f'_export_{name}', ArraySubquery(ids)), names.get_many, represent, True
+            raise ValueError(f'Поле {name} не поддерживается выгрузкой')
+
+        if field.source_attrs == [self.model._meta.pk.name]:
+            return self.pk_index, None, _converter(field), False
+
+        model_field = self._model_field(field.source_attrs[0]) if field.source_attrs else None
+        if (
+            len(field.source_attrs) == 2
+            and getattr(model_field, 'many_to_one', False)
+            and model_field.related_model in REFERENCE_MODELS
+        ):
+            # Значение из справочника: в запросе только id, сам объект - из кэша
+            names = self._reference(model_field.related_model)
+            attr = field.source_attrs[1]
+            index = self._column(f'_export_{model_field.name}', Cast(model_field.attname, TextField()))
+            return index, (lambda pk: getattr(names.get(pk), attr, None)), _converter(field), False
+
+        lookup = _resolve(self.model, field.source_attrs)
+        if lookup is None:
+            raise ValueError(f'Поле {name} не поддерживается выгрузкой')
+        return self._column(lookup), None, _converter(field), False
+
+    def _model_field(self, name):
+        try:
+            return self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+
+    def _reference(self, model):
+        if model not in self.references:
+            self.references[model] = _ReferenceNames(model)
+        return self.references[model]
+
+    def _column(self, alias, expression=None):
+        self.lookups.setdefault(alias, expression)
+        return list(self.lookups).index(alias)
+
+    def _render(self, batch, columns):
+        items = []
+        for row in batch:
+            item = {}
+            for name, index, resolve, convert, many in columns:
+                value = row[index]
+                if many:
+                    item[name] = [convert(obj) for obj in resolve(value or ())]
+                    continue
+                if resolve is not None and value is not None:
+                    value = resolve(value)
+                item[name] = None if value is None else convert(value)
+            items.append(item)
+
+        if self.export_format == EXPORT_FORMAT_NDJSON:
+            return ''.join(json.dumps(item, ensure_ascii=False) + '\n' for item in items)
+        return self._csv_rows(
+            [
+                CSV_LIST_SEPARATOR.join(value) if isinstance(value, list) else value
+                for value in item.values()
+            ]
+            for item in items
+        )
+
+    @staticmethod
+    def _csv_rows(rows):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+
+def export_response(exporter, request, filename):
+    """
+    StreamingHttpResponse с выгрузкой
+
+    Под ASGI (uvicorn) отдается асинхронный итератор, под WSGI - обычный.
+    X-Accel-Buffering отключает буферизацию ответа в nginx.
+    """
+    django_request = getattr(request, '_request', request)
+    content = exporter.aiter() if isinstance(django_request, ASGIRequest) else iter(exporter)
+    response = StreamingHttpResponse(content, content_type=exporter.content_type)
+    extension = EXPORT_EXTENSIONS[exporter.export_format]
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
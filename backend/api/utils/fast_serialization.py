@@ -0,0 +1,233 @@
+import copy
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.relations import (
+    ManyRelatedField,
+    PrimaryKeyRelatedField,
+    RelatedField,
+    SlugRelatedField,
+    StringRelatedField,
+)
+from rest_framework.settings import api_settings
+from api.utils.server_timing import measure
+
+# Преобразования, которые совпадают с to_representation соответствующих полей DRF,
+# но не требуют вызова метода поля
+_CONVERTERS = {
+    serializers.CharField: str,
+    serializers.FloatField: float,
+    serializers.IntegerField: int,
+}
+
+# Дочерние поля M2M, представление которых не зависит от контекста запроса
+_MANY_CHILDREN = (PrimaryKeyRelatedField, SlugRelatedField, StringRelatedField)
+
+_serializer_cache = {}
+
+# Имя аннотации с pk владельца в запросе связанных объектов M2M
+_OWNER = '_values_owner'
+
+
+class _DateTimeISO:
+    """
+    DateTimeField.to_representation для формата ISO 8601
+
+    Часовой пояс запроса определяется один раз на страницу, а не для каждого значения.
+    """
+
+    def bind(self, tz):
+        def convert(value):
+            value = value.astimezone(tz).isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+        return convert
+
+
+class ValuesSerializer:
+    """
+    Быстрое представление списка через values()
+
+    Строки читаются словарями без создания экземпляров моделей, каждое поле
+    преобразуется заранее выбранной функцией, повторяющей to_representation
+    поля DRF. M2M-поля загружаются одним запросом на страницу. Результат
+    совпадает с исходным сериализатором, поэтому создается только для полей,
+    у которых это можно гарантировать (см. get_values_serializer).
+    """
+
+    def __init__(self, model, columns, many):
+        self.model = model
+        self.columns = columns
+        self.many = many
+        self.lookups = tuple(dict.fromkeys(
+            [model._meta.pk.name] + [lookup for _, lookup, convert in columns if convert is not None]
+        ))
+
+    def prepare(self, queryset, extra_fields=()):
+        """
+        Превращает queryset в values()-запрос с нужными колонками
+
+        extra_fields добавляются к выборке (например, поля сортировки для курсора).
+        """
+        lookups = dict.fromkeys(self.lookups + tuple(extra_fields))
+        return queryset.prefetch_related(None).values(*lookups)
+
+    @measure('serialize')
+    def serialize(self, rows):
+        """Представление строк values() в том же виде, что и у исходного сериализатора"""
+        rows = list(rows)
+        if not rows:
+            return []
+
+        pk_name = self.model._meta.pk.name
+        related = {
+            name: self._load_many(source, child, [row[pk_name] for row in rows])
+            for name, source, child in self.many
+        }
+
+        tz = timezone.get_current_timezone()
+        columns = [
+            (name, lookup, convert.bind(tz) if isinstance(convert, _DateTimeISO) else convert)
+            for name, lookup, convert in self.columns
+        ]
+
+        data = []
+        for row in rows:
+            item = {}
+            for name, lookup, convert in columns:
+                if convert is None:
+                    item[name] = related[name].get(row[pk_name], [])
+                    continue
+                value = row[lookup]
+                item[name] = None if value is None else convert(value)
+            data.append(item)
+        return data
+
+    def _load_many(self, source, child, owner_ids):
+        """
+        Представления связанных объектов M2M по pk владельца
+
+        Запрос повторяет prefetch_related (тот же фильтр и сортировка связанной модели),
+        но экземпляр создается только один раз на каждый различный связанный объект.
+        """
+        model_field = self.model._meta.get_field(source)
+        related_model = model_field.related_model
+        related_name = model_field.related_query_name()
+        field_names = [field.attname for field in related_model._meta.concrete_fields]
+        pk_index = field_names.index(related_model._meta.pk.attname)
+        queryset = related_model._default_manager.filter(
+            **{f'{related_name}__in': owner_ids}
+        ).annotate(**{_OWNER: F(f'{related_name}__pk')}).values_list(_OWNER, *field_names)
+
+        result, cache = {}, {}
+        for owner, *values in queryset:
+            pk = values[pk_index]
+            if pk not in cache:
+                obj = related_model.from_db(queryset.db, field_names, values)
+                cache[pk] = child.to_representation(obj)
+            result.setdefault(owner, []).append(cache[pk])
+        return result
+
+
+def _resolve(model, source_attrs):
+    """
+    Путь values() для source поля сериализатора
+
+    Возвращает lookup или None, если source не сводится к колонке, которую
+    можно прочитать через values() с тем же результатом.
+    """
+    current = model
+    for index, attr in enumerate(source_attrs):
+        try:
+            model_field = current._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        is_last = index == len(source_attrs) - 1
+        if model_field.many_to_many or model_field.one_to_many:
+            return None
+        if model_field.is_relation:
+            # Для null-связи DRF пропускает поле целиком, values() вернул бы None
+            if is_last or model_field.null or not model_field.concrete:
+                return None
+            current = model_field.related_model
+            continue
+        if not is_last or isinstance(model_field, models.FileField):
+            return None
+        return '__'.join(source_attrs)
+    return None
+
+
+def _converter(field):
+    convert = _CONVERTERS.get(type(field))
+    if convert is not None:
+        return convert
+    if type(field) is serializers.UUIDField and field.uuid_format == 'hex_verbose':
+        return str
+    if (
+        type(field) is serializers.DateTimeField
+        and settings.USE_TZ
+        and getattr(field, 'format', api_settings.DATETIME_FORMAT) == ISO_8601
+        and not hasattr(field, 'timezone')
+    ):
+        return _DateTimeISO()
+    # Несвязанная копия поля: в кэше не должны оставаться сериализатор и запрос
+    return copy.deepcopy(field).to_representation
+
+
+def get_values_serializer(serializer):
+    """
+    Компилирует ValuesSerializer для сериализатора модели
+
+    Поддерживаются скалярные поля модели, в том числе через FK (transport_model.name),
+    и M2M-поля с many=True. Для остальных полей (SerializerMethodField, вложенные
+    сериализаторы, свойства модели, файлы, source='*') возвращается None, и
+    представление должно использовать обычный сериализатор. Результат кэшируется
+    по классу сериализатора и набору его полей.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+
+    fields = serializer.fields
+    key = (type(serializer), tuple(fields.keys()))
+    if key in _serializer_cache:
+        return _serializer_cache[key]
+
+    model = serializer.Meta.model
+    columns, many = [], []
+    compiled = True
+    for name, field in fields.items():
+        if field.write_only:
+            continue
+        if isinstance(field, ManyRelatedField):
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                model_field = None
+            supported = (
+                isinstance(model_field, models.ManyToManyField)
+                and len(field.source_attrs) == 1
+                and type(field.child_relation) in _MANY_CHILDREN
+            )
+            if not supported:
+                compiled = False
+                break
+            # Колонка без преобразования: значение берется из запроса связанных объектов
+            columns.append((name, field.source, None))
+            many.append((name, field.source, copy.deepcopy(field.child_relation)))
+            continue
+        if isinstance(field, (RelatedField, serializers.BaseSerializer)) or field.source == '*':
+            compiled = False
+            break
+        lookup = _resolve(model, field.source_attrs)
+        if lookup is None:
+            compiled = False
+            break
+        columns.append((name, lookup, _converter(field)))
+
+    values_serializer = ValuesSerializer(model, columns, many) if compiled else None
+    _serializer_cache[key] = values_serializer
+    return values_serializer
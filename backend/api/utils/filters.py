@@ -0,0 +1,83 @@
+from datetime import datetime, time, timedelta
+from django.db import models
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+
+def parse_date(value):
+    """
+    Разбирает дату в формате YYYY-MM-DD
+
+    При ошибке выбрасывает django.core.exceptions.ValidationError с тем же
+    сообщением, что и фильтр по __date.
+    """
+    return models.DateField().to_python(value)
+
+
+def day_start(value):
+    """Начало дня в текущем часовом поясе (TIME_ZONE)"""
+    return timezone.make_aware(datetime.combine(value, time.min))
+
+
+def filter_date_range(queryset, start_date=None, end_date=None, field='arrival_datetime'):
+    """
+    Фильтрует queryset по диапазону дат включительно
+
+    Вместо field__date__gte/lte, которые приводят колонку к дате и не могут
+    использовать индекс, условие строится как полуинтервал по самой колонке:
+    field >= начало start_date AND field < начало дня после end_date.
+    По такому условию PostgreSQL также отсекает лишние партиции доставок
+    (таблица секционирована по месяцам arrival_datetime).
+    """
+    if start_date:
+        queryset = queryset.filter(**{f'{field}__gte': day_start(parse_date(start_date))})
+    if end_date:
+        queryset = queryset.filter(**{f'{field}__lt': day_start(parse_date(end_date) + timedelta(days=1))})
+    return queryset
+
+
+SERVICES_MATCH_ANY = 'any'
+SERVICES_MATCH_ALL = 'all'
+
+
+def parse_id_list(value):
+    """Разбирает список идентификаторов через запятую, отбрасывая пустые значения"""
+    return [item.strip() for item in value.split(',') if item.strip()] if value else []
+
+
+def filter_by_services(queryset, service_ids, match=SERVICES_MATCH_ANY):
+    """
+    Фильтрует доставки по услугам полусоединением EXISTS
+
+    В отличие от services__id__in + distinct() не размножает строки доставки
+    и не требует сортировки/хеширования всех колонок перед пагинацией.
+    match='any' - у доставки есть хотя бы одна из услуг,
+    match='all' - у доставки есть все перечисленные услуги.
+    """
+    if not service_ids:
+        return queryset
+
+    through = queryset.model.services.through
+    links = through.objects.filter(delivery_id=OuterRef('pk'))
+
+    if match == SERVICES_MATCH_ALL:
+        for service_id in dict.fromkeys(service_ids):
+            queryset = queryset.filter(Exists(links.filter(deliveryservice_id=service_id)))
+        return queryset
+
+    return queryset.filter(Exists(links.filter(deliveryservice_id__in=service_ids)))
+
+
+def filter_archive_by_services(queryset, service_ids, match=SERVICES_MATCH_ANY):
+    """
+    Фильтрует архивные доставки по услугам так же, как filter_by_services
+
+    В архиве услуги хранятся массивом: match='any' - пересечение массивов (&&),
+    match='all' - вхождение всех услуг (@>).
+    """
+    if not service_ids:
+        return queryset
+    service_ids = list(dict.fromkeys(service_ids))
+    if match == SERVICES_MATCH_ALL:
+        return queryset.filter(services__contains=service_ids)
+    return queryset.filter(services__overlap=service_ids)
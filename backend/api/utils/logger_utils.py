@@ -1,56 +1,218 @@
+import atexit
+import copy
+import json
+import queue
 import sys
 import os
+import threading
+import traceback
+from datetime import datetime
 from loguru import logger
 from django.conf import settings
 
 os.makedirs("logs", exist_ok=True)
 
-def setup_logging() -> None:
-    """Настройка логирования для приложения"""
 
-    # Удаляем стандартный логгер
-    logger.remove()
+def _json_line(data) -> str:
+    return json.dumps(data, ensure_ascii=False, default=str) + "\n"
+
+
+def _json_patcher(record) -> None:
+    """Сериализует запись в одну строку JSON: время, уровень, источник, сообщение и поля bind()"""
+    data = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "message": record["message"],
+    }
+    data.update((key, value) for key, value in record["extra"].items() if key != "json")
+    if record["exception"] is not None:
+        data["exception"] = "".join(traceback.format_exception(*record["exception"]))
+    record["extra"]["json"] = _json_line(data)
+
+
+def _json_format(record) -> str:
+    # Формат-функция: loguru не дописывает трассировку после строки, она уже в JSON
+    return "{extra[json]}"
+
+
+class _BackgroundWriter:
+    """
+    Приемник loguru, который только кладет готовую строку в очередь
+
+    Строки из очереди записывает фоновый поток через независимую копию логгера
+    (writer) с файлами и потоками вывода, поэтому запись, ротация и сжатие файлов
+    не выполняются в потоке запроса. В отличие от enqueue=True у loguru, запись
+    не сериализуется pickle для межпроцессной очереди.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.stopped = False
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, message):
+        self.queue.put((message.record["level"].name, str(message)))
+
+    def put(self, level, data):
+        """Запись из словаря полей: строка JSON собирается уже в фоновом потоке"""
+        self.queue.put((level, data))
+
+    def flush_queue(self):
+        """Ждет записи всех строк, поставленных в очередь до вызова"""
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait()
+
+    def stop(self):
+        """
+        Дописывает очередь, останавливает поток и закрывает файлы
+
+        loguru тоже вызывает stop() при удалении приемника, повторный вызов ничего не делает.
+        """
+        if self.stopped:
+            return
+        self.stopped = True
+        self.queue.put(None)
+        self.thread.join()
+        self.writer.remove()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            level, line = item
+            if isinstance(line, dict):
+                line = _json_line({**line, "time": line["time"].isoformat()})
+            self.writer.opt(raw=True).log(level, line)
+
+
+_background_writer = None
+
+
+def _add_sinks(target, log_format, structured, stream, log_dir) -> None:
+    """Приемники журнала: вывод, файл, поток ошибок и файл ошибок"""
 
     # Настройка формата и уровня логирования
-    logger.add(
-        sys.stdout,
+    target.add(
+        stream or sys.stdout,
         level=settings.LOG_LEVEL,
-        format=settings.LOG_FORMAT,
-        colorize=True,
+        format=log_format,
+        colorize=not structured,
         backtrace=True,
         diagnose=True,
     )
 
     # Логирование в файл (опционально)
-    logger.add(
-        "logs/app_{time:YYYY-MM-DD}.log",
+    target.add(
+        os.path.join(log_dir, "app_{time:YYYY-MM-DD}.log"),
         rotation="00:00",  # Ротация логов в полночь
         retention="30 days",  # Хранение логов 30 дней
         compression="zip",  # Сжатие старых логов
         level="DEBUG",
-        format=settings.LOG_FORMAT,
+        format=log_format,
     )
 
     # Перехват стандартного логгирования
-    logger.add(
+    target.add(
         sys.stderr,
         level="ERROR",
-        format=settings.LOG_FORMAT,
+        format=log_format,
+        colorize=False if structured else None,
         backtrace=True,
         diagnose=True,
     )
 
     # Логирование необработанных исключений
-    logger.add(
-        "logs/errors_{time:YYYY-MM-DD}.log",
+    target.add(
+        os.path.join(log_dir, "errors_{time:YYYY-MM-DD}.log"),
         rotation="00:00",
         retention="30 days",
         compression="zip",
         level="ERROR",
-        format=settings.LOG_FORMAT,
+        format=log_format,
         catch=True,  # Перехват всех необработанных исключений
     )
 
+
+def setup_logging(structured=None, stream=None, log_dir="logs") -> None:
+    """
+    Настройка логирования для приложения
+
+    structured (по умолчанию LOG_STRUCTURED) включает структурированный режим:
+    каждая запись - строка JSON (трассировка исключения - ее поле), а в файлы
+    и потоки вывода их записывает фоновый поток (_BackgroundWriter).
+    """
+    global _background_writer
+
+    structured = settings.LOG_STRUCTURED if structured is None else structured
+
+    # Удаляем стандартный логгер; прежний фоновый поток дописывает очередь и закрывает файлы
+    logger.remove()
+    logger.configure(patcher=None)
+    if _background_writer is not None:
+        _background_writer.stop()
+        _background_writer = None
+
+    if not structured:
+        _add_sinks(logger, settings.LOG_FORMAT, structured, stream, log_dir)
+        return logger
+
+    # Строки уже готовы, копия логгера пишет их как есть (opt(raw=True))
+    writer = copy.deepcopy(logger)
+    _add_sinks(writer, "{message}", structured, stream, log_dir)
+    _background_writer = _BackgroundWriter(writer)
+    logger.configure(patcher=_json_patcher)
+    logger.add(_background_writer, level="DEBUG", format=_json_format, catch=True)
     return logger
 
+
+def log_record(level, message, fields, name=None) -> None:
+    """
+    Запись с полями fields для частых событий (журнал запросов)
+
+    В структурированном режиме в поток запроса попадает только постановка словаря
+    в очередь: запись loguru и строка JSON создаются в фоновом потоке. Иначе -
+    обычная запись loguru с полями в bind().
+    """
+    if _background_writer is None:
+        logger.bind(**fields).log(level, message)
+        return
+    _background_writer.put(level, {
+        "time": datetime.now().astimezone(),
+        "level": level,
+        "logger": name,
+        "message": message,
+        **fields,
+    })
+
+
+def flush_logs() -> None:
+    """Дожидается записи строк, поставленных в очередь фоновой записи"""
+    if _background_writer is not None:
+        _background_writer.flush_queue()
+
+
+@atexit.register
+def _stop_background_writer() -> None:
+    """
+    При завершении процесса дописывает очередь фоновой записи и закрывает файлы
+
+    Поток записи - демон и иначе остановился бы вместе с процессом, потеряв
+    последние строки. Записи после остановки не сохраняются.
+    """
+    global _background_writer
+    if _background_writer is None:
+        return
+    background_writer, _background_writer = _background_writer, None
+    logger.remove()
+    background_writer.stop()
+
+
 logger = setup_logging()
@@ -1,5 +1,168 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import date, datetime
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+class CountedPaginator(DjangoPaginator):
+    """Пагинатор Django с заранее известным числом строк"""
+
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            # count - cached_property, значение в __dict__ отменяет COUNT-запрос
+            self.__dict__['count'] = count
+
 
 class CustomPageNumberPagination(PageNumberPagination):
+    """
+    Постраничная пагинация
+
+    Если представление уже посчитало строки отфильтрованной выборки
+    (view.queryset_count, например при расчете ETag), повторный COUNT не выполняется.
+    """
+
+    page_size = 20
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        count = getattr(view, 'queryset_count', None)
+        self.django_paginator_class = lambda *args, **kwargs: CountedPaginator(*args, count=count, **kwargs)
+        return super().paginate_queryset(queryset, request, view)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Курсорная (keyset) пагинация
+
+    Страница выбирается условием WHERE по значению поля сортировки и id последней
+    записи, поэтому не выполняется ни COUNT(*), ни OFFSET: время получения любой
+    страницы не зависит от ее глубины. Поле сортировки берется из параметра ordering
+    (только из ordering_fields представления), id используется как тайбрейкер.
+    """
+
     page_size = 20
-    page_size_query_param = 'page_size'
\ No newline at end of file
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    tiebreaker = 'id'
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(request, queryset, view)
+
+        position = self.decode_cursor(request, queryset.model)
+        self.reverse = bool(position and position['reverse'])
+
+        descending = self.descending != self.reverse
+        sign = '-' if descending else ''
+        queryset = queryset.order_by(f'{sign}{self.field}', f'{sign}{self.tiebreaker}')
+
+        if position is not None:
+            lookup = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}': position['value']}) |
+                Q(**{self.field: position['value'], f'{self.tiebreaker}__{lookup}': position['id']})
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def get_ordering(self, request, queryset, view):
+        """Возвращает поле сортировки и направление (первый допустимый термин ordering)"""
+        ordering = OrderingFilter().get_ordering(request, queryset, view) or ['-' + self.tiebreaker]
+        term = ordering[0]
+        return term.lstrip('-'), term.startswith('-')
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            data = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+            if data['f'] != self.field:
+                raise ValueError
+            return {
+                'value': model._meta.get_field(self.field).to_python(data['v']),
+                'id': model._meta.get_field(self.tiebreaker).to_python(data['id']),
+                'reverse': bool(data.get('r')),
+            }
+        except (TypeError, ValueError, KeyError, ValidationError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        value = self._get_value(row, self.field)
+        if isinstance(value, (datetime, date)):
+            value = value.isoformat()
+        data = {'f': self.field, 'v': value, 'id': str(self._get_value(row, self.tiebreaker))}
+        if reverse:
+            data['r'] = 1
+        encoded = b64encode(json.dumps(data, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    @staticmethod
+    def _get_value(row, name):
+        if isinstance(row, dict):
+            return row[name]
+        return getattr(row, name)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
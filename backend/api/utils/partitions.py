@@ -0,0 +1,128 @@
+import re
+from datetime import date
+from django.db import connections, router, transaction
+from django.utils import timezone
+from api.utils.filters import day_start
+
+# На сколько месяцев вперед создаются партиции (миграция и create_delivery_partitions)
+PARTITIONS_AHEAD_MONTHS = 3
+
+
+def month_start(value):
+    """Первый день месяца даты value"""
+    return value.replace(day=1)
+
+
+def add_months(month, count):
+    """Первый день месяца, отстоящего от month на count месяцев"""
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f'{table}_p{month:%Y_%m}'
+
+
+def default_partition_name(table):
+    return f'{table}_default'
+
+
+def is_partition(relation, table):
+    """Является ли relation помесячной партицией или партицией по умолчанию таблицы table"""
+    return re.fullmatch(rf'{re.escape(table)}_(p\d{{4}}_\d{{2}}|default)', relation) is not None
+
+
+class MonthlyPartitions:
+    """
+    Помесячные партиции таблицы model по колонке field
+
+    Границы месяцев считаются в TIME_ZONE, как и дни в фильтрах по датам. Строки,
+    для месяца которых партиции еще нет, попадают в партицию по умолчанию;
+    create() переносит их в партицию месяца.
+    """
+
+    def __init__(self, model, field='arrival_datetime', using=None):
+        self.model = model
+        self.using = using or router.db_for_write(model)
+        self.connection = connections[self.using]
+        self.table = model._meta.db_table
+        self.column = model._meta.get_field(field).column
+
+    def is_partitioned(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)", [self.table])
+            row = cursor.fetchone()
+        return bool(row and row[0])
+
+    def partitions(self):
+        """Имена партиций (включая партицию по умолчанию) по порядку"""
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = to_regclass(%s) ORDER BY c.relname
+                """,
+                [self.table],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def default_months(self):
+        """Месяцы, строки которых лежат в партиции по умолчанию"""
+        qn = self.connection.ops.quote_name
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT DISTINCT date_trunc('month', {qn(self.column)} AT TIME ZONE %s)::date
+                FROM {qn(default_partition_name(self.table))} ORDER BY 1
+                """,
+                [timezone.get_default_timezone_name()],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def create(self, month):
+        """
+        Создает партицию месяца month
+
+        Строки этого месяца из партиции по умолчанию переносятся в новую партицию
+        в той же транзакции. Возвращает число перенесенных строк или None, если
+        партиция уже есть.
+        """
+        qn = self.connection.ops.quote_name
+        name = partition_name(self.table, month)
+        default = qn(default_partition_name(self.table))
+        bounds = [day_start(month), day_start(add_months(month, 1))]
+        with transaction.atomic(using=self.using), self.connection.cursor() as cursor:
+            # Вставки в партицию по умолчанию ждут конца переноса, иначе строки
+            # месяца, добавленные между переносом и подключением партиции, сорвали бы ATTACH
+            cursor.execute(f'LOCK TABLE {default} IN SHARE ROW EXCLUSIVE MODE')
+            if name in self.partitions():
+                return None
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {default} WHERE {qn(self.column)} >= %s AND {qn(self.column)} < %s', bounds
+            )
+            moved = cursor.fetchone()[0]
+            if not moved:
+                cursor.execute(
+                    f'CREATE TABLE {qn(name)} PARTITION OF {qn(self.table)} FOR VALUES FROM (%s) TO (%s)', bounds
+                )
+                return 0
+
+            # Генерируемые колонки пересчитываются самой БД при вставке
+            columns = ', '.join(
+                qn(field.column) for field in self.model._meta.concrete_fields if not getattr(field, 'generated', False)
+            )
+            cursor.execute(f'CREATE TABLE {qn(name)} (LIKE {qn(self.table)} INCLUDING DEFAULTS INCLUDING GENERATED)')
+            cursor.execute(
+                f"""
+                WITH moved AS (
+                    DELETE FROM {default} WHERE {qn(self.column)} >= %s AND {qn(self.column)} < %s
+                    RETURNING {columns}
+                )
+                INSERT INTO {qn(name)} ({columns}) SELECT {columns} FROM moved
+                """,
+                bounds,
+            )
+            # Индексы, первичный ключ и внешние ключи таблицы создаются на партиции при подключении
+            cursor.execute(f'ALTER TABLE {qn(self.table)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)', bounds)
+            cursor.execute(f'ANALYZE {qn(name)}')
+        return moved
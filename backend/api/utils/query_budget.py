@@ -0,0 +1,36 @@
+from django.db import connections
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Представление выполнило больше SQL-запросов, чем допускает его бюджет"""
+
+
+class QueryCounter:
+    """
+    Счетчик SQL-запросов
+
+    Подключается к соединениям через execute_wrapper и считает все запросы,
+    выполненные внутри блока with. В отличие от CaptureQueriesContext не хранит
+    текст запросов и не требует DEBUG=True.
+    """
+
+    def __init__(self, using=None):
+        self.aliases = [using] if using else list(connections)
+        self.count = 0
+        self._wrappers = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        for alias in self.aliases:
+            wrapper = connections[alias].execute_wrapper(self)
+            wrapper.__enter__()
+            self._wrappers.append(wrapper)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        while self._wrappers:
+            self._wrappers.pop().__exit__(exc_type, exc_value, traceback)
+        return False
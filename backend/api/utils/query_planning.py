@@ -0,0 +1,162 @@
+from dataclasses import dataclass
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, RelatedField
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """
+    План загрузки связанных объектов для сериализатора
+
+    select_related - пути FK-связей, которые подтягиваются через JOIN;
+    prefetch_related - пути M2M/обратных связей, которые загружаются отдельным запросом;
+    only - колонки, которые читает сериализатор (пусто, если их нельзя определить,
+    например для SerializerMethodField или свойств модели).
+    """
+    select_related: tuple = ()
+    prefetch_related: tuple = ()
+    only: tuple = ()
+
+    def apply(self, queryset, restrict_columns=False, extra_columns=()):
+        """
+        Применяет план к queryset
+
+        При restrict_columns=True остальные колонки откладываются через only().
+        Это безопасно только для чтения: save() отложенного экземпляра обновит
+        лишь загруженные поля. extra_columns добавляются к колонкам плана
+        (например, поля сортировки, которые читает пагинатор).
+        """
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        if restrict_columns and self.only:
+            queryset = queryset.only(*self.only, *extra_columns)
+        return queryset
+
+
+_plan_cache = {}
+
+# Признак того, что сериализатор читает данные, колонки которых нельзя определить
+_ALL_COLUMNS = None
+
+
+def _walk_source(model, source_attrs, prefix=()):
+    """
+    Проходит по source поля сериализатора и определяет последнюю связь в пути
+
+    Возвращает кортеж (путь, модель, признак many) или None, если поле не затрагивает связи.
+    """
+    path = list(prefix)
+    current = model
+    relation = None
+    for attr in source_attrs:
+        try:
+            model_field = current._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+        if not model_field.is_relation:
+            break
+        path.append(attr)
+        if model_field.many_to_many or model_field.one_to_many:
+            return tuple(path), model_field.related_model, True
+        relation = (tuple(path), model_field.related_model, False)
+        current = model_field.related_model
+    return relation
+
+
+def _column(model, source_attrs, prefix=()):
+    """
+    Колонка, которую читает поле сериализатора, в виде пути для only()
+
+    Для FK возвращается само поле связи, для M2M/обратных связей - пустая строка
+    (они загружаются prefetch-запросом), для неизвестных атрибутов - _ALL_COLUMNS.
+    """
+    path = list(prefix)
+    current = model
+    for attr in source_attrs:
+        try:
+            model_field = current._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return _ALL_COLUMNS
+        if model_field.many_to_many or model_field.one_to_many:
+            return ''
+        path.append(attr)
+        if not model_field.is_relation:
+            break
+        current = model_field.related_model
+    return '__'.join(path)
+
+
+def _collect(model, fields, prefix, select, prefetch, columns):
+    for field in fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            columns.add(_ALL_COLUMNS)
+            continue
+
+        column = _column(model, field.source_attrs, prefix)
+        if column:
+            # Для пути через FK нужна и сама колонка связи: без нее only() не сочетается с JOIN
+            parts = column.split('__')
+            columns.update('__'.join(parts[:i]) for i in range(1, len(parts) + 1))
+        elif column is _ALL_COLUMNS:
+            columns.add(_ALL_COLUMNS)
+
+        relation = _walk_source(model, field.source_attrs, prefix)
+        if relation is None:
+            continue
+        path, related_model, many = relation
+        lookup = '__'.join(path)
+
+        if many:
+            prefetch.add(lookup)
+            continue
+
+        # PrimaryKeyRelatedField читает только <fk>_id и не требует JOIN
+        uses_pk_only = (
+            isinstance(field, RelatedField)
+            and not isinstance(field, ManyRelatedField)
+            and field.use_pk_only_optimization()
+            and len(path) == len(prefix) + len(field.source_attrs)
+        )
+        if uses_pk_only:
+            continue
+
+        select.add(lookup)
+
+        if isinstance(field, serializers.BaseSerializer) and hasattr(field, 'fields'):
+            # Вложенный сериализатор читает связанную модель целиком
+            _collect(related_model, field.fields, path, select, prefetch, set())
+
+
+def get_query_plan(serializer):
+    """
+    Строит план запроса по полям, которые реально читает сериализатор
+
+    Результат кэшируется по классу сериализатора и набору его полей.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+
+    fields = serializer.fields
+    key = (type(serializer), tuple(fields.keys()))
+    plan = _plan_cache.get(key)
+    if plan is None:
+        model = serializer.Meta.model
+        select, prefetch, columns = set(), set(), {model._meta.pk.name}
+        _collect(model, fields, (), select, prefetch, columns)
+        plan = QueryPlan(
+            select_related=tuple(sorted(select)),
+            prefetch_related=tuple(sorted(prefetch)),
+            only=() if _ALL_COLUMNS in columns else tuple(sorted(columns)),
+        )
+        _plan_cache[key] = plan
+    return plan
+
+
+def plan_queryset(queryset, serializer, restrict_columns=False, extra_columns=()):
+    """Подготавливает queryset под сериализатор: JOIN для FK, prefetch для M2M и, при чтении, only()"""
+    return get_query_plan(serializer).apply(queryset, restrict_columns, extra_columns)
@@ -0,0 +1,203 @@
+import threading
+import time
+from dataclasses import dataclass
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models.signals import post_delete, post_save
+from api.models import CargoType, DeliveryService, DeliveryStatus, PackageType, ReferenceVersion, TransportModel
+
+# Справочники, которые держатся в памяти процесса
+REFERENCE_MODELS = (TransportModel, PackageType, DeliveryService, DeliveryStatus, CargoType)
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    version: int
+    loaded_at: float
+    objects: tuple
+    by_pk: dict
+    last_modified: object
+
+
+@dataclass
+class _Counters:
+    hits: int = 0
+    misses: int = 0
+    loads: int = 0
+    invalidations: int = 0
+    shared_invalidations: int = 0
+
+
+class ReferenceCache:
+    """
+    Кэш справочников в памяти процесса
+
+    Для каждой модели хранится снимок всех строк (в порядке Meta.ordering) с номером
+    версии. Сохранение или удаление записи увеличивает версию (сразу и после коммита
+    транзакции), и следующий запрос перечитывает таблицу. После коммита изменение
+    записывается и в общую таблицу ReferenceVersion (publish); остальные процессы
+    (воркеры uvicorn) сверяют ее в начале каждого запроса (sync, ReferenceCacheMiddleware).
+    Вне запросов (команды manage.py) снимок перечитывается через REFERENCE_CACHE_TIMEOUT,
+    а запись, которой еще нет в снимке, при поиске по pk дочитывается из БД.
+
+    Экземпляры в снимке общие для всех запросов, изменять их нельзя.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._versions = {}
+        self._counters = {}
+        # Номера изменений из ReferenceVersion, уже примененные в процессе
+        self._shared_versions = {}
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'REFERENCE_CACHE_TIMEOUT', 60)
+
+    def all(self, model):
+        """Все записи справочника"""
+        snapshot, loaded = self._snapshot(model)
+        self._count(model, 'misses' if loaded else 'hits')
+        return list(snapshot.objects)
+
+    def get(self, model, pk):
+        """
+        Запись справочника по pk или None
+
+        Некорректный pk приводит к той же ошибке валидации, что и запрос к БД.
+        """
+        pk = model._meta.pk.to_python(pk)
+        snapshot, loaded = self._snapshot(model)
+        obj = snapshot.by_pk.get(pk)
+        if obj is not None:
+            self._count(model, 'misses' if loaded else 'hits')
+            return obj
+
+        # Записи нет в снимке: она могла появиться в другом процессе
+        self._count(model, 'misses')
+        obj = model._default_manager.filter(pk=pk).first()
+        if obj is not None:
+            self.invalidate(model)
+        return obj
+
+    def fingerprint(self, model):
+        """Число записей и наибольший updated_at справочника (для ETag)"""
+        snapshot, loaded = self._snapshot(model)
+        self._count(model, 'misses' if loaded else 'hits')
+        return len(snapshot.objects), snapshot.last_modified
+
+    def invalidate(self, model):
+        """Сбрасывает снимок модели; используйте после update()/bulk_create() в обход сигналов"""
+        with self._lock:
+            self._versions[model] = self._versions.get(model, 0) + 1
+            self._counter(model).invalidations += 1
+
+    def publish(self, model):
+        """Увеличивает общий номер изменения модели; вызывается после коммита"""
+        if self.timeout <= 0:
+            return
+        using = router.db_for_write(ReferenceVersion)
+        table = connections[using].ops.quote_name(ReferenceVersion._meta.db_table)
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} AS v (model, version) VALUES (%s, 1) '
+                f'ON CONFLICT (model) DO UPDATE SET version = v.version + 1 RETURNING version',
+                [model._meta.label],
+            )
+            version = cursor.fetchone()[0]
+        with self._lock:
+            # Свое изменение уже применено; если между проверками номер увеличил
+            # другой процесс, его изменение применит следующий sync
+            if self._shared_versions.get(model, 0) == version - 1:
+                self._shared_versions[model] = version
+
+    def sync(self):
+        """Сбрасывает снимки справочников, измененных другими процессами с прошлой проверки"""
+        if self.timeout <= 0:
+            return
+        rows = dict(
+            ReferenceVersion.objects.using(router.db_for_write(ReferenceVersion)).values_list('model', 'version')
+        )
+        changed = []
+        with self._lock:
+            for model in REFERENCE_MODELS:
+                version = rows.get(model._meta.label, 0)
+                if self._shared_versions.get(model, 0) != version:
+                    self._shared_versions[model] = version
+                    self._counter(model).shared_invalidations += 1
+                    changed.append(model)
+        for model in changed:
+            self.invalidate(model)
+
+    def stats(self):
+        """Счетчики обращений по справочникам"""
+        result = {}
+        for model in REFERENCE_MODELS:
+            counters = self._counter(model)
+            snapshot = self._snapshots.get(model)
+            result[model._meta.model_name] = {
+                'version': self._versions.get(model, 0),
+                'size': len(snapshot.objects) if snapshot else 0,
+                'hits': counters.hits,
+                'misses': counters.misses,
+                'loads': counters.loads,
+                'invalidations': counters.invalidations,
+                'shared_invalidations': counters.shared_invalidations,
+            }
+        return result
+
+    def _snapshot(self, model):
+        """Актуальный снимок модели и признак того, что он был прочитан из БД"""
+        version = self._versions.get(model, 0)
+        snapshot = self._snapshots.get(model)
+        if (
+            snapshot is not None
+            and snapshot.version == version
+            and time.monotonic() - snapshot.loaded_at < self.timeout
+        ):
+            return snapshot, False
+
+        # Снимок общий для всех запросов процесса, поэтому читается с основной БД:
+        # отставание реплики сохранилось бы в нем до истечения timeout
+        objects = tuple(model._default_manager.db_manager(router.db_for_write(model)).all())
+        snapshot = _Snapshot(
+            version=version,
+            loaded_at=time.monotonic(),
+            objects=objects,
+            by_pk={obj.pk: obj for obj in objects},
+            last_modified=max((obj.updated_at for obj in objects), default=None),
+        )
+        with self._lock:
+            self._counter(model).loads += 1
+            # Пока читали таблицу, версия могла измениться: такой снимок не сохраняем
+            if self._versions.get(model, 0) == version:
+                self._snapshots[model] = snapshot
+        return snapshot, True
+
+    def _counter(self, model):
+        counters = self._counters.get(model)
+        if counters is None:
+            counters = self._counters.setdefault(model, _Counters())
+        return counters
+
+    def _count(self, model, name):
+        counters = self._counter(model)
+        setattr(counters, name, getattr(counters, name) + 1)
+
+
+reference_cache = ReferenceCache()
+
+
+def _invalidate_on_change(sender, **kwargs):
+    reference_cache.invalidate(sender)
+    # Повторно после коммита: снимок, прочитанный внутри транзакции, мог увидеть незакоммиченные данные
+    transaction.on_commit(lambda: reference_cache.invalidate(sender))
+    transaction.on_commit(lambda: reference_cache.publish(sender), robust=True)
+
+
+def connect_signals():
+    """Подключает сброс кэша к сохранению и удалению справочников"""
+    for model in REFERENCE_MODELS:
+        post_save.connect(_invalidate_on_change, sender=model, dispatch_uid=f'reference_cache_save_{model.__name__}')
+        post_delete.connect(_invalidate_on_change, sender=model, dispatch_uid=f'reference_cache_delete_{model.__name__}')
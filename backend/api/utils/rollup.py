@@ -0,0 +1,442 @@
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from django.db import connections, router, transaction
+from django.db.transaction import TransactionManagementError
+from django.db.models import DateTimeField
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.utils import timezone
+from api.models import Delivery, DeliveryArchive, DeliveryDailyRollup, DeliveryService
+from api.signals import in_bulk_write, post_bulk_write, pre_bulk_write, rollup_changed
+from api.utils.archive import remove_service
+from api.utils.filters import day_start
+
+
+def local_day(value):
+    """День момента времени в TIME_ZONE, как (value AT TIME ZONE TIME_ZONE)::date"""
+    return timezone.localtime(value, timezone.get_default_timezone()).date()
+
+
+def _aggregate_sql(connection, where):
+    """
+    SELECT строк свода по доставкам, подходящим под условие where
+
+    Столбцы: день, статус, модель транспорта, услуга, количество, суммы дистанций
+    и длительностей, число доставок без услуг. Итоговая строка группы - с услугой NULL.
+    Доставки читаются вместе с архивом (DeliveryArchive): у архивных строк услуги
+    хранятся массивом services, у действующих - в промежуточной таблице.
+    """
+    qn = connection.ops.quote_name
+    delivery = qn(Delivery._meta.db_table)
+    through = qn(Delivery.services.through._meta.db_table)
+    archive = qn(DeliveryArchive._meta.db_table)
+    return f"""
+        WITH d AS MATERIALIZED (
+            SELECT id, (arrival_datetime AT TIME ZONE %(tz)s)::date AS day,
+                   status_id, transport_model_id, distance, duration, NULL::uuid[] AS services
+            FROM {delivery}
+            WHERE {where}
+            UNION ALL
+            SELECT id, (arrival_datetime AT TIME ZONE %(tz)s)::date,
+                   status_id, transport_model_id, distance, duration, services
+            FROM {archive}
+            WHERE {where}
+        ),
+        without_services AS (
+            SELECT day, status_id, transport_model_id, COUNT(*) AS count
+            FROM d
+            WHERE CASE
+                WHEN d.services IS NULL THEN NOT EXISTS (SELECT 1 FROM {through} t WHERE t.delivery_id = d.id)
+                ELSE cardinality(d.services) = 0
+            END
+            GROUP BY day, status_id, transport_model_id
+        )
+        SELECT g.day, g.status_id, g.transport_model_id, NULL::uuid,
+               g.count, g.distance_sum, g.duration_sum, COALESCE(w.count, 0)
+        FROM (
+            SELECT day, status_id, transport_model_id,
+                   COUNT(*) AS count, SUM(distance) AS distance_sum, SUM(duration) AS duration_sum
+            FROM d
+            GROUP BY day, status_id, transport_model_id
+        ) g
+        LEFT JOIN without_services w USING (day, status_id, transport_model_id)
+        UNION ALL
+        SELECT s.day, s.status_id, s.transport_model_id, s.service_id,
+               COUNT(*), SUM(s.distance), SUM(s.duration), 0
+        FROM (
+            SELECT d.day, d.status_id, d.transport_model_id, d.distance, d.duration, t.deliveryservice_id AS service_id
+            FROM d JOIN {through} t ON t.delivery_id = d.id
+            UNION ALL
+            SELECT d.day, d.status_id, d.transport_model_id, d.distance, d.duration, a.service_id
+            FROM d CROSS JOIN unnest(d.services) AS a(service_id)
+        ) s
+        GROUP BY s.day, s.status_id, s.transport_model_id, s.service_id
+    """
+
+
+def delivery_bounds(using=None):
+    """Самое раннее и самое позднее время доставки с учетом архива (None, None - доставок нет)"""
+    values = []
+    for model in (Delivery, DeliveryArchive):
+        # Границы читаются по индексам arrival_datetime, без просмотра таблиц
+        bounds = model.objects.using(using).order_by('arrival_datetime').values_list('arrival_datetime', flat=True)
+        values += [value for value in (bounds.first(), bounds.reverse().first()) if value is not None]
+    return (min(values), max(values)) if values else (None, None)
+
+
+def _lock_days(cursor, days, shared):
+    """
+    Advisory-блокировки дней свода до конца транзакции
+
+    Изменения по дельтам берут разделяемую блокировку, пересчет дня - исключительную,
+    поэтому пересчет не пересекается с незакоммиченными дельтами того же дня.
+    """
+    function = 'pg_advisory_xact_lock_shared' if shared else 'pg_advisory_xact_lock'
+    cursor.execute(
+        f"SELECT {function}(hashtext(%s), day - DATE '2000-01-01') "
+        'FROM unnest(%s::date[]) AS day ORDER BY day',
+        [DeliveryDailyRollup._meta.db_table, sorted(days)],
+    )
+
+
+def refresh_days(days, using=None):
+    """
+    Пересчитывает свод за переданные дни по текущим данным доставок
+
+    Пересчет идемпотентен и выполняется в отдельной транзакции под исключительными
+    блокировками дней, поэтому видит все закоммиченные изменения этих дней.
+    """
+    days = sorted(set(days))
+    if not days:
+        return
+    using = using or router.db_for_write(DeliveryDailyRollup)
+    connection = connections[using]
+    table = connection.ops.quote_name(DeliveryDailyRollup._meta.db_table)
+    where = (
+        'arrival_datetime >= %(start)s AND arrival_datetime < %(end)s '
+        'AND (arrival_datetime AT TIME ZONE %(tz)s)::date = ANY(%(days)s::date[])'
+    )
+    params = {
+        'days': days,
+        'tz': timezone.get_default_timezone_name(),
+        'start': day_start(days[0]),
+        'end': day_start(days[-1] + timedelta(days=1)),
+    }
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        _lock_days(cursor, days, shared=False)
+        cursor.execute(f'DELETE FROM {table} WHERE day = ANY(%(days)s::date[])', params)
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (
+                day, status_id, transport_model_id, service_id,
+                count, distance_sum, duration_sum, without_services_count
+            )
+            {_aggregate_sql(connection, where)}
+            """,
+            params,
+        )
+        rollup_changed.send(sender=DeliveryDailyRollup, days=days, using=using)
+
+
+def rebuild(start=None, end=None, chunk_days=31, using=None, progress=None):
+    """
+    Пересобирает свод за [start, end] (по умолчанию - за весь период доставок) пачками дней
+
+    Каждая пачка - отдельная транзакция, поэтому пересборку можно прервать
+    и продолжить с нужного дня. Строки свода вне периода доставок удаляются.
+    """
+    using = using or router.db_for_write(DeliveryDailyRollup)
+    if start is None or end is None:
+        first, last = delivery_bounds(using)
+        if first is None:
+            DeliveryDailyRollup.objects.using(using).all().delete()
+            return
+        if start is None:
+            DeliveryDailyRollup.objects.using(using).filter(day__lt=local_day(first)).delete()
+            start = local_day(first)
+        if end is None:
+            DeliveryDailyRollup.objects.using(using).filter(day__gt=local_day(last)).delete()
+            end = local_day(last)
+
+    day = start
+    while day <= end:
+        chunk = [day + timedelta(days=offset) for offset in range(chunk_days) if day + timedelta(days=offset) <= end]
+        refresh_days(chunk, using=using)
+        day = chunk[-1] + timedelta(days=1)
+        if progress is not None:
+            progress(chunk[0], chunk[-1])
+
+
+@dataclass(frozen=True)
+class _Row:
+    """Поля доставки, от которых зависит ее вклад в свод; id - строками"""
+    arrival_datetime: datetime
+    departure_datetime: datetime
+    status_id: str
+    transport_model_id: str
+    distance: float
+    duration: float
+    services: frozenset
+
+
+def _require_transaction(using):
+    """
+    Свод изменяется только внутри транзакции записи доставок
+
+    Иначе вычитание прежнего вклада и блокировки зафиксировались бы до самой
+    записи, и ее ошибка оставила бы свод без вклада этих доставок.
+    """
+    if not connections[using].in_atomic_block:
+        raise TransactionManagementError(
+            'Изменение доставок и дневного свода аналитики должно выполняться внутри transaction.atomic()'
+        )
+
+
+def _read_rows(pks, using, lock=False, archive=False):
+    """
+    Текущий вклад доставок pks: {id: _Row}
+
+    lock блокирует строки доставок до конца транзакции (FOR UPDATE): параллельное
+    изменение тех же доставок прочитает их только после коммита текущего.
+    archive - читать архивные доставки (DeliveryArchive, без блокировки).
+    """
+    pks = sorted({str(pk) for pk in pks})
+    if not pks:
+        return {}
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    if archive:
+        sql = f"""
+            SELECT id, arrival_datetime, NULL, status_id, transport_model_id, distance, duration, services
+            FROM {qn(DeliveryArchive._meta.db_table)} WHERE id = ANY(%s::uuid[])
+        """
+    else:
+        through = Delivery.services.through._meta.db_table
+        sql = f"""
+            SELECT d.id, d.arrival_datetime, d.departure_datetime, d.status_id, d.transport_model_id,
+                   d.distance, d.duration,
+                   ARRAY(SELECT t.deliveryservice_id FROM {qn(through)} t WHERE t.delivery_id = d.id)
+            FROM {qn(Delivery._meta.db_table)} d WHERE d.id = ANY(%s::uuid[])
+        """
+        if lock:
+            sql += ' ORDER BY d.id FOR UPDATE OF d'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [pks])
+        return {
+            str(pk): _Row(arrival, departure, str(status_id), str(transport_model_id), distance, duration,
+                          frozenset(str(service_id) for service_id in services))
+            for pk, arrival, departure, status_id, transport_model_id, distance, duration, services in cursor.fetchall()
+        }
+
+
+def _instance_row(instance, old, update_fields):
+    """
+    Вклад доставки после save() без повторного чтения
+
+    Записанные поля берутся из экземпляра (как их сохранил Django), остальные -
+    из прежней строки old. Длительность считается так же, как генерируемая колонка.
+    Услуги save() не меняет.
+    """
+    def value(name):
+        field = Delivery._meta.get_field(name)
+        if old is not None and update_fields is not None and not {field.name, field.attname} & set(update_fields):
+            return getattr(old, field.attname)
+        value = field.to_python(getattr(instance, field.attname))
+        if isinstance(field, DateTimeField) and timezone.is_naive(value):
+            value = timezone.make_aware(value, timezone.get_default_timezone())
+        return value
+
+    arrival, departure = value('arrival_datetime'), value('departure_datetime')
+    if old is not None and (arrival, departure) == (old.arrival_datetime, old.departure_datetime):
+        duration = old.duration
+    else:
+        duration = (arrival - departure).total_seconds() / 3600
+    return _Row(
+        arrival, departure, str(value('status_id')), str(value('transport_model_id')),
+        float(value('distance')), duration, old.services if old is not None else frozenset(),
+    )
+
+
+def _delta(old_rows, new_rows):
+    """Изменение строк свода: {(день, статус, модель, услуга или None): [count, distance, duration, без услуг]}"""
+    delta = {}
+    for rows, sign in ((old_rows, -1), (new_rows, 1)):
+        for row in rows:
+            day = local_day(row.arrival_datetime)
+            for service_id in (None, *sorted(row.services)):
+                entry = delta.setdefault((day, row.status_id, row.transport_model_id, service_id), [0, 0.0, 0.0, 0])
+                entry[0] += sign
+                entry[1] += sign * row.distance
+                entry[2] += sign * row.duration
+                if service_id is None and not row.services:
+                    entry[3] += sign
+    return delta
+
+
+def _apply(old_rows, new_rows, using, skip_service=None):
+    """
+    Применяет к своду разницу вкладов доставок до и после изменения
+
+    Разница считается в памяти по уже прочитанным строкам, без агрегирующего
+    запроса, и записывается одним INSERT ... ON CONFLICT DO UPDATE для строк
+    без услуги и с услугой. Строки, где не осталось доставок, удаляются отдельным
+    запросом, только если такие появились. rollup_changed отправляется за все
+    затронутые дни, даже если вклад не изменился: от других полей доставки
+    зависят фильтры аналитики.
+    """
+    old_rows, new_rows = list(old_rows), list(new_rows)
+    days = {local_day(row.arrival_datetime) for row in old_rows + new_rows}
+    if not days:
+        return
+    rows = [
+        (*key, *values) for key, values in _delta(old_rows, new_rows).items()
+        if any(values) and (skip_service is None or key[3] != skip_service)
+    ]
+    connection = connections[using]
+    table = connection.ops.quote_name(DeliveryDailyRollup._meta.db_table)
+    if rows:
+        with connection.cursor() as cursor:
+            _lock_days(cursor, {row[0] for row in rows}, shared=True)
+            columns = ', '.join((
+                'day', 'status_id', 'transport_model_id', 'service_id',
+                'count', 'distance_sum', 'duration_sum', 'without_services_count',
+            ))
+            update = """
+                count = r.count + EXCLUDED.count,
+                distance_sum = r.distance_sum + EXCLUDED.distance_sum,
+                duration_sum = r.duration_sum + EXCLUDED.duration_sum,
+                without_services_count = r.without_services_count + EXCLUDED.without_services_count
+            """
+            # Строки свода блокируются в одном порядке во всех транзакциях
+            cursor.execute(
+                f"""
+                WITH delta AS (
+                    SELECT * FROM unnest(
+                        %s::date[], %s::uuid[], %s::uuid[], %s::uuid[],
+                        %s::integer[], %s::float8[], %s::float8[], %s::integer[]
+                    ) AS u({columns})
+                ),
+                totals AS (
+                    INSERT INTO {table} AS r ({columns})
+                    SELECT * FROM delta WHERE service_id IS NULL ORDER BY day, status_id, transport_model_id
+                    ON CONFLICT (day, status_id, transport_model_id) WHERE service_id IS NULL
+                    DO UPDATE SET {update}
+                    RETURNING r.count
+                ),
+                by_service AS (
+                    INSERT INTO {table} AS r ({columns})
+                    SELECT * FROM delta WHERE service_id IS NOT NULL
+                    ORDER BY day, service_id, status_id, transport_model_id
+                    ON CONFLICT (day, service_id, status_id, transport_model_id) WHERE service_id IS NOT NULL
+                    DO UPDATE SET {update}
+                    RETURNING r.count
+                )
+                SELECT (SELECT COUNT(*) FROM totals WHERE count = 0) + (SELECT COUNT(*) FROM by_service WHERE count = 0)
+                """,
+                [list(column) for column in zip(*rows)],
+            )
+            if cursor.fetchone()[0]:
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE day = ANY(%s::date[]) AND count = 0', [sorted({row[0] for row in rows})]
+                )
+    rollup_changed.send(sender=DeliveryDailyRollup, days=days, using=using)
+
+
+def _on_pre_save(sender, instance, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    _require_transaction(using)
+    instance._rollup_old = None
+    if not instance._state.adding:
+        instance._rollup_old = _read_rows([instance.pk], using, lock=True).get(str(instance.pk))
+
+
+def _on_post_save(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    if raw:
+        return
+    old = instance.__dict__.pop('_rollup_old', None)
+    _apply([old] if old is not None else [], [_instance_row(instance, old, update_fields)], using)
+
+
+def _on_pre_delete(sender, instance, using=None, **kwargs):
+    # Массовое удаление (BulkWriter) вычитает вклад через pre_bulk_write
+    if in_bulk_write(sender):
+        return
+    # Вклад читается из БД, поэтому экземпляр может быть загружен частично (only('pk'))
+    _require_transaction(using)
+    _apply(_read_rows([instance.pk], using, lock=True).values(), [], using)
+
+
+def _on_services_changed(sender, instance, action, reverse, pk_set, using=None, **kwargs):
+    if action.startswith('pre_'):
+        if not reverse:
+            pks = [instance.pk]
+        elif action == 'pre_clear':
+            # Со стороны услуги затронуты все ее доставки
+            pks = sender.objects.using(using).filter(deliveryservice_id=instance.pk).values_list('delivery_id', flat=True)
+        else:
+            pks = pk_set or []
+        _require_transaction(using)
+        instance._rollup_old = _read_rows(pks, using, lock=True)
+        return
+
+    old = instance.__dict__.pop('_rollup_old', {})
+    if reverse:
+        changed = {str(instance.pk)}
+    else:
+        changed = {str(pk) for pk in pk_set or ()}
+    new = {}
+    for pk, row in old.items():
+        if action == 'post_add':
+            services = row.services | changed
+        elif action == 'post_remove' or reverse:
+            services = row.services - changed
+        else:
+            services = frozenset()
+        new[pk] = replace(row, services=services)
+    _apply(old.values(), new.values(), using)
+
+
+def _on_service_pre_delete(sender, instance, using=None, **kwargs):
+    _require_transaction(using)
+    through = Delivery.services.through
+    deliveries = through.objects.using(using).filter(deliveryservice_id=instance.pk).values_list('delivery_id', flat=True)
+    # У архивных доставок услуга убирается из массива services после удаления самой услуги
+    archived = list(
+        DeliveryArchive.objects.using(using).filter(services__contains=[instance.pk]).values_list('pk', flat=True)
+    )
+    instance._rollup_old = {
+        **_read_rows(deliveries, using, lock=True),
+        **_read_rows(archived, using, archive=True),
+    }
+    instance._rollup_archived = archived
+
+
+def _on_service_post_delete(sender, instance, using=None, **kwargs):
+    remove_service(instance.pk, instance._rollup_archived, using=using)
+    old = instance.__dict__.pop('_rollup_old', {})
+    service_id = str(instance.pk)
+    new = [replace(row, services=row.services - {service_id}) for row in old.values()]
+    # Строки свода по самой услуге уже удалены каскадно
+    _apply(old.values(), new, using, skip_service=service_id)
+
+
+def _on_pre_bulk_write(sender, pks, using=None, state=None, **kwargs):
+    _require_transaction(using)
+    state['rollup'] = _read_rows(pks, using, lock=True)
+
+
+def _on_post_bulk_write(sender, pks, using=None, state=None, **kwargs):
+    # Удаленные доставки есть только среди прежних строк, созданные - только среди новых
+    _apply(state.pop('rollup', {}).values(), _read_rows(pks, using).values(), using)
+
+
+def connect_signals():
+    """Подключает изменение свода к записи доставок и их услуг"""
+    pre_save.connect(_on_pre_save, sender=Delivery, dispatch_uid='rollup_pre_save')
+    post_save.connect(_on_post_save, sender=Delivery, dispatch_uid='rollup_post_save')
+    pre_delete.connect(_on_pre_delete, sender=Delivery, dispatch_uid='rollup_pre_delete')
+    m2m_changed.connect(_on_services_changed, sender=Delivery.services.through, dispatch_uid='rollup_services')
+    pre_delete.connect(_on_service_pre_delete, sender=DeliveryService, dispatch_uid='rollup_service_pre_delete')
+    post_delete.connect(_on_service_post_delete, sender=DeliveryService, dispatch_uid='rollup_service_post_delete')
+    pre_bulk_write.connect(_on_pre_bulk_write, sender=Delivery, dispatch_uid='rollup_pre_bulk_write')
+    post_bulk_write.connect(_on_post_bulk_write, sender=Delivery, dispatch_uid='rollup_post_bulk_write')
@@ -0,0 +1,79 @@
+import re
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, Q
+from django.db.models.functions import Upper
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
+
+class PostgresSearchFilter(SearchFilter):
+    """
+    Поиск средствами PostgreSQL с интерфейсом SearchFilter (?search=)
+
+    Настраивается атрибутами представления:
+    - search_trigram_fields - поля с GIN-индексом gin_trgm_ops по UPPER(поле): совпадение
+      по подстроке без учета регистра или нечеткое совпадение по триграммам (word_similarity);
+    - search_vector_field - поле tsvector с GIN-индексом: поиск по словам с учетом
+      морфологии, каждое слово термина ищется как префикс;
+    - search_config - конфигурация полнотекстового поиска.
+
+    Как и в SearchFilter, строка разбивается на термины, и каждый термин должен
+    совпасть хотя бы с одним из полей. Найденные записи получают релевантность
+    search_rank; если параметр ordering не передан, выдача сортируется по ней.
+    """
+
+    search_config = 'russian'
+    rank_annotation = 'search_rank'
+    # Для коротких терминов нечеткое сравнение по триграммам дает слишком много шума
+    trigram_min_length = 3
+
+    def filter_queryset(self, request, queryset, view):
+        trigram_fields = getattr(view, 'search_trigram_fields', [])
+        vector_field = getattr(view, 'search_vector_field', None)
+        terms = self.get_search_terms(request)
+        if not terms or not (trigram_fields or vector_field):
+            return queryset
+
+        config = getattr(view, 'search_config', self.search_config)
+        rank = None
+        for term in terms:
+            condition = Q()
+            for field in trigram_fields:
+                # icontains в PostgreSQL строится как UPPER(поле) LIKE, поэтому нечеткое
+                # сравнение тоже идет по UPPER(поле) - под то же выражение индекса
+                value = Upper(field)
+                condition |= Q(**{f'{field}__icontains': term})
+                if len(term) >= self.trigram_min_length:
+                    condition |= Q(TrigramWordSimilar(value, term.upper()))
+                rank = self._add(rank, TrigramWordSimilarity(term.upper(), value))
+
+            query = self.build_prefix_query(term, config)
+            if vector_field and query is not None:
+                condition |= Q(**{vector_field: query})
+                rank = self._add(rank, SearchRank(F(vector_field), query))
+
+            queryset = queryset.filter(condition)
+
+        queryset = queryset.annotate(**{self.rank_annotation: rank})
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            ordering = queryset.query.order_by or queryset.model._meta.ordering
+            queryset = queryset.order_by(f'-{self.rank_annotation}', *ordering)
+        return queryset
+
+    @staticmethod
+    def build_prefix_query(term, config):
+        """
+        Запрос to_tsquery, в котором каждое слово термина ищется как префикс
+
+        В запрос попадают только буквы и цифры, поэтому пользовательский ввод
+        не может сломать синтаксис tsquery. Возвращает None, если слов нет.
+        """
+        words = re.findall(r'[^\W_]+', term)
+        if not words:
+            return None
+        return SearchQuery(' & '.join(f'{word}:*' for word in words), search_type='raw', config=config)
+
+    @staticmethod
+    def _add(total, expression):
+        return expression if total is None else total + expression
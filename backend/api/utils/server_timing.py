@@ -0,0 +1,121 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+
+# Сборщик замеров текущего запроса (ServerTimingMiddleware)
+_current = ContextVar('server_timing', default=None)
+
+# Порядок метрик в заголовке Server-Timing
+METRICS = ('db', 'auth', 'serialize', 'render')
+
+
+class ServerTiming:
+    """
+    Замеры этапов одного запроса для заголовка Server-Timing
+
+    Для каждой метрики копится суммарное время и число замеров. Вложенные
+    замеры одной метрики не суммируются повторно: учитывается внешний.
+    sampled - запрос попал в выборку SERVER_TIMING_SAMPLE_RATE и отчитывается
+    независимо от пользователя.
+    """
+
+    def __init__(self, sampled=False):
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.counts = {}
+        self._active = set()
+
+    def add(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    @contextmanager
+    def measure(self, name):
+        if name in self._active:
+            yield
+            return
+        self._active.add(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._active.discard(name)
+            self.add(name, time.perf_counter() - started)
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обертка выполнения SQL (connection.execute_wrapper): метрика db"""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add('db', time.perf_counter() - started)
+
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def header(self):
+        """Значение заголовка Server-Timing, длительности в миллисекундах"""
+        parts = []
+        for name in METRICS:
+            if name not in self.durations:
+                continue
+            part = f'{name};dur={self.durations[name] * 1000:.2f}'
+            if name == 'db':
+                part += f';desc="queries: {self.counts[name]}"'
+            parts.append(part)
+        parts.append(f'total;dur={self.total() * 1000:.2f}')
+        return ', '.join(parts)
+
+    def as_fields(self):
+        """Замеры для журнала запросов: {'db_ms': ..., 'db_queries': ..., 'auth_ms': ...}"""
+        fields = {}
+        for name in METRICS:
+            if name in self.durations:
+                fields[f'{name}_ms'] = round(self.durations[name] * 1000, 2)
+                if name == 'db':
+                    fields['db_queries'] = self.counts[name]
+        return fields
+
+
+def start_timing():
+    """
+    Новый сборщик замеров, если запрос может получить Server-Timing, иначе None
+
+    При SERVER_TIMING_STAFF замеры собираются для всех запросов: персонал
+    определяется только после аутентификации DRF внутри представления.
+    """
+    sampled = settings.SERVER_TIMING_SAMPLE_RATE > 0 and random.random() < settings.SERVER_TIMING_SAMPLE_RATE
+    if not sampled and not settings.SERVER_TIMING_STAFF:
+        return None
+    return ServerTiming(sampled)
+
+
+def activate(timing):
+    return _current.set(timing)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+def reported_timing(request):
+    """Замеры запроса, если их нужно отдать в заголовке и журнале, иначе None"""
+    timing = getattr(request, 'server_timing', None)
+    if timing is None or timing.sampled:
+        return timing
+    user = getattr(request, 'user', None)
+    return timing if user is not None and user.is_staff else None
+
+
+@contextmanager
+def measure(name):
+    """Замер блока в метрику name текущего запроса; без сборщика ничего не делает"""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    with timing.measure(name):
+        yield
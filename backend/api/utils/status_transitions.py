@@ -0,0 +1,101 @@
+from dataclasses import dataclass, field
+from django.db import connections, router, transaction
+from django.utils import timezone
+from api.models import Delivery, DeliveryStatus
+from api.signals import post_bulk_write, pre_bulk_write
+from api.utils.reference_cache import reference_cache
+
+STATUS_PENDING = 'В ожидании'
+STATUS_IN_TRANSIT = 'В пути'
+STATUS_COMPLETED = 'Проведено'
+
+# Допустимые переходы между статусами доставки: исходный статус -> целевые.
+# Статусы задаются названиями, так как справочник заполняется через админку
+STATUS_TRANSITIONS = {
+    STATUS_PENDING: (STATUS_IN_TRANSIT, STATUS_COMPLETED),
+    STATUS_IN_TRANSIT: (STATUS_PENDING, STATUS_COMPLETED),
+}
+
+
+def get_status(name):
+    """Статус по названию из кэша справочников или None"""
+    for status in reference_cache.all(DeliveryStatus):
+        if status.name == name:
+            return status
+    return None
+
+
+def allowed_sources(target):
+    """Статусы, из которых допускается переход в target"""
+    return [
+        status for status in reference_cache.all(DeliveryStatus)
+        if target.name in STATUS_TRANSITIONS.get(status.name, ())
+    ]
+
+
+@dataclass
+class TransitionResult:
+    """Итог перехода: какие доставки изменились и почему остальные нет"""
+
+    status: DeliveryStatus
+    changed: list = field(default_factory=list)
+    unchanged: list = field(default_factory=list)
+    rejected: list = field(default_factory=list)
+    not_found: list = field(default_factory=list)
+
+    def as_dict(self):
+        return {
+            'status': str(self.status.pk),
+            'changed': [str(pk) for pk in self.changed],
+            'unchanged': [str(pk) for pk in self.unchanged],
+            'rejected': [{'id': str(pk), 'status': str(status_id)} for pk, status_id in self.rejected],
+            'not_found': [str(pk) for pk in self.not_found],
+        }
+
+
+def transition_deliveries(ids, target):
+    """
+    Переводит доставки ids в статус target
+
+    Переход выполняется одним UPDATE ... WHERE status_id = ANY(<допустимые исходные>)
+    RETURNING id, поэтому проверка и изменение атомарны и не требуют загрузки строк.
+    Для доставок, которые не изменились, одним запросом выясняется причина:
+    уже в целевом статусе (unchanged), переход не допускается (rejected) или
+    доставки нет (not_found). Сигналы save при этом не отправляются, вместо них
+    UPDATE окружают pre_bulk_write и post_bulk_write с переданными доставками.
+    """
+    ids = list(dict.fromkeys(ids))
+    result = TransitionResult(status=target)
+    if not ids:
+        return result
+
+    sources = [status.pk for status in allowed_sources(target)]
+    if sources:
+        using = router.db_for_write(Delivery)
+        table = Delivery._meta.db_table
+        qn = connections[using].ops.quote_name
+        status_column = qn(Delivery._meta.get_field('status').column)
+        sql = (
+            f'UPDATE {qn(table)} SET {status_column} = %s, {qn("updated_at")} = %s '
+            f'WHERE {qn("id")} = ANY(%s) AND {status_column} = ANY(%s) '
+            f'RETURNING {qn("id")}'
+        )
+        with transaction.atomic(using=using), connections[using].cursor() as cursor:
+            state = {}
+            pre_bulk_write.send(sender=Delivery, pks=ids, using=using, state=state)
+            cursor.execute(sql, [target.pk, timezone.now(), ids, sources])
+            result.changed = [row[0] for row in cursor.fetchall()]
+            post_bulk_write.send(sender=Delivery, pks=ids, using=using, state=state)
+
+    changed = set(result.changed)
+    rest = [pk for pk in ids if pk not in changed]
+    if rest:
+        current = dict(Delivery.objects.filter(pk__in=rest).values_list('pk', 'status_id'))
+        for pk in rest:
+            if pk not in current:
+                result.not_found.append(pk)
+            elif current[pk] == target.pk:
+                result.unchanged.append(pk)
+            else:
+                result.rejected.append((pk, current[pk]))
+    return result
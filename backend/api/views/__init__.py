@@ -8,6 +8,7 @@ from .reference import (
     CargoTypeViewSet
 )
 from .analytics import DeliveryAnalyticsViewSet
+from .metrics import InternalMetricsView
 
 __all__ = [
     "CustomTokenObtainPairView",
@@ -18,5 +19,6 @@ __all__ = [
     "DeliveryServiceViewSet",
     "DeliveryStatusViewSet",
     "CargoTypeViewSet",
-    "DeliveryAnalyticsViewSet"
+    "DeliveryAnalyticsViewSet",
+    "InternalMetricsView"
 ]
@@ -1,17 +1,40 @@
-from django.db.models import Count, Sum, Avg
-from django.db.models.functions import TruncDate
+from django.conf import settings
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from api.models import Delivery
+from api.models import Delivery, DeliveryArchive
 from api.serializers import DeliveryAnalyticsSerializer
-
-
-class DeliveryAnalyticsViewSet(viewsets.ReadOnlyModelViewSet):
+from api.utils.analytics import (
+    BUCKET_DAY,
+    BUCKETS,
+    SECTIONS,
+    DeliveryAnalytics,
+    DeliveryDistributions,
+    RollupAnalytics,
+    resolve_bucket,
+)
+from api.utils.analytics_cache import analytics_cache
+from api.utils.filters import (
+    SERVICES_MATCH_ANY,
+    filter_archive_by_services,
+    filter_by_services,
+    filter_date_range,
+    parse_id_list,
+)
+from api.views.mixins import ReplicaReadMixin
+
+
+class DeliveryAnalyticsViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """
     Представление для аналитики доставок
 
     Предоставляет доступ только для чтения к статистическим данным по доставкам.
+    Статистика читается из дневного свода (RollupAnalytics), а для фильтров,
+    на которые свод не отвечает, считается одним запросом (DeliveryAnalytics).
+    Необязательные разделы include (перцентили, гистограммы) считаются
+    по доставкам (DeliveryDistributions). Архивные доставки (DeliveryArchive)
+    учитываются во всех разделах. Ответы кэшируются по фильтрам
+    в памяти процесса (analytics_cache). Данные читаются с реплики, если она настроена.
     """
     queryset = Delivery.objects.all()
     permission_classes = [IsAuthenticated]
@@ -25,68 +48,34 @@ class DeliveryAnalyticsViewSet(viewsets.ReadOnlyModelViewSet):
             # Получаем параметры фильтрации
             start_date = request.query_params.get('start_date')
             end_date = request.query_params.get('end_date')
-            service_ids = request.query_params.get('services')
-            cargo_type_ids = request.query_params.get('cargo_types')
-
-            # Базовый запрос
-            query = self.get_queryset()
-
-            # Применяем фильтры
-            if start_date:
-                query = query.filter(arrival_datetime__date__gte=start_date)
-
-            if end_date:
-                query = query.filter(arrival_datetime__date__lte=end_date)
-
-            if service_ids:
-                service_ids = service_ids.split(',')
-                query = query.filter(services__id__in=service_ids).distinct()
-
-            if cargo_type_ids:
-                cargo_type_ids = cargo_type_ids.split(',')
-                query = query.filter(cargo_type__id__in=cargo_type_ids).distinct()
-
-            # Статистика по дням
-            daily_stats = query.annotate(
-                date=TruncDate('arrival_datetime')
-            ).values('date').annotate(
-                count=Count('id'),
-                total_distance=Sum('distance'),
-                avg_distance=Avg('distance')
-            ).order_by('date')
-
-            # Статистика по статусам
-            status_stats = query.values('status__name', 'status__color').annotate(
-                count=Count('id')
-            ).order_by('-count')
-
-            # Статистика по моделям транспорта
-            transport_stats = query.values('transport_model__name').annotate(
-                count=Count('id')
-            ).order_by('-count')
-
-            # Статистика по услугам
-            service_stats = query.values('services__name').annotate(
-                count=Count('id', distinct=True)
-            ).order_by('-count')
-
-            # Общая статистика
-            total_deliveries = query.count()
-            total_distance = query.aggregate(Sum('distance'))['distance__sum'] or 0
-
-            # Создаем данные для сериализации
-            analytics_data = {
-                'daily_stats': list(daily_stats),
-                'status_stats': list(status_stats),
-                'transport_stats': list(transport_stats),
-                'service_stats': list(service_stats),
-                'total_deliveries': total_deliveries,
-                'total_distance': total_distance
+            service_ids = parse_id_list(request.query_params.get('services'))
+            services_match = request.query_params.get('services_match', SERVICES_MATCH_ANY)
+            cargo_type_ids = parse_id_list(request.query_params.get('cargo_types'))
+            bucket = request.query_params.get('bucket', BUCKET_DAY)
+            if bucket not in BUCKETS:
+                return Response(
+                    {"detail": f"Недопустимый интервал bucket: '{bucket}'. Допустимые значения: {', '.join(BUCKETS)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            sections = parse_id_list(request.query_params.get('include'))
+            unknown = [section for section in sections if section not in SECTIONS]
+            if unknown:
+                return Response(
+                    {"detail": f"Недопустимые разделы include: {', '.join(unknown)}. Допустимые значения: {', '.join(SECTIONS)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            filters = {
+                'start_date': start_date,
+                'end_date': end_date,
+                'service_ids': service_ids,
+                'services_match': services_match,
+                'cargo_type_ids': cargo_type_ids,
             }
 
-            # Сериализуем и возвращаем данные
-            serializer = DeliveryAnalyticsSerializer(analytics_data)
-            return Response(serializer.data)
+            # Одинаковые фильтры отвечаются из кэша, параллельные запросы ждут одно вычисление
+            key = analytics_cache.key(**filters, bucket=bucket, sections=sections)
+            data = analytics_cache.get_or_compute(key, lambda: self._compute(filters, bucket, sections))
+            return Response(data)
 
         except Exception as e:
             return Response(
@@ -94,6 +83,48 @@ class DeliveryAnalyticsViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    def _filtered_queryset(self, start_date, end_date, service_ids, services_match, cargo_type_ids):
+        """Доставки, отобранные фильтрами аналитики"""
+        query = filter_date_range(self.get_queryset(), start_date, end_date)
+        query = filter_by_services(query, service_ids, services_match)
+        if cargo_type_ids:
+            query = query.filter(cargo_type__id__in=cargo_type_ids).distinct()
+        return query
+
+    def _filtered_archive(self, start_date, end_date, service_ids, services_match, cargo_type_ids):
+        """Архивные доставки, отобранные теми же фильтрами"""
+        query = filter_date_range(DeliveryArchive.objects.all(), start_date, end_date)
+        query = filter_archive_by_services(query, service_ids, services_match)
+        if cargo_type_ids:
+            query = query.filter(cargo_type__id__in=cargo_type_ids).distinct()
+        return query
+
+    def _compute(self, filters, bucket, sections):
+        """Сериализованная статистика по отфильтрованным доставкам"""
+        bucket = resolve_bucket(bucket, filters['start_date'], filters['end_date'])
+        if settings.ANALYTICS_ROLLUP_ENABLED and RollupAnalytics.supports(
+            filters['service_ids'], bucket=bucket, cargo_types=filters['cargo_type_ids']
+        ):
+            # Фильтры только по датам и одной услуге, интервал от дня: статистика из дневного свода
+            analytics_data = RollupAnalytics(
+                filters['start_date'], filters['end_date'], filters['service_ids'], bucket
+            ).compute()
+        else:
+            # Вся статистика считается за один проход по отфильтрованным доставкам
+            query = self._filtered_queryset(**filters)
+            analytics_data = DeliveryAnalytics(
+                query, filters['service_ids'], bucket, archive=self._filtered_archive(**filters)
+            ).compute()
+
+        if sections:
+            # Перцентили и гистограммы - отдельный проход по доставкам, свод на них не отвечает
+            analytics_data.update(DeliveryDistributions(
+                self._filtered_queryset(**filters), sections, archive=self._filtered_archive(**filters)
+            ).compute())
+
+        # Сериализуем данные
+        return DeliveryAnalyticsSerializer(analytics_data).data
+
     def retrieve(self, request, *args, **kwargs):
         """
         Метод не используется, так как аналитика не имеет отдельных элементов
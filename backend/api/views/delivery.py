@@ -1,51 +1,156 @@
-from datetime import timedelta
-from django.db.models import Q, F
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.http import Http404
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 from django_filters.rest_framework import DjangoFilterBackend
-from api.models import Delivery, DeliveryStatus
-from api.serializers import DeliveryListSerializer, DeliveryDetailSerializer
+from api.models import Delivery, DeliveryArchive, DeliveryService, DeliveryStatus, PackageType, TransportModel
+from api.serializers import (
+    DeliveryArchiveSerializer,
+    DeliveryDetailSerializer,
+    DeliveryListSerializer,
+    DeliveryTransitionSerializer,
+)
+from api.utils.bulk import BULK_CREATE, BULK_DELETE, BULK_UPDATE, BulkWriter
+from api.utils.export import EXPORT_CONTENT_TYPES, EXPORT_FORMAT_CSV, QuerysetExporter, export_response
+from api.utils.fast_serialization import get_values_serializer
+from api.utils.filters import SERVICES_MATCH_ANY, filter_by_services, filter_date_range, parse_id_list
+from api.utils.pagination import KeysetPagination
+from api.utils.query_planning import plan_queryset
+from api.utils.reference_cache import reference_cache
+from api.utils.search import PostgresSearchFilter
+from api.utils.status_transitions import STATUS_COMPLETED, get_status, transition_deliveries
+from api.views.mixins import ConditionalGetMixin, QueryBudgetMixin, ReplicaReadMixin
 
 
 
-class DeliveryViewSet(viewsets.ModelViewSet):
+class DeliveryViewSet(ReplicaReadMixin, QueryBudgetMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     """
     Представление для работы с доставками
 
     Обеспечивает полный CRUD для доставок.
+    Queryset строится по полям активного сериализатора: FK подтягиваются через JOIN,
+    услуги - одним prefetch-запросом на страницу. Выборочные поля (?fields= / ?omit=)
+    сокращают и ответ, и запрос: исключенные связи не загружаются.
+    list и retrieve отдают ETag / Last-Modified и отвечают 304 на совпавший If-None-Match.
+    Чтение идет с реплики, если она настроена (ReplicaReadMixin).
+    retrieve находит и архивные доставки (DeliveryArchive), изменить их нельзя.
     """
 
-    queryset = Delivery.objects.all()
+    # Поисковый вектор нужен только в условиях WHERE, в выборку он не попадает
+    queryset = Delivery.objects.defer('search_vector')
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, PostgresSearchFilter]
     filterset_fields = ['status', 'transport_model', 'package_type', 'technical_condition']
-    ordering_fields = ['departure_datetime', 'arrival_datetime', 'distance', 'created_at']
+    ordering_fields = ['departure_datetime', 'arrival_datetime', 'distance', 'duration', 'created_at']
     ordering = ['-departure_datetime']
-    search_fields = ['transport_number', 'departure_address', 'arrival_address']
+    # Поиск: номер транспорта - по триграммам, адреса - полнотекстово
+    search_trigram_fields = ['transport_number']
+    search_vector_field = 'search_vector'
+    # list: пользователь (JWT), валидаторы ETag (они же count), страница и prefetch услуг;
+    # list_cursor: то же без валидаторов (они строятся по странице);
+    # retrieve: пользователь, валидаторы ETag, запись и prefetch услуг
+    query_budget = {'list': 4, 'list_cursor': 3, 'retrieve': 4}
+    cursor_pagination_class = KeysetPagination
+    # Список отдается через values() и предкомпилированные преобразования полей
+    values_list_enabled = True
+    # Максимум элементов (create + update + delete) в одном запросе bulk
+    bulk_max_items = 5000
+    # Названия из этих справочников входят в ответ списка
+    conditional_reference_models = (TransportModel, PackageType, DeliveryStatus, DeliveryService)
+
+    @property
+    def paginator(self):
+        """
+        Пагинатор запроса
+
+        По умолчанию используется постраничная пагинация. Курсорный режим включается
+        параметром pagination=cursor или передачей cursor.
+        """
+        if not hasattr(self, '_paginator'):
+            params = self.request.query_params if self.request is not None else {}
+            if params.get('pagination') == 'cursor' or 'cursor' in params:
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+
+    def get_query_budget(self):
+        if self.action == 'list' and self.uses_page_validators():
+            return self.query_budget.get('list_cursor')
+        return super().get_query_budget()
+
+    def get_page_columns(self):
+        """Колонки, которые читаются помимо полей сериализатора: сортировка и валидатор страницы"""
+        return [*self.ordering_fields, 'updated_at']
+
+    def get_queryset(self):
+        # При чтении загружаются только колонки, нужные сериализатору, и поля сортировки
+        reading = self.request is not None and self.request.method in SAFE_METHODS
+        return plan_queryset(
+            super().get_queryset(),
+            self.get_serializer(),
+            restrict_columns=reading,
+            extra_columns=self.get_page_columns(),
+        )
 
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ('list', 'export'):
             return DeliveryListSerializer
         return DeliveryDetailSerializer
 
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        values_serializer = get_values_serializer(self.get_serializer()) if self.values_list_enabled else None
+        if values_serializer is None:
+            return super().list(request, *args, **kwargs)
+
+        # Быстрый путь: строки читаются через values() без экземпляров моделей и DRF-полей
+        queryset = values_serializer.prepare(
+            self.filter_queryset(self.get_queryset()),
+            extra_fields=self.get_page_columns(),
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.serialize(page))
+        return Response(values_serializer.serialize(queryset))
 
     def retrieve(self, request, *args, **kwargs):
         try:
             return super().retrieve(request, *args, **kwargs)
         except Http404:
+            pass
+        # Проведенные доставки старше срока хранения перенесены в архив (archive_deliveries)
+        archived = self.get_archived_object()
+        if archived is None:
             return Response(
                 {"detail": "Страница не найдена."}, 
                 status=status.HTTP_404_NOT_FOUND
             )
+        serializer = DeliveryArchiveSerializer(archived, context=self.get_serializer_context())
+        return Response(serializer.data)
+
+    def get_archived_object(self):
+        """Архивная доставка по идентификатору из URL или None"""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            return DeliveryArchive.objects.filter(pk=self.kwargs[lookup_url_kwarg]).first()
+        except ValidationError:
+            return None
 
     def create(self, request, *args, **kwargs):
         return super().create(request, *args, **kwargs)
 
+    def perform_create(self, serializer):
+        # Доставка, ее услуги и вклад в дневной свод аналитики сохраняются одной транзакцией
+        with transaction.atomic():
+            super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            super().perform_update(serializer)
+
     def update(self, request, *args, **kwargs):
         try:
             return super().update(request, *args, **kwargs)
@@ -78,8 +183,33 @@ class DeliveryViewSet(viewsets.ModelViewSet):
         """
         Действие для завершения доставки
 
-        Изменяет статус доставки на "Проведено".
+        Изменяет статус доставки на "Проведено" одним условным UPDATE,
+        если переход допускается таблицей переходов статусов.
         """
+        completed_status = get_status(STATUS_COMPLETED)
+        if not completed_status:
+            return Response(
+                {"detail": "Статус 'Проведено' не найден в базе данных"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            pk = Delivery._meta.pk.to_python(pk)
+        except ValidationError:
+            pk = None
+        result = transition_deliveries([pk], completed_status) if pk is not None else None
+        if result is None or result.not_found:
+            return Response(
+                {"detail": "Страница не найдена."}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        if result.rejected:
+            current = reference_cache.get(DeliveryStatus, result.rejected[0][1])
+            return Response(
+                {"detail": f"Переход из статуса '{current}' в '{completed_status}' не допускается"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         try:
             delivery = self.get_object()
         except Http404:
@@ -87,21 +217,85 @@ class DeliveryViewSet(viewsets.ModelViewSet):
                 {"detail": "Страница не найдена."}, 
                 status=status.HTTP_404_NOT_FOUND
             )
-        
-        # Изменяем поиск по имени вместо кода
-        completed_status = DeliveryStatus.objects.filter(name="Проведено").first()
-        if not completed_status:
+        serializer = self.get_serializer(delivery)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['post'])
+    def transition(self, request):
+        """
+        Массовая смена статуса доставок
+
+        Тело запроса: {"ids": [...], "status": <id статуса>}. Допустимость перехода
+        проверяется по таблице переходов в том же UPDATE, что меняет статус.
+        В ответе - изменившиеся доставки и причины, по которым остальные не изменились.
+        Если не изменилась ни одна доставка и есть отказы, ответ 400.
+        """
+        serializer = DeliveryTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = transition_deliveries(serializer.validated_data['ids'], serializer.validated_data['status'])
+        failed = result.rejected or result.not_found
+        return Response(
+            result.as_dict(),
+            status=status.HTTP_200_OK if result.changed or not failed else status.HTTP_400_BAD_REQUEST
+        )
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Массовое создание, изменение и удаление доставок
+
+        Тело запроса: {"create": [...], "update": [{"id": ..., ...}], "delete": [id, ...]}.
+        Каждый элемент проверяется отдельно: корректные сохраняются одной транзакцией,
+        ошибки возвращаются по индексу элемента. Если не сохранен ни один элемент, ответ 400.
+        """
+        data = request.data
+        operations = (BULK_CREATE, BULK_UPDATE, BULK_DELETE)
+        if not isinstance(data, dict) or any(not isinstance(data.get(name, []), list) for name in operations):
             return Response(
-                {"detail": "Статус 'Проведено' не найден в базе данных"},
+                {"detail": "Ожидается объект со списками create, update и delete."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        delivery.status = completed_status
-        delivery.save()
+        total = sum(len(data.get(name, [])) for name in operations)
+        if total > self.bulk_max_items:
+            return Response(
+                {"detail": f"Слишком много элементов: {total}, допускается не более {self.bulk_max_items}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        serializer = self.get_serializer(delivery)
-        return Response(serializer.data)
+        writer = BulkWriter(DeliveryDetailSerializer, context=self.get_serializer_context())
+        result = writer.save(
+            create=data.get(BULK_CREATE, []),
+            update=data.get(BULK_UPDATE, []),
+            delete=data.get(BULK_DELETE, []),
+        )
+        saved = result.created or result.updated or result.deleted
+        return Response(
+            result.as_dict(),
+            status=status.HTTP_200_OK if saved or not result.errors else status.HTTP_400_BAD_REQUEST
+        )
 
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Выгрузка всех доставок, подходящих под фильтры списка
+
+        Формат задается параметром export_format (csv или ndjson), состав колонок -
+        полями списка с учетом ?fields= / ?omit=. Ответ передается потоком без пагинации.
+        """
+        export_format = request.query_params.get('export_format', EXPORT_FORMAT_CSV)
+        if export_format not in EXPORT_CONTENT_TYPES:
+            return Response(
+                {"detail": f"Неизвестный формат выгрузки. Допустимые значения: {', '.join(EXPORT_CONTENT_TYPES)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        exporter = QuerysetExporter(
+            self.filter_queryset(self.get_queryset()),
+            self.get_serializer(),
+            export_format,
+        )
+        return export_response(exporter, request, 'deliveries')
 
     def filter_queryset(self, queryset):
         queryset = super().filter_queryset(queryset)
@@ -117,22 +311,14 @@ class DeliveryViewSet(viewsets.ModelViewSet):
         if min_duration:
             # Фильтрация по минимальной продолжительности (в часах)
             try:
-                min_duration = float(min_duration)
-                queryset = queryset.filter(
-                    arrival_datetime__gte=F('departure_datetime') +
-                                        timedelta(hours=min_duration)
-                )
+                queryset = queryset.filter(duration__gte=float(min_duration))
             except (ValueError, TypeError):
                 pass
 
         if max_duration:
             # Фильтрация по максимальной продолжительности (в часах)
             try:
-                max_duration = float(max_duration)
-                queryset = queryset.filter(
-                    arrival_datetime__lte=F('departure_datetime') +
-                                        timedelta(hours=max_duration)
-                )
+                queryset = queryset.filter(duration__lte=float(max_duration))
             except (ValueError, TypeError):
                 pass
 
@@ -156,16 +342,13 @@ class DeliveryViewSet(viewsets.ModelViewSet):
         start_date = self.request.query_params.get('start_date')
         end_date = self.request.query_params.get('end_date')
 
-        if start_date:
-            queryset = queryset.filter(arrival_datetime__date__gte=start_date)
-
-        if end_date:
-            queryset = queryset.filter(arrival_datetime__date__lte=end_date)
+        queryset = filter_date_range(queryset, start_date, end_date)
 
         # Фильтрация по услугам
-        services = self.request.query_params.get('services')
-        if services:
-            service_ids = services.split(',')
-            queryset = queryset.filter(services__id__in=service_ids).distinct()
+        queryset = filter_by_services(
+            queryset,
+            parse_id_list(self.request.query_params.get('services')),
+            self.request.query_params.get('services_match', SERVICES_MATCH_ANY),
+        )
 
         return queryset
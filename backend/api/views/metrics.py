@@ -0,0 +1,24 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from api.db.pool import pool_stats
+from api.utils.analytics_cache import analytics_cache
+from api.utils.reference_cache import reference_cache
+
+
+class InternalMetricsView(APIView):
+    """
+    Внутренние метрики процесса
+
+    Доступно только администраторам. Значения относятся к процессу (воркеру),
+    который обработал запрос.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({
+            'reference_cache': reference_cache.stats(),
+            'analytics_cache': analytics_cache.stats(),
+            'db_pool': pool_stats(),
+        })
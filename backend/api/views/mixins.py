@@ -0,0 +1,266 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+from api.db.routers import (
+    PRIMARY_PIN_COOKIE, choose_replica, current_read_alias, primary_pins, read_from, read_from_primary, replica_aliases,
+)
+from api.utils.logger_utils import logger
+from api.utils.pagination import KeysetPagination
+from api.utils.query_budget import QueryCounter, QueryBudgetExceeded
+from api.utils.reference_cache import reference_cache
+
+
+class QueryBudgetMixin:
+    """
+    Контроль количества SQL-запросов на действие представления
+
+    Бюджет задается словарем query_budget вида {'list': 4, 'retrieve': 3}.
+    Поведение при превышении определяется настройкой QUERY_BUDGET_MODE:
+    - 'off' - запросы не считаются;
+    - 'warn' - превышение пишется в лог;
+    - 'raise' - выбрасывается QueryBudgetExceeded (используется в тестах).
+    Запросы, не относящиеся к действию (проверка закрепления за основной БД
+    в ReplicaReadMixin), представление добавляет к бюджету через overhead_queries.
+    """
+
+    query_budget = {}
+    overhead_queries = 0
+
+    def get_query_budget(self):
+        return self.query_budget.get(getattr(self, 'action', None))
+
+    def dispatch(self, request, *args, **kwargs):
+        mode = getattr(settings, 'QUERY_BUDGET_MODE', 'off')
+        if mode == 'off':
+            return super().dispatch(request, *args, **kwargs)
+
+        with QueryCounter() as counter:
+            response = super().dispatch(request, *args, **kwargs)
+
+        budget = self.get_query_budget()
+        if budget is not None and counter.count > budget + self.overhead_queries:
+            message = (
+                f"Превышен бюджет запросов в {self.__class__.__name__}.{self.action}: "
+                f"{counter.count} > {budget}"
+            )
+            if mode == 'raise':
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+        return response
+
+
+class _NotModified(Exception):
+    """Прерывает обработку запроса готовым ответом 304/412"""
+
+    def __init__(self, response):
+        super().__init__(response.status_code)
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET-запросы: слабый ETag и Last-Modified для list и retrieve
+
+    Валидаторы считаются одним агрегирующим запросом до сериализации: число строк
+    и наибольший updated_at отфильтрованной выборки (для retrieve - одной записи).
+    Совпавший If-None-Match возвращает 304 без сериализации. Для списка
+    If-Modified-Since не проверяется: удаление строки не меняет наибольший
+    updated_at, его замечает только ETag (через число строк). Посчитанное число
+    строк списка сохраняется в queryset_count и используется пагинатором.
+
+    При курсорной пагинации строки не считаются: агрегат прочитал бы всю выборку
+    на каждой странице. Валидаторы списка тогда строятся по прочитанной странице
+    (id строк, их наибольший updated_at и ссылки на соседние страницы), 304 также
+    отдается до сериализации. Поле updated_at должно попадать в выборку страницы.
+
+    В ETag входят также снимки справочников conditional_reference_models,
+    поля которых попадают в ответ (названия статусов, моделей транспорта и т.п.).
+    """
+
+    conditional_actions = ('list', 'retrieve')
+    conditional_reference_models = ()
+
+    def get_conditional_state(self):
+        """Число строк и наибольший updated_at ответа или None, если проверка невозможна"""
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            if self.action == 'retrieve':
+                lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+                queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            state = queryset.aggregate(count=Count('pk'), last_modified=Max('updated_at'))
+        except (TypeError, ValueError, ValidationError):
+            return None
+        if self.action == 'retrieve' and not state['count']:
+            # Ответ 404 формирует само действие
+            return None
+        return state['count'], state['last_modified']
+
+    def uses_page_validators(self):
+        """Строятся ли валидаторы списка по странице (пагинация без COUNT)"""
+        return self.action == 'list' and isinstance(self.paginator, KeysetPagination)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._conditional_validators = None
+        if not self._is_conditional(request) or self.uses_page_validators():
+            return
+
+        state = self.get_conditional_state()
+        if state is None:
+            return
+        count, last_modified = state
+        if self.action == 'list':
+            # Число строк переиспользует пагинатор вместо отдельного COUNT
+            self.queryset_count = count
+        self.check_conditional(request, [count], last_modified)
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None and self._is_conditional(self.request) and self.uses_page_validators():
+            # Строки - экземпляры модели или словари values()
+            value = lambda row, name: row[name] if isinstance(row, dict) else getattr(row, name)
+            pk_name = self.get_queryset().model._meta.pk.name
+            last_modified = max((value(row, 'updated_at') for row in page), default=None)
+            links = (self.paginator.get_next_link(), self.paginator.get_previous_link())
+            self.check_conditional(self.request, [[value(row, pk_name) for row in page], links], last_modified)
+        return page
+
+    def _is_conditional(self, request):
+        return request.method in ('GET', 'HEAD') and self.action in self.conditional_actions
+
+    def check_conditional(self, request, state, last_modified):
+        """
+        Формирует валидаторы ответа из state и last_modified
+
+        Совпавший If-None-Match (для retrieve - и If-Modified-Since) прерывает
+        действие ответом 304/412.
+        """
+        digest = hashlib.sha1()
+        parts = [self.action, request.get_full_path(), request.accepted_media_type, *state, last_modified]
+        parts.extend(reference_cache.fingerprint(model) for model in self.conditional_reference_models)
+        for part in parts:
+            digest.update(repr(part).encode())
+        etag = f'W/"{digest.hexdigest()}"'
+        self._conditional_validators = (etag, last_modified)
+
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=(
+                int(last_modified.timestamp())
+                if last_modified is not None and self.action != 'list' else None
+            ),
+        )
+        if response is not None:
+            raise _NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        validators = getattr(self, '_conditional_validators', None)
+        if validators is not None and response.status_code in (200, 304):
+            etag, last_modified = validators
+            response.headers['ETag'] = etag
+            if last_modified is not None:
+                response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+            # Клиент хранит ответ, но перед использованием обязан его перепроверить
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class ReferenceCacheMixin:
+    """
+    Чтение справочника из кэша в памяти процесса вместо запросов к БД
+
+    Список и детальная запись берутся из reference_cache; порядок записей
+    совпадает с Meta.ordering модели, пагинация работает по списку в памяти.
+    Валидаторы условных запросов (ConditionalGetMixin) тоже берутся из кэша.
+    """
+
+    def get_conditional_state(self):
+        model = self.queryset.model
+        if self.action == 'list':
+            return reference_cache.fingerprint(model)
+        try:
+            obj = self.get_object()
+        except Http404:
+            return None
+        return 1, obj.updated_at
+
+    def list(self, request, *args, **kwargs):
+        objects = reference_cache.all(self.queryset.model)
+        page = self.paginate_queryset(objects)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(objects, many=True)
+        return Response(serializer.data)
+
+    def get_object(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = reference_cache.get(self.queryset.model, self.kwargs[lookup_url_kwarg])
+        except (TypeError, ValueError, ValidationError):
+            obj = None
+        if obj is None:
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
+class ReplicaReadMixin:
+    """
+    Безопасные запросы (GET, HEAD, OPTIONS) читают данные с реплики
+
+    Реплика выбирается случайно на каждый запрос (api.db.routers). Без реплик все
+    запросы идут в основную БД. Успешный изменяющий запрос закрепляет клиента
+    за основной БД на REPLICA_PIN_SECONDS, чтобы он видел свои изменения несмотря на
+    отставание реплики. Для этого ответ ставит cookie primary_until, а пользователь
+    закрепляется в таблице PrimaryPin, общей для всех воркеров (для клиентов без cookie,
+    например с Bearer-токеном: проверка - один запрос к основной БД).
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        alias = None
+        if request.method in SAFE_METHODS and not self._pinned_by_cookie(request):
+            alias = choose_replica()
+        with read_from(alias):
+            return super().dispatch(request, *args, **kwargs)
+
+    def perform_authentication(self, request):
+        super().perform_authentication(request)
+        user = request.user
+        if current_read_alias() is not None and user.is_authenticated:
+            self.overhead_queries = 1
+            if primary_pins.is_pinned(user.pk):
+                read_from_primary()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replica_aliases():
+            seconds = settings.REPLICA_PIN_SECONDS
+            until = time.time() + seconds
+            response.set_cookie(PRIMARY_PIN_COOKIE, f'{until:.0f}', max_age=seconds, httponly=True, samesite='Lax')
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                primary_pins.pin(user.pk, until)
+        return response
+
+    @staticmethod
+    def _pinned_by_cookie(request):
+        try:
+            return float(request.COOKIES.get(PRIMARY_PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
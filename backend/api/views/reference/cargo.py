@@ -4,13 +4,16 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from api.models import CargoType
 from api.serializers import CargoTypeSerializer
+from api.views.mixins import ConditionalGetMixin, ReferenceCacheMixin, ReplicaReadMixin
 
 
-class CargoTypeViewSet(viewsets.ReadOnlyModelViewSet):
+class CargoTypeViewSet(ReplicaReadMixin, ReferenceCacheMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     Представление для типов груза
 
     Обеспечивает доступ только для чтения к типам груза.
+    Данные отдаются из кэша справочников в памяти процесса.
+    Поддерживает условные запросы (ETag / Last-Modified).
     """
 
     queryset = CargoType.objects.all()
@@ -4,13 +4,16 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from api.models import DeliveryService
 from api.serializers import DeliveryServiceSerializer
+from api.views.mixins import ConditionalGetMixin, ReferenceCacheMixin, ReplicaReadMixin
 
 
-class DeliveryServiceViewSet(viewsets.ReadOnlyModelViewSet):
+class DeliveryServiceViewSet(ReplicaReadMixin, ReferenceCacheMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     Представление для услуг доставки
 
     Обеспечивает доступ только для чтения к услугам доставки.
+    Данные отдаются из кэша справочников в памяти процесса.
+    Поддерживает условные запросы (ETag / Last-Modified).
     """
 
     queryset = DeliveryService.objects.all()
@@ -4,13 +4,16 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from api.models import DeliveryStatus
 from api.serializers import DeliveryStatusSerializer
+from api.views.mixins import ConditionalGetMixin, ReferenceCacheMixin, ReplicaReadMixin
 
 
-class DeliveryStatusViewSet(viewsets.ReadOnlyModelViewSet):
+class DeliveryStatusViewSet(ReplicaReadMixin, ReferenceCacheMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     Представление для статусов доставки
 
     Обеспечивает доступ только для чтения к статусам доставки.
+    Данные отдаются из кэша справочников в памяти процесса.
+    Поддерживает условные запросы (ETag / Last-Modified).
     """
 
     queryset = DeliveryStatus.objects.all()
@@ -4,13 +4,16 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from api.models import PackageType
 from api.serializers import PackageTypeSerializer
+from api.views.mixins import ConditionalGetMixin, ReferenceCacheMixin, ReplicaReadMixin
 
 
-class PackageTypeViewSet(viewsets.ReadOnlyModelViewSet):
+class PackageTypeViewSet(ReplicaReadMixin, ReferenceCacheMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     Представление для типов упаковки
 
     Обеспечивает доступ только для чтения к типам упаковки.
+    Данные отдаются из кэша справочников в памяти процесса.
+    Поддерживает условные запросы (ETag / Last-Modified).
     """
 
     queryset = PackageType.objects.all()
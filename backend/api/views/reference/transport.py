@@ -4,13 +4,16 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from api.models import TransportModel
 from api.serializers import TransportModelSerializer
+from api.views.mixins import ConditionalGetMixin, ReferenceCacheMixin, ReplicaReadMixin
 
 
-class TransportModelViewSet(viewsets.ReadOnlyModelViewSet):
+class TransportModelViewSet(ReplicaReadMixin, ReferenceCacheMixin, ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """
     Представление для моделей транспорта
 
     Обеспечивает доступ только для чтения к моделям транспорта.
+    Данные отдаются из кэша справочников в памяти процесса.
+    Поддерживает условные запросы (ETag / Last-Modified).
     """
 
     queryset = TransportModel.objects.all()
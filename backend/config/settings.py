@@ -37,6 +37,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Сторонние приложения
     'rest_framework',
@@ -58,7 +59,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'api.middleware.logging_middleware.LoggingMiddleware'
+    'api.middleware.server_timing.ServerTimingMiddleware',
+    'api.middleware.logging_middleware.LoggingMiddleware',
+    'api.middleware.reference_cache.ReferenceCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -85,17 +88,49 @@ ASGI_APPLICATION = 'config.asgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Пул соединений процесса (api.db.postgresql): соединение возвращается в пул в конце
+# запроса вместо закрытия. Размер - на процесс (воркер), время - в секундах, 0 - без ограничения
+DB_POOL_ENABLED = os.environ.get('DB_POOL_ENABLED', 'False').lower() == 'true'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'api.db.postgresql' if DB_POOL_ENABLED else 'django.db.backends.postgresql',
         'NAME': os.environ.get('POSTGRES_DB', 'delivery_service_db'),
         'USER': os.environ.get('POSTGRES_USER', 'postgres'),
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'postgres'),
         'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
         'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            # Ожидание свободного соединения, затем ошибка
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'MAX_LIFETIME': float(os.environ.get('DB_POOL_MAX_LIFETIME', 3600)),
+            'MAX_IDLE': float(os.environ.get('DB_POOL_MAX_IDLE', 600)),
+            # Свободное дольше этого соединение перед выдачей проверяется запросом SELECT 1
+            'CHECK_INTERVAL': float(os.environ.get('DB_POOL_CHECK_INTERVAL', 30)),
+        },
     }
 }
 
+# Реплики для чтения: хосты через запятую (host или host:port), остальные параметры - как у default.
+# Безопасные запросы к доставкам, аналитике и справочникам читают с реплики (api.db.routers).
+# Для локальной проверки можно указать тот же сервер: POSTGRES_REPLICA_HOSTS=localhost
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(',')), start=1):
+    replica_host, _, replica_port = replica.strip().partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': replica_host,
+        'PORT': replica_port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['api.db.routers.ReplicaRouter']
+
+# Клиент, успешно изменивший данные, столько секунд читает с основной БД
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -136,7 +171,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.utils.authentication.TimedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -147,6 +182,25 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
 }
 from rest_framework.pagination import PageNumberPagination
+
+# Контроль количества SQL-запросов на действие (off | warn | raise)
+QUERY_BUDGET_MODE = os.environ.get('QUERY_BUDGET_MODE', 'warn' if DEBUG else 'off')
+
+# Время жизни кэша справочников в памяти процесса, секунды. Изменения в текущем
+# процессе сбрасывают кэш сразу, в других воркерах - по истечении этого времени
+REFERENCE_CACHE_TIMEOUT = int(os.environ.get('REFERENCE_CACHE_TIMEOUT', 60))
+
+# Аналитика читается из дневного свода, если фильтры позволяют (см. api.utils.rollup)
+ANALYTICS_ROLLUP_ENABLED = os.environ.get('ANALYTICS_ROLLUP_ENABLED', 'True').lower() == 'true'
+
+# Проведенные доставки старше стольких дней переносятся в архив командой archive_deliveries
+DELIVERY_ARCHIVE_AFTER_DAYS = int(os.environ.get('DELIVERY_ARCHIVE_AFTER_DAYS', 365))
+
+# Кэш ответов аналитики в памяти процесса: время жизни (секунды, 0 - выключен) и число записей.
+# Изменения доставок в текущем процессе сбрасывают записи с затронутыми днями сразу
+ANALYTICS_CACHE_TIMEOUT = int(os.environ.get('ANALYTICS_CACHE_TIMEOUT', 60))
+ANALYTICS_CACHE_MAX_ENTRIES = int(os.environ.get('ANALYTICS_CACHE_MAX_ENTRIES', 256))
+
 # Simple JWT settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
@@ -198,6 +252,18 @@ SPECTACULAR_SETTINGS = {
 LOG_LEVEL = "INFO"
 LOG_FORMAT = "<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
 
+# Структурированный журнал: записи - строки JSON, запись в потоки и файлы идет
+# в фоновом потоке, а не в потоке запроса (см. api.utils.logger_utils)
+LOG_STRUCTURED = os.environ.get('LOG_STRUCTURED', 'False').lower() == 'true'
+
+# Доля успешных (2xx) запросов, попадающих в журнал запросов; остальные записываются всегда
+LOG_SUCCESS_SAMPLE_RATE = float(os.environ.get('LOG_SUCCESS_SAMPLE_RATE', 1.0))
+
+# Заголовок Server-Timing (время SQL, аутентификации, сериализации, рендеринга) и те же
+# замеры в журнале запросов: для персонала и для доли SERVER_TIMING_SAMPLE_RATE всех запросов
+SERVER_TIMING_STAFF = os.environ.get('SERVER_TIMING_STAFF', 'True').lower() == 'true'
+SERVER_TIMING_SAMPLE_RATE = float(os.environ.get('SERVER_TIMING_SAMPLE_RATE', 0.0))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,